@@ -0,0 +1,108 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+# ============================================================
+# Analyses glissantes : rendement, vol, Sharpe, drawdown, contributions
+# ============================================================
+# annualize_stats résume tout l'historique en un nombre. Ici, sur toutes les dates et pour
+# chaque fenêtre, en une passe O(T) par sommes cumulées (pas de .rolling().apply) :
+# - rendement composé de la fenêtre (log-richesse cumulée), vol et Sharpe annualisés
+#   (mêmes définitions que annualize_stats : moyenne x 252, écart-type x √252) ;
+# - drawdown courant et drawdown max depuis le début ;
+# - contribution de chaque bloc (cœur, satellites) au rendement du portefeuille.
+# Les rendements sont centrés avant les sommes de carrés : la variance n'en dépend pas et
+# la soustraction des sommes cumulées ne perd pas de chiffres significatifs.
+
+ROLLING_WINDOWS = (63, 126, 252)
+TRADING_DAYS = 252
+ROLLING_METRICS = ("ret", "vol", "sharpe")
+
+
+def rolling_stats(R: np.ndarray, window: int) -> tuple:
+    """
+    R : rendements journaliers (T x S, sans NaN). Retourne (ret, vol, sharpe), chacun T x S,
+    NaN tant que la fenêtre n'est pas pleine (lignes < window - 1).
+    """
+    R = np.asarray(R, dtype=float)
+    if R.ndim == 1:
+        R = R[:, None]
+    T, S = R.shape
+    ret, vol, sharpe = (np.full((T, S), np.nan) for _ in range(3))
+    if T < window or window < 2:
+        return ret, vol, sharpe
+    zero = np.zeros((1, S))
+    mean_all = R.mean(axis=0)
+    c = R - mean_all
+    s1 = np.cumsum(np.vstack([zero, c]), axis=0)
+    s2 = np.cumsum(np.vstack([zero, c * c]), axis=0)
+    m = (s1[window:] - s1[:-window]) / window
+    var = np.maximum((s2[window:] - s2[:-window] - window * m * m) / (window - 1), 0.0)
+    vol[window - 1:] = np.sqrt(var * TRADING_DAYS)
+    mu = (m + mean_all) * TRADING_DAYS
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sharpe[window - 1:] = np.where(vol[window - 1:] > 0, mu / vol[window - 1:], np.nan)
+    logw = np.cumsum(np.vstack([zero, np.log1p(np.maximum(R, -0.999999))]), axis=0)
+    ret[window - 1:] = np.expm1(logw[window:] - logw[:-window])
+    return ret, vol, sharpe
+
+
+def drawdowns(R: np.ndarray) -> np.ndarray:
+    """Drawdown courant (T x S, <= 0) de la richesse composée, depuis son plus haut précédent."""
+    R = np.asarray(R, dtype=float)
+    wealth = np.cumprod(1.0 + R, axis=0)
+    peak = np.maximum(np.maximum.accumulate(wealth, axis=0), 1.0)   # richesse initiale = 1
+    return wealth / peak - 1.0
+
+
+@dataclass
+class PortfolioAnalytics:
+    returns: pd.DataFrame           # dates x blocs (cœur, satellites, portefeuille)
+    rolling: dict                   # (métrique, fenêtre) -> DataFrame dates x blocs
+    drawdown: pd.DataFrame          # drawdown courant, dates x blocs
+    contributions: pd.DataFrame     # contribution journalière au portefeuille, dates x (cœur + chaque satellite)
+    windows: tuple = ROLLING_WINDOWS
+
+    def metric(self, name: str, window: int) -> pd.DataFrame:
+        return self.rolling[(name, window)]
+
+    @property
+    def max_drawdown(self) -> pd.Series:
+        return self.drawdown.min()
+
+    def cumulative_contributions(self) -> pd.DataFrame:
+        """Contributions cumulées (additives : leur somme est le rendement cumulé simple du portefeuille)."""
+        return self.contributions.cumsum()
+
+    def summary(self) -> pd.DataFrame:
+        """Un bloc par ligne : drawdown max et courant, dernières valeurs glissantes par fenêtre."""
+        out = pd.DataFrame({"dd_max": self.drawdown.min(), "dd_courant": self.drawdown.iloc[-1]})
+        for w in self.windows:
+            out[f"sharpe_{w}j"] = self.rolling[("sharpe", w)].iloc[-1]
+            out[f"vol_{w}j"] = self.rolling[("vol", w)].iloc[-1]
+        return out
+
+
+def analyze_portfolio(pf, windows=ROLLING_WINDOWS, core_label: str = "Cœur") -> PortfolioAnalytics | None:
+    """PortfolioResult (pipeline.combine_satellites) -> PortfolioAnalytics, ou None sans historique."""
+    if pf is None or pf.returns.empty:
+        return None
+    dates = pf.returns.index
+    blocks = pd.DataFrame({core_label: pf.core_returns, "Satellites": pf.sat_returns, "Portefeuille": pf.returns},
+                          index=dates).fillna(0.0)
+    R = blocks.to_numpy()
+    rolling = {}
+    for w in windows:
+        for name, arr in zip(ROLLING_METRICS, rolling_stats(R, w)):
+            rolling[(name, w)] = pd.DataFrame(arr, index=dates, columns=blocks.columns)
+    dd = pd.DataFrame(drawdowns(R), index=dates, columns=blocks.columns)
+
+    # port = cœur x w_c + Σ_k (1 - w_c) x w_k x r_k : un terme par bloc
+    core_weight = pf.core_weight
+    contrib = {core_label: core_weight * blocks[core_label].to_numpy()}
+    if pf.sat_components is not None:
+        comp = pf.sat_components.reindex(dates).fillna(0.0)
+        for k in pf.valid:
+            contrib[k] = (1.0 - core_weight) * float(pf.weights.get(k, 0.0)) * comp[k].to_numpy()
+    return PortfolioAnalytics(blocks, rolling, dd, pd.DataFrame(contrib, index=dates), tuple(windows))
@@ -0,0 +1,427 @@
+import argparse
+import asyncio
+import contextvars
+import functools
+import json
+import logging
+import math
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+from http import HTTPStatus
+
+from batch import ClientSpec, client_spec, resolve_core
+from catalog import PROFILE_PARAMS, SAT_UNIVERSE, is_large_universe, profile_of_score
+from pipeline import PortfolioResult, combine_satellites, run_large_satellite, run_satellite
+from quant import LOOKBACKS, annualize_stats, momentum_panel
+from tracing import count, span, start_trace
+
+# ============================================================
+# API HTTP/JSON locale : listes d'achat sans l'interface Streamlit
+# ============================================================
+# python api.py --port 8765                 -> sert POST /portfolio et GET /health
+# python api.py --fake                      -> même service sur des prix synthétiques (aucun appel Yahoo)
+# python api.py --selftest                  -> test de bout en bout hors ligne (code retour 1 en cas d'échec)
+# POST /portfolio reçoit les paramètres du sidebar et du profil KYC (mêmes champs que batch.py :
+# core, sats, profile ou risk_score, start, lookback, top_k, max_w_stock, max_w_sat, cov_method,
+# core_weight) et renvoie la liste d'achat (df_buy de l'app), les poids et les statistiques.
+# - requêtes identiques en cours : un seul calcul, tous les appelants reçoivent son résultat ;
+# - calcul dans un pool de WORKERS threads (le store de prix se verrouille par processus) ;
+# - au-delà de MAX_PENDING calculs distincts en attente ou en cours : 503 + Retry-After ;
+# - chaque réponse porte ses durées (attente du pool, calcul, total), aussi en Server-Timing ;
+#   une ligne de journal par requête (logger "api", niveau INFO, affiché avec --access-log).
+
+API_HOST = "127.0.0.1"
+API_PORT = int(os.environ.get("MOMENTUMX_API_PORT", "8765"))
+WORKERS = 4
+MAX_PENDING = 32
+CACHE_TTL_S = 3600          # comme les caches de l'app : satellites et cœur relus au plus une fois par heure
+SAT_CACHE = 256
+MAX_BODY = 64 * 1024
+READ_TIMEOUT_S = 10.0
+RETRY_AFTER_S = 1
+
+log = logging.getLogger(__name__)
+
+
+class RequestError(ValueError):
+    """Requête invalide (400) ou sans portefeuille possible (422)."""
+
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.status = status
+
+
+class Overloaded(RuntimeError):
+    """Trop de calculs distincts en attente : le client doit réessayer (503)."""
+
+
+def parse_request(row: dict) -> ClientSpec:
+    """Corps JSON -> ClientSpec sans nom de client (clé de regroupement des requêtes identiques)."""
+    if not isinstance(row, dict):
+        raise RequestError("le corps doit être un objet JSON")
+    row = {k: v for k, v in row.items() if k != "client"}
+    if "risk_score" in row:
+        score = row.pop("risk_score")
+        if not isinstance(score, int) or isinstance(score, bool):
+            raise RequestError(f"risk_score doit être un entier (reçu {score!r})")
+        row.setdefault("profile", profile_of_score(score))
+    try:
+        spec = replace(client_spec({**row, "client": "api"}), client="")
+    except (KeyError, TypeError, ValueError) as e:
+        raise RequestError(str(e)) from None
+    # profil, lookback, top_k, cov_method et poids : vérifiés par batch.validate_spec (dans client_spec)
+    if not spec.sats:
+        raise RequestError("au moins un satellite est requis (sats)")
+    return spec
+
+
+def _num(x):
+    # JSON strict : NaN / inf -> null
+    x = float(x)
+    return x if math.isfinite(x) else None
+
+
+def portfolio_payload(spec: ClientSpec, pf: PortfolioResult, core_ticker: str, names=None) -> dict:
+    """PortfolioResult -> réponse JSON : liste d'achat (poids décroissants), poids, statistiques."""
+    positions = sorted(pf.positions.items(), key=lambda kv: -kv[1])
+    tickers = [t for t, _ in positions]
+    titles = names(tickers) if names is not None else tickers
+    return {
+        "profile": spec.profile,
+        "core": {"choice": spec.core, "ticker": core_ticker, "weight": spec.weight_of_core},
+        "risk_aversion": spec.params.risk_aversion,
+        "satellites": {k: _num(w) for k, w in pf.weights.items()},
+        "min_weight_sat": _num(pf.min_weight),
+        "buy_list": [{"Titre": n, "Ticker": t, "Poids": _num(w)} for n, (t, w) in zip(titles, positions)],
+        "stats": {name: {k: _num(v) for k, v in annualize_stats(r).items()}
+                  for name, r in (("core", pf.core_returns), ("satellites", pf.sat_returns), ("portfolio", pf.returns))},
+        "data_end": str(pf.returns.index[-1].date()) if len(pf.returns) else None,
+    }
+
+
+class PortfolioService:
+    """
+    Calcul des portefeuilles derrière l'API (sans HTTP : appelable directement depuis asyncio).
+    store : PriceStore (get_panel), health : TickerHealth optionnel, artifacts : ArtifactStore
+    optionnel (résultats précalculés par precompute.py), names : tickers -> noms, optionnel.
+    """
+
+    def __init__(self, store, health=None, artifacts=None, names=None, workers: int = WORKERS,
+                 max_pending: int = MAX_PENDING):
+        self.store, self.health, self.artifacts, self.names = store, health, artifacts, names
+        self.workers, self.max_pending = workers, max_pending
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="api")
+        self._inflight = {}         # ClientSpec -> tâche asyncio du calcul en cours
+        self.stats = Counter()
+        # mémo par (satellite, start, paramètres, période) : une requête ne recalcule que ses nouveaux satellites
+        self._satellite = functools.lru_cache(maxsize=SAT_CACHE)(self._compute_satellite)
+        self._core = functools.lru_cache(maxsize=64)(self._compute_core)
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    # ---------- calcul (threads du pool) ----------
+    def _compute_core(self, core_choice: str, start: str, epoch: int):
+        return resolve_core(self.store, self.health, core_choice, start)
+
+    def _compute_satellite(self, sat_key: str, start: str, params, epoch: int):
+        hit = self.artifacts.lookup(sat_key, start, params) if self.artifacts is not None else None
+        if hit is not None:
+            return hit
+        if is_large_universe(sat_key):
+            return run_large_satellite(sat_key, SAT_UNIVERSE[sat_key],
+                                       lambda ts, dtype: self.store.get_panel(ts, start=start, dtype=dtype).dropna_rows(),
+                                       params)
+        prices = self.store.get_panel(SAT_UNIVERSE[sat_key], start=start).dropna_rows()
+        return run_satellite(sat_key, prices, params, momentum_panel(prices, lookbacks=LOOKBACKS) if not prices.empty else None)
+
+    def build(self, spec: ClientSpec) -> dict:
+        """Un portefeuille, de bout en bout (bloquant) -> réponse JSON sans les durées."""
+        epoch = int(time.time() // CACHE_TTL_S)
+        with span("api.core"):
+            core_ticker, core_ret = self._core(spec.core, spec.start, epoch)
+        if core_ticker is None:
+            raise RequestError(f"aucune donnée pour le cœur {spec.core!r}", status=422)
+        with span("api.satellites", sats=len(spec.sats)):
+            results = [self._satellite(k, spec.start, spec.params, epoch) for k in spec.sats]
+        with span("api.combine"):
+            pf = combine_satellites(results, core_ticker, core_ret, spec.weight_of_core, spec.params.risk_aversion,
+                                    spec.max_w_sat, cov_method=spec.cov_method)
+        if pf is None:
+            raise RequestError("aucun satellite exploitable (données manquantes)", status=422)
+        return portfolio_payload(spec, pf, core_ticker, self.names)
+
+    # ---------- asyncio ----------
+    async def _run(self, spec: ClientSpec) -> tuple:
+        t_submit = time.perf_counter()
+
+        def job():
+            t_start = time.perf_counter()
+            tracer = start_trace("api.compute")
+            body = self.build(spec)
+            steps = {s["name"]: round(s["total_ms"], 1) for s in tracer.summary()}
+            return body, {"queue_ms": (t_start - t_submit) * 1e3, "compute_ms": (time.perf_counter() - t_start) * 1e3,
+                          "steps": steps}
+
+        self.stats["computed"] += 1
+        ctx = contextvars.copy_context()
+        return await asyncio.get_running_loop().run_in_executor(self._pool, ctx.run, job)
+
+    async def portfolio(self, row: dict) -> dict:
+        """Corps de requête -> réponse ; les requêtes identiques en cours partagent un seul calcul."""
+        t0 = time.perf_counter()
+        self.stats["requests"] += 1
+        spec = parse_request(row)
+        task = self._inflight.get(spec)
+        coalesced = task is not None
+        if coalesced:
+            self.stats["coalesced"] += 1
+            count("api.coalesced")
+        else:
+            if len(self._inflight) >= self.max_pending:
+                self.stats["rejected"] += 1
+                count("api.rejected")
+                raise Overloaded(f"{len(self._inflight)} calculs en cours (max {self.max_pending})")
+            task = asyncio.get_running_loop().create_task(self._run(spec))
+            self._inflight[spec] = task
+            task.add_done_callback(lambda t: self._inflight.pop(spec) if self._inflight.get(spec) is t else None)
+        # shield : un client qui se déconnecte n'annule pas le calcul attendu par les autres
+        body, timing = await asyncio.shield(task)
+        total = (time.perf_counter() - t0) * 1e3
+        return {**body, "timing": {"queue_ms": round(timing["queue_ms"], 1), "compute_ms": round(timing["compute_ms"], 1),
+                                   "total_ms": round(total, 1), "coalesced": coalesced, "steps": timing["steps"]}}
+
+    def health_report(self) -> dict:
+        return {"status": "ok", "inflight": len(self._inflight), "workers": self.workers,
+                "max_pending": self.max_pending, **self.stats,
+                "satellite_cache": self._satellite.cache_info()._asdict()}
+
+
+# ============================================================
+# Serveur HTTP/1.1 minimal (une requête par connexion)
+# ============================================================
+def _http_response(status: int, payload: dict, headers=()) -> bytes:
+    body = json.dumps(payload, ensure_ascii=False, allow_nan=False).encode("utf-8")
+    head = [f"HTTP/1.1 {status} {HTTPStatus(status).phrase}", "Content-Type: application/json; charset=utf-8",
+            f"Content-Length: {len(body)}", "Connection: close", *headers]
+    return ("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body
+
+
+async def _read_request(reader) -> tuple:
+    """-> (méthode, chemin, corps) ; RequestError si la requête est mal formée ou trop grosse."""
+    line = await reader.readline()
+    parts = line.decode("latin-1").split()
+    if len(parts) != 3:
+        raise RequestError("ligne de requête invalide")
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        k, _, v = line.decode("latin-1").partition(":")
+        headers[k.strip().lower()] = v.strip()
+    try:
+        length = int(headers.get("content-length") or 0)
+    except ValueError:
+        raise RequestError(f"Content-Length invalide {headers['content-length']!r}") from None
+    if length < 0:
+        raise RequestError(f"Content-Length négatif ({length})")
+    if length > MAX_BODY:
+        raise RequestError(f"corps trop gros ({length} octets, max {MAX_BODY})", status=413)
+    body = await reader.readexactly(length) if length else b""
+    return parts[0].upper(), parts[1].split("?", 1)[0], body
+
+
+async def handle(service: PortfolioService, reader, writer) -> None:
+    t0 = time.perf_counter()
+    method, path, headers = "-", "-", ()
+    try:
+        method, path, body = await asyncio.wait_for(_read_request(reader), READ_TIMEOUT_S)
+        if path == "/health" and method == "GET":
+            status, payload = 200, service.health_report()
+        elif path == "/portfolio" and method == "POST":
+            try:
+                row = json.loads(body or b"{}")
+            except ValueError as e:
+                raise RequestError(f"JSON invalide : {e}") from None
+            payload = await service.portfolio(row)
+            status, t = 200, payload["timing"]
+            headers = (f"Server-Timing: queue;dur={t['queue_ms']}, compute;dur={t['compute_ms']}, "
+                       f"total;dur={t['total_ms']}",)
+        elif path in ("/health", "/portfolio"):
+            status, payload = 405, {"error": f"méthode {method} non autorisée sur {path}"}
+        else:
+            status, payload = 404, {"error": f"chemin inconnu {path}"}
+    except RequestError as e:
+        status, payload = e.status, {"error": str(e)}
+    except Overloaded as e:
+        status, payload = 503, {"error": str(e)}
+        headers = (f"Retry-After: {RETRY_AFTER_S}",)
+    except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+        writer.close()
+        return
+    except Exception as e:      # erreur de calcul : réponse 500, le serveur continue
+        service.stats["errors"] += 1
+        status, payload = 500, {"error": repr(e)}
+    try:
+        writer.write(_http_response(status, payload, headers))
+        await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+    if path != "/health":
+        log.info("%s %s %d %.1f ms", method, path, status, (time.perf_counter() - t0) * 1e3)
+
+
+async def start_server(service: PortfolioService, host: str = API_HOST, port: int = API_PORT):
+    """Serveur asyncio démarré (port=0 : port libre, lu dans server.sockets)."""
+    return await asyncio.start_server(functools.partial(handle, service), host, port)
+
+
+def make_service(fake: bool = False, store_dir: str | None = None, workers: int = WORKERS,
+                 max_pending: int = MAX_PENDING) -> PortfolioService:
+    """
+    Service sur le store de prix local. fake=True : prix synthétiques (synthetic_download) dans un
+    store séparé (store_dir ou dossier temporaire), sans artefacts ni noms : aucun accès réseau.
+    """
+    from price_store import STORE_DIR, PriceStore
+
+    if fake:
+        from synthetic import synthetic_download
+
+        store = PriceStore(store_dir or tempfile.mkdtemp(prefix="momentumx-api-"), downloader=synthetic_download)
+        return PortfolioService(store, workers=workers, max_pending=max_pending)
+
+    from precompute import ArtifactStore
+    from ticker_health import TickerHealth
+    from ticker_meta import TickerMetaCache
+
+    health = TickerHealth()
+    meta = TickerMetaCache()
+    return PortfolioService(PriceStore(store_dir or STORE_DIR, health=health), health, ArtifactStore(),
+                            names=lambda ts: meta.names(ts, wait=False), workers=workers, max_pending=max_pending)
+
+
+async def _serve(service: PortfolioService, host: str, port: int) -> None:
+    server = await start_server(service, host, port)
+    print(f"Momentum-X API sur http://{host}:{server.sockets[0].getsockname()[1]} "
+          f"({service.workers} workers, max {service.max_pending} calculs en attente)", flush=True)
+    async with server:
+        await server.serve_forever()
+
+
+# ============================================================
+# Test de bout en bout hors ligne
+# ============================================================
+async def _call(port: int, method: str, path: str, payload=None) -> tuple:
+    """Client HTTP minimal -> (statut, en-têtes, corps JSON)."""
+    reader, writer = await asyncio.open_connection(API_HOST, port)
+    body = json.dumps(payload).encode("utf-8") if payload is not None else b""
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: {API_HOST}\r\nContent-Type: application/json\r\n"
+                 f"Content-Length: {len(body)}\r\n\r\n".encode("latin-1") + body)
+    await writer.drain()
+    raw = await reader.read()
+    writer.close()
+    head, _, data = raw.partition(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    headers = dict(line.split(": ", 1) for line in lines[1:])
+    return int(lines[0].split()[1]), headers, json.loads(data)
+
+
+async def _selftest(store_dir: str) -> list:
+    from catalog import CORE_MAP
+
+    failures = []
+
+    def check(ok: bool, what: str) -> None:
+        print(f"  {'ok  ' if ok else 'ÉCHEC'} {what}", flush=True)
+        if not ok:
+            failures.append(what)
+
+    core = next(iter(CORE_MAP))
+    sats = [k for k in SAT_UNIVERSE if not is_large_universe(k)][:3]
+    req = {"core": core, "sats": sats, "risk_score": 15, "start": "2018-01-01", "top_k": 5}
+
+    service = make_service(fake=True, store_dir=store_dir, workers=2, max_pending=2)
+    server = await start_server(service, API_HOST, 0)
+    port = server.sockets[0].getsockname()[1]
+    try:
+        # 8 requêtes identiques simultanées : un seul calcul
+        replies = await asyncio.gather(*[_call(port, "POST", "/portfolio", req) for _ in range(8)])
+        check(all(s == 200 for s, _, _ in replies), "8 requêtes identiques -> 200")
+        check(service.stats["computed"] == 1 and service.stats["coalesced"] == 7,
+              f"regroupées en un calcul (calculs={service.stats['computed']}, regroupées={service.stats['coalesced']})")
+        buy = [r["buy_list"] for _, _, r in replies]
+        check(all(b == buy[0] for b in buy), "même liste d'achat pour tous")
+        total = sum(p["Poids"] for p in buy[0])
+        check(abs(total - 1.0) < 1e-6, f"poids de la liste d'achat sommés à 1 ({total:.6f})")
+        first = replies[0][2]
+        check(first["profile"] == "Équilibré" and first["core"]["weight"] == PROFILE_PARAMS["Équilibré"][0],
+              "risk_score 15 -> profil Équilibré et poids du cœur du profil")
+        check("Server-Timing" in replies[0][1] and first["timing"]["compute_ms"] > 0, "durées par requête")
+
+        # paramètres différents : nouveau calcul, satellites relus dans le mémo
+        status, _, other = await _call(port, "POST", "/portfolio", {**req, "profile": "Dynamique", "risk_score": 22})
+        check(status == 200 and service.stats["computed"] == 2, "profil différent -> nouveau calcul")
+        check(other["core"]["weight"] == PROFILE_PARAMS["Dynamique"][0], "poids du cœur Dynamique")
+
+        # contre-pression : max_pending=2 calculs distincts, le 3e est refusé
+        burst = [{**req, "top_k": k} for k in (3, 4, 6)]
+        codes = [s for s, _, _ in await asyncio.gather(*[_call(port, "POST", "/portfolio", r) for r in burst])]
+        check(codes.count(503) >= 1 and codes.count(200) >= 1, f"surcharge -> 503 + Retry-After ({codes})")
+
+        status, _, _ = await _call(port, "POST", "/portfolio", {**req, "sats": ["INCONNU"]})
+        check(status == 400, "satellite inconnu -> 400")
+        status, _, h = await _call(port, "GET", "/health")
+        check(status == 200 and h["inflight"] == 0, "GET /health")
+    finally:
+        server.close()
+        await server.wait_closed()
+        service.close()
+    return failures
+
+
+def selftest() -> int:
+    """Serveur réel sur un port libre, prix synthétiques, aucun accès à Yahoo."""
+    with tempfile.TemporaryDirectory(prefix="momentumx-api-") as d:
+        t0 = time.perf_counter()
+        failures = asyncio.run(_selftest(d))
+    print(f"{'échec' if failures else 'ok'} en {time.perf_counter() - t0:.1f} s")
+    return 1 if failures else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API HTTP/JSON Momentum-X (listes d'achat sans interface).")
+    parser.add_argument("--host", default=API_HOST)
+    parser.add_argument("--port", type=int, default=API_PORT)
+    parser.add_argument("--workers", type=int, default=WORKERS, help="calculs simultanés (pool de threads)")
+    parser.add_argument("--max-pending", type=int, default=MAX_PENDING,
+                        help="calculs distincts en attente ou en cours au-delà desquels on répond 503")
+    parser.add_argument("--fake", action="store_true", help="prix synthétiques au lieu de Yahoo Finance")
+    parser.add_argument("--store", default=None, help="dossier du store de prix")
+    parser.add_argument("--selftest", action="store_true", help="test de bout en bout hors ligne puis sortie")
+    parser.add_argument("--access-log", action="store_true", help="une ligne par requête (méthode, chemin, statut, durée)")
+    args = parser.parse_args()
+
+    if args.access_log:
+        logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s", stream=sys.stderr)
+
+    if args.selftest:
+        sys.exit(selftest())
+    service = make_service(args.fake, args.store, args.workers, args.max_pending)
+    try:
+        asyncio.run(_serve(service, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+
+
+if __name__ == "__main__":
+    main()
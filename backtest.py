@@ -0,0 +1,217 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from covariance import RollingCovariance, estimate_cov
+from price_panel import FFILL_LIMIT, PricePanel, align_series, as_price_panel
+from quant import annualize_stats, momentum_panel, optimize_mean_variance, top_k_indices
+
+# ============================================================
+# Backtest walk-forward du pipeline momentum + mean-variance
+# ============================================================
+# À chaque date de rebalancement, on ne regarde que le passé : momentum -> Top K ->
+# optimisation intra-satellite -> optimisation inter-satellites, puis on applique les
+# poids jusqu'au rebalancement suivant (poids constants jour par jour, comme l'app).
+
+COV_WINDOW = 252   # même fenêtre de covariance que l'app (r_sel.tail(252))
+
+
+@dataclass
+class BacktestResult:
+    returns: pd.Series          # portefeuille final, hors échantillon
+    core_returns: pd.Series
+    sat_returns: pd.DataFrame   # une colonne par satellite
+    weights: pd.DataFrame       # poids finaux par ticker, une ligne par rebalancement
+    turnover: pd.Series         # turnover (aller simple) à chaque rebalancement
+    stats: dict
+
+
+def rebalance_dates(index, freq: str = "M") -> pd.DatetimeIndex:
+    """Dernier jour de cotation de chaque mois ("M") ou trimestre ("Q")."""
+    idx = pd.DatetimeIndex(index)
+    last = idx.to_series().groupby(idx.to_period(freq)).max()
+    return pd.DatetimeIndex(last.values)
+
+
+def max_drawdown(returns: pd.Series) -> float:
+    cum = (1 + returns.fillna(0)).cumprod()
+    return float((cum / cum.cummax() - 1.0).min()) if not cum.empty else np.nan
+
+
+def satellite_view(panel: pd.DataFrame | PricePanel, universe) -> PricePanel:
+    return as_price_panel(panel).select(universe).dropna_rows().drop_empty_columns()
+
+
+class _SatelliteState:
+    """Tableaux pré-calculés d'un satellite : momentum glissant et rendements."""
+
+    def __init__(self, panel: PricePanel, universe, lookback: int, mom_panel=None,
+                 cov_engine: RollingCovariance | None = None, cov_window: int = COV_WINDOW, cov_method: str = "sample",
+                 ffill_limit: int = FFILL_LIMIT):
+        view = satellite_view(panel, universe)
+        self.dates = view.dates
+        self.tickers = np.array(view.tickers)
+        # panel de momentum précalculé (sweep) réutilisé s'il correspond bien à cette vue
+        if (mom_panel is None or lookback not in mom_panel.lookbacks
+                or not mom_panel.dates.equals(view.dates) or not mom_panel.tickers.equals(view.tickers)):
+            mom_panel = momentum_panel(view, lookbacks=(lookback,))
+        self.mom = mom_panel.values[mom_panel.lookbacks.index(lookback)]
+        # rendements alignés (NaN les jours fermés d'une place, voir price_panel.align_returns)
+        r, bridged = view.aligned_returns(ffill_limit)
+        r = r.astype(float, copy=False)
+        self.rets = r
+        self.bridged = bridged
+        # covariance glissante de tout l'univers : avancée de rebalancement en rebalancement
+        if (cov_engine is None or cov_engine.R.shape != r[1:].shape
+                or cov_engine.window != cov_window or cov_engine.method != cov_method):
+            cov_engine = RollingCovariance(r[1:], window=cov_window, method=cov_method)
+        self.cov_engine = cov_engine
+
+
+def _select_and_optimize(sat: _SatelliteState, d, lookback, top_k, risk_aversion, max_w_stock, cov_window, prev=None, ridge=1e-6):
+    """Étape intra-satellite à la date d. Retourne None si pas assez d'historique."""
+    pos = sat.dates.searchsorted(d, side="right") - 1
+    if pos < lookback:
+        return None
+    scores = sat.mom[pos]
+    order = top_k_indices(scores, top_k)
+    if order.size == 0:
+        return None
+
+    r_tr = sat.rets[1:pos + 1, order]
+    closed = sat.bridged[1:pos + 1, order]
+    keep = (~np.isnan(r_tr) | closed).all(axis=1) & ~closed.all(axis=1)
+    r_tr = np.where(closed, 0.0, r_tr)[keep][-cov_window:]
+    if len(r_tr) == 0:
+        return None
+    dates_tr = sat.dates[1:pos + 1][keep][-cov_window:]
+
+    mu = scores[order]
+    # fenêtre = rendements [pos - W, pos] du satellite (covariances par paire sur le Top K)
+    cov = sat.cov_engine.cov(order, end=pos) if len(r_tr) > 5 else np.eye(len(order)) * 1e-6
+    # warm start : poids du rebalancement précédent pour les titres déjà détenus
+    w0 = None if prev is None else np.array([prev.get(t, 1.0 / len(order)) for t in sat.tickers[order]])
+    w = optimize_mean_variance(mu=mu, cov=cov, risk_aversion=risk_aversion, max_weight=max_w_stock, min_weight=0.5 / top_k,
+                               ridge=ridge, w0=w0)
+    sat_mom = float(np.average(mu, weights=w)) if w.sum() > 0 else float(mu.mean())
+    return {
+        "tickers": sat.tickers[order],
+        "weights": w,
+        "mom": sat_mom,
+        "trailing": (dates_tr.values, r_tr @ w),
+    }
+
+
+def walk_forward(panel: pd.DataFrame | PricePanel, universes: dict, core_ticker: str, core_weight: float,
+                 lookback: int = 126, top_k: int = 5, risk_aversion: float = 7.0,
+                 max_w_stock: float = 0.40, max_w_sat: float = 0.60, freq: str = "M",
+                 cov_window: int = COV_WINDOW, cov_method: str = "sample", momentum: dict | None = None,
+                 covariance: dict | None = None, ffill_limit: int = FFILL_LIMIT) -> BacktestResult:
+    """
+    Backtest walk-forward sur un panel de prix (PricePanel ou DataFrame dates x tickers) contenant le cœur
+    et les univers des satellites ({clé satellite: [tickers]}).
+    cov_method : "sample", "ledoit-wolf" ou "ewma" (voir covariance.py).
+    ffill_limit : jours fermés consécutifs enjambés par titre (voir price_panel.align_returns).
+    momentum / covariance : {clé satellite: MomentumPanel / RollingCovariance} déjà construits
+    sur satellite_view (optionnel, réutilisés d'un appel à l'autre par le sweep).
+    Le backtest démarre au premier rebalancement où un satellite est exploitable ; si plus aucun
+    ne l'est à une date suivante, l'allocation précédente (cœur à core_weight) est reconduite.
+    """
+    # le shrinkage rend la covariance bien conditionnée : plus besoin du ridge
+    ridge = 1e-6 if cov_method == "sample" else 0.0
+    panel = as_price_panel(panel)
+    all_tickers = list(panel.tickers)
+    col_of = {t: i for i, t in enumerate(all_tickers)}
+
+    # rendements de détention : prix prolongés sur les jours fériés locaux (rendement nul ce jour-là)
+    hold = panel.frame().ffill().pct_change().replace([np.inf, -np.inf], np.nan).fillna(0.0).to_numpy(dtype=float)
+
+    momentum = momentum or {}
+    covariance = covariance or {}
+    sats = {
+        k: _SatelliteState(panel, u, lookback, momentum.get(k), covariance.get(k), cov_window, cov_method, ffill_limit)
+        for k, u in universes.items()
+    }
+    dates = rebalance_dates(panel.dates, freq)
+    dates = dates[dates < panel.dates[-1]]
+
+    rebal_rows = []
+    sat_w_rows = []
+    prev_w_sats = None
+    for d in dates:
+        intra = {}
+        for k, sat in sats.items():
+            prev = sat_w_rows[-1][1].get(k) if sat_w_rows else None
+            res = _select_and_optimize(sat, d, lookback, top_k, risk_aversion, max_w_stock, cov_window, prev, ridge)
+            if res is not None:
+                intra[k] = res
+
+        if not intra:
+            # pas encore assez d'historique : on ne démarre qu'au premier satellite exploitable.
+            # Plus aucun satellite exploitable en cours de route : allocation précédente reconduite
+            # (cœur à core_weight, comme l'app, et pas 100 % cœur)
+            if rebal_rows:
+                rebal_rows.append((d, rebal_rows[-1][1]))
+                sat_w_rows.append((d, sat_w_rows[-1][1]))
+            continue
+
+        valid = list(intra)
+        mu_sats = np.array([intra[k]["mom"] for k in valid])
+        mu_sats = np.where(np.isfinite(mu_sats), mu_sats, 0.0)
+        # séries satellites sur leur calendrier union (NaN les jours fermés : covariance par paire)
+        _, rets, _ = align_series([intra[k]["trailing"] for k in valid])
+        n_obs = int((~np.isnan(rets)).all(axis=1).sum())
+        cov_sats = estimate_cov(rets, method=cov_method) if n_obs > 5 else np.eye(len(valid)) * 1e-6
+        prev_sats = prev_w_sats if prev_w_sats is not None and set(prev_w_sats) == set(valid) else None
+        w_sats = optimize_mean_variance(mu=mu_sats, cov=cov_sats, risk_aversion=risk_aversion,
+                                        max_weight=max_w_sat, min_weight=0.5 / len(valid), ridge=ridge,
+                                        w0=None if prev_sats is None else np.array([prev_sats[k] for k in valid]))
+        prev_w_sats = dict(zip(valid, w_sats))
+
+        final = {core_ticker: float(core_weight)}
+        sat_w = {}
+        for k, ws in zip(valid, w_sats):
+            sat_w[k] = dict(zip(intra[k]["tickers"], intra[k]["weights"]))
+            for t, wi in sat_w[k].items():
+                final[t] = final.get(t, 0.0) + (1.0 - core_weight) * ws * wi
+        rebal_rows.append((d, final))
+        sat_w_rows.append((d, sat_w))
+
+    if not rebal_rows:
+        empty = pd.Series(dtype=float)
+        return BacktestResult(empty, empty, pd.DataFrame(), pd.DataFrame(), empty, annualize_stats(empty))
+
+    # matrice des poids (rebalancements x tickers), appliquée par blocs de dates
+    reb_dates = pd.DatetimeIndex([d for d, _ in rebal_rows])
+    W = np.zeros((len(rebal_rows), len(all_tickers)))
+    for i, (_, final) in enumerate(rebal_rows):
+        for t, w in final.items():
+            W[i, col_of[t]] = w
+
+    start = panel.dates.searchsorted(reb_dates[0], side="right")
+    idx = panel.dates[start:]
+    # poids en vigueur le jour t = dernier rebalancement strictement avant t
+    which = reb_dates.searchsorted(idx, side="left") - 1
+    H = hold[start:]
+    port = pd.Series(np.einsum("ij,ij->i", W[which], H), index=idx)
+
+    core_ret = pd.Series(H[:, col_of[core_ticker]], index=idx)
+    sat_cols = {}
+    for k in universes:
+        Wk = np.zeros_like(W)
+        for i, (_, sat_w) in enumerate(sat_w_rows):
+            for t, w in sat_w.get(k, {}).items():
+                Wk[i, col_of[t]] = w
+        sat_cols[k] = np.einsum("ij,ij->i", Wk[which], H)
+    sat_rets = pd.DataFrame(sat_cols, index=idx)
+
+    weights = pd.DataFrame(W, index=reb_dates, columns=all_tickers)
+    weights = weights.loc[:, (weights != 0).any()]
+    turnover = pd.Series(0.5 * np.abs(np.diff(W, axis=0)).sum(axis=1), index=reb_dates[1:])
+
+    stats = annualize_stats(port)
+    per_year = {"M": 12, "Q": 4}.get(freq, 12)
+    stats["max_dd"] = max_drawdown(port)
+    stats["turnover"] = float(turnover.mean() * per_year) if not turnover.empty else 0.0
+    return BacktestResult(port, core_ret, sat_rets, weights, turnover, stats)
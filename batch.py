@@ -0,0 +1,248 @@
+import argparse
+import csv
+import json
+import os
+import time
+from dataclasses import dataclass
+
+import pandas as pd
+
+from catalog import CORE_MAP, DEFAULT_PROFILE_PARAMS, PROFILE_PARAMS, SAT_UNIVERSE, is_large_universe
+from covariance import COV_METHODS
+from pipeline import (PortfolioResult, SatelliteParams, combine_satellites, map_satellites, run_large_satellite,
+                      run_satellite)
+from quant import LOOKBACKS, momentum_panel, pct_returns
+from tracing import span
+
+# ============================================================
+# Mode batch sans interface : listes d'achat de nombreux clients en un passage
+# ============================================================
+# python batch.py clients.csv --out listes_achat.csv
+# Les clients ne diffèrent que par le profil KYC, le cœur et les satellites choisis :
+# prix et momentum sont lus une fois par (satellite, start), chaque sélection Top K +
+# optimisation intra une fois par (satellite, start, paramètres). Il ne reste par client
+# que le petit QP inter-satellites : le temps suit le nombre de configurations distinctes.
+
+DEFAULTS = {"start": "2015-01-01", "lookback": 126, "top_k": 5, "max_w_stock": 0.40, "max_w_sat": 0.60,
+            "cov_method": "sample"}
+
+
+@dataclass(frozen=True)
+class ClientSpec:
+    client: str
+    profile: str
+    core: str                       # clé de CORE_MAP
+    sats: tuple                     # clés satellites, ordre du catalogue
+    start: str = DEFAULTS["start"]
+    lookback: int = DEFAULTS["lookback"]
+    top_k: int = DEFAULTS["top_k"]
+    max_w_stock: float = DEFAULTS["max_w_stock"]
+    max_w_sat: float = DEFAULTS["max_w_sat"]
+    cov_method: str = DEFAULTS["cov_method"]
+    core_weight: float | None = None   # à défaut, poids du cœur du profil
+
+    @property
+    def profile_params(self) -> tuple:
+        return PROFILE_PARAMS.get(self.profile, DEFAULT_PROFILE_PARAMS)
+
+    @property
+    def weight_of_core(self) -> float:
+        return self.profile_params[0] if self.core_weight is None else float(self.core_weight)
+
+    @property
+    def params(self) -> SatelliteParams:
+        # mêmes paramètres que l'app : min intra dynamique (50% de 1/K), aversion du profil
+        return SatelliteParams(lookback=self.lookback, top_k=self.top_k, risk_aversion=self.profile_params[1],
+                               max_w_stock=self.max_w_stock, min_w_stock=0.5 / self.top_k, cov_method=self.cov_method)
+
+
+NO_PROFILE = "Non défini"   # profil absent : paramètres par défaut (DEFAULT_PROFILE_PARAMS), comme dans l'app
+
+
+def validate_spec(spec: ClientSpec) -> None:
+    """
+    Paramètres qu'un calcul ne pourrait pas honorer -> ValueError (message avec le client).
+    Partagé par load_clients et api.parse_request : une faute de frappe n'est jamais remplacée
+    silencieusement par une valeur par défaut.
+    """
+    who = f"client {spec.client} : " if spec.client else ""
+    if spec.profile not in PROFILE_PARAMS and spec.profile != NO_PROFILE:
+        raise ValueError(f"{who}profil inconnu {spec.profile!r} (choix : {list(PROFILE_PARAMS)})")
+    if spec.lookback not in LOOKBACKS:
+        raise ValueError(f"{who}lookback {spec.lookback} non calculé (choix : {list(LOOKBACKS)})")
+    if spec.top_k < 1:
+        raise ValueError(f"{who}top_k doit être >= 1 (reçu {spec.top_k})")
+    if spec.cov_method not in COV_METHODS:
+        raise ValueError(f"{who}cov_method inconnu {spec.cov_method!r} (choix : {list(COV_METHODS)})")
+    if not (0.0 < spec.max_w_stock <= 1.0 and 0.0 < spec.max_w_sat <= 1.0 and 0.0 <= spec.weight_of_core <= 1.0):
+        raise ValueError(f"{who}poids hors de [0, 1] (max_w_stock, max_w_sat, core_weight)")
+
+
+def client_spec(row: dict) -> ClientSpec:
+    """Une ligne (CSV ou objet JSON) -> ClientSpec ; les satellites peuvent être séparés par ';', ',' ou espaces."""
+    row = {k.strip(): v for k, v in row.items() if k and v not in (None, "")}
+    if "client" not in row:
+        raise ValueError("champ client manquant")
+    sats = row.get("sats", [])
+    if isinstance(sats, str):
+        sats = sats.replace(";", " ").replace(",", " ").split()
+    sats = {str(k).strip().upper() for k in sats}
+    unknown = sats - set(SAT_UNIVERSE)
+    if unknown:
+        raise ValueError(f"client {row.get('client')} : satellites inconnus {sorted(unknown)}")
+    if row.get("core") not in CORE_MAP:
+        raise ValueError(f"client {row.get('client')} : cœur inconnu {row.get('core')!r} (choix : {list(CORE_MAP)})")
+    casts = {"lookback": int, "top_k": int, "max_w_stock": float, "max_w_sat": float, "core_weight": float}
+    try:
+        extra = {k: casts.get(k, str)(row[k]) for k in (*DEFAULTS, "core_weight") if k in row}
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"client {row['client']} : valeur numérique invalide ({e})") from None
+    spec = ClientSpec(client=str(row["client"]), profile=str(row.get("profile", NO_PROFILE)), core=row["core"],
+                      sats=tuple(k for k in SAT_UNIVERSE if k in sats), **extra)
+    validate_spec(spec)
+    return spec
+
+
+def load_clients(path: str) -> list:
+    """
+    Fichier de clients : .json (liste d'objets) ou .csv (en-tête), champs client, profile, core, sats
+    et, optionnels, start, lookback, top_k, max_w_stock, max_w_sat, cov_method, core_weight.
+    Toutes les lignes sont vérifiées avant le calcul : lignes invalides et noms de client en double
+    sont signalés ensemble (ValueError), aucun client n'est calculé.
+    """
+    is_json = path.lower().endswith(".json")
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        rows = json.load(f) if is_json else list(csv.DictReader(f))
+    if not isinstance(rows, list):
+        raise ValueError(f"{path} : une liste de clients est attendue")
+    clients, errors, seen = [], [], {}
+    for i, row in enumerate(rows):
+        where = f"entrée {i + 1}" if is_json else f"ligne {i + 2}"   # ligne 1 = en-tête du CSV
+        try:
+            if not isinstance(row, dict):
+                raise ValueError("objet attendu")
+            c = client_spec(row)
+        except ValueError as e:
+            errors.append(f"{where} : {e}")
+            continue
+        if c.client in seen:
+            errors.append(f"{where} : client {c.client} en double (déjà en {seen[c.client]})")
+            continue
+        seen[c.client] = where
+        clients.append(c)
+    if errors:
+        raise ValueError(f"{path} : {len(errors)} ligne(s) invalide(s)\n  " + "\n  ".join(errors))
+    return clients
+
+
+def resolve_core(store, health, core_choice: str, start: str):
+    """Première cotation du cœur avec des données (cotation retenue d'abord) -> (ticker, rendements)."""
+    listings = CORE_MAP[core_choice]
+    known = health.core_listing(core_choice, listings) if health is not None else None
+    for candidates in ([known] if known is not None else [], listings):
+        if not candidates:
+            continue
+        panel = store.get_panel(candidates, start=start)
+        for t in candidates:
+            p = panel.select([t]).dropna_rows()
+            if not p.empty:
+                if health is not None:
+                    health.set_core_listing(core_choice, t)
+                return t, pct_returns(p).iloc[:, 0]
+    return None, pd.Series(dtype=float)
+
+
+def run_batch(clients, store, health=None, max_workers: int | None = None) -> dict:
+    """
+    Portefeuilles de tous les clients ({client: PortfolioResult ou None}).
+    store : PriceStore (get_panel), health : TickerHealth optionnel (cotation cœur retenue).
+    """
+    clients = list(clients)
+    sat_keys = list(dict.fromkeys((k, c.start) for c in clients for k in c.sats))
+    jobs = list(dict.fromkeys((k, c.start, c.params) for c in clients for k in c.sats))
+    cores = list(dict.fromkeys((c.core, c.start) for c in clients))
+
+    with span("batch.load", sats=len(sat_keys)):
+        # grands univers : lus par lots dans run_large_satellite, pas de panel complet
+        small = [sk for sk in sat_keys if not is_large_universe(sk[0])]
+        prices = dict(zip(small, map_satellites(
+            lambda sk: store.get_panel(SAT_UNIVERSE[sk[0]], start=sk[1]).dropna_rows(), small, max_workers)))
+        moms = dict(zip(small, map_satellites(
+            lambda sk: momentum_panel(prices[sk], lookbacks=LOOKBACKS) if not prices[sk].empty else None,
+            small, max_workers)))
+        core = {ck: resolve_core(store, health, *ck) for ck in cores}
+
+    def satellite(job):
+        k, start, params = job
+        if is_large_universe(k):
+            return run_large_satellite(k, SAT_UNIVERSE[k],
+                                       lambda ts, dtype: store.get_panel(ts, start=start, dtype=dtype).dropna_rows(),
+                                       params)
+        return run_satellite(k, prices[(k, start)], params, moms[(k, start)])
+
+    with span("batch.satellites", jobs=len(jobs)):
+        sat_results = dict(zip(jobs, map_satellites(satellite, jobs, max_workers)))
+
+    out = {}
+    with span("batch.clients", clients=len(clients)):
+        for c in clients:
+            core_ticker, core_ret = core[(c.core, c.start)]
+            if core_ticker is None or not c.sats:
+                out[c.client] = None
+                continue
+            results = [sat_results[(k, c.start, c.params)] for k in c.sats]
+            out[c.client] = combine_satellites(results, core_ticker, core_ret, c.weight_of_core,
+                                               c.params.risk_aversion, c.max_w_sat, cov_method=c.cov_method)
+    return out
+
+
+def buy_lists(clients, portfolios: dict, names=None) -> pd.DataFrame:
+    """Toutes les listes d'achat en un tableau long (un client par bloc, poids décroissants)."""
+    rows = []
+    for c in clients:
+        pf: PortfolioResult | None = portfolios.get(c.client)
+        if pf is None:
+            continue
+        for t, w in sorted(pf.positions.items(), key=lambda kv: -kv[1]):
+            rows.append({"Client": c.client, "Profil": c.profile, "Cœur": c.core, "Ticker": t, "Poids": w})
+    df = pd.DataFrame(rows, columns=["Client", "Profil", "Cœur", "Ticker", "Poids"])
+    if names is not None and not df.empty:
+        tickers = df["Ticker"].unique().tolist()
+        df.insert(3, "Titre", df["Ticker"].map(dict(zip(tickers, names(tickers)))))
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Listes d'achat Momentum-X pour un fichier de clients (sans interface).")
+    parser.add_argument("clients", help="fichier .csv ou .json de clients")
+    parser.add_argument("--out", default="listes_achat.csv")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--no-names", action="store_true", help="n'interroge pas les noms des titres")
+    args = parser.parse_args()
+
+    from price_store import PriceStore
+    from ticker_health import TickerHealth
+    from ticker_meta import TickerMetaCache
+
+    try:
+        clients = load_clients(args.clients)
+    except ValueError as e:
+        raise SystemExit(str(e)) from None
+    t0 = time.perf_counter()
+    health = TickerHealth()
+    portfolios = run_batch(clients, PriceStore(health=health), health, max_workers=args.workers)
+    df = buy_lists(clients, portfolios, names=None if args.no_names else TickerMetaCache().names)
+
+    tmp = args.out + ".tmp"
+    df.to_csv(tmp, index=False, encoding="utf-8")
+    os.replace(tmp, args.out)
+    configs = len({(k, c.start, c.params) for c in clients for k in c.sats})
+    print(f"{len(clients)} clients, {configs} configurations satellite distinctes, "
+          f"{time.perf_counter() - t0:.1f} s -> {args.out}")
+    for c in clients:
+        if portfolios.get(c.client) is None:
+            print(f"  {c.client} : aucun portefeuille (cœur sans données ou aucun satellite exploitable)")
+
+
+if __name__ == "__main__":
+    main()
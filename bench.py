@@ -0,0 +1,217 @@
+import argparse
+import json
+import os
+import platform
+import socket
+import statistics
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from covariance import COV_METHODS, estimate_cov
+from pipeline import SatelliteParams, run_large_satellite, run_satellites
+from price_panel import PricePanel
+from quant import momentum_score, optimize_mean_variance, pct_returns
+from risk import simulate_portfolio
+from synthetic import synthetic_universes
+
+# ============================================================
+# Benchmarks hors ligne (marché synthétique, aucun accès réseau)
+# ============================================================
+# python bench.py                 -> mesure et compare à bench_baseline.json (code retour 1 si régression)
+# python bench.py --save          -> réécrit la baseline
+# python bench.py --sizes sat 1k  -> tailles à mesurer ("sat" = paniers du catalogue, 1k / 10k tickers)
+# Les durées absolues dépendent de la machine : chaque mesure est rapportée au temps d'un noyau de
+# référence (BLAS, tri, boucle Python) chronométré dans le même run, et la baseline garde ces ratios.
+# Une mesure régresse si médiane > ratio de baseline * référence du run * seuil + BASE_SLACK_S
+# (le bruit domine sous la ms).
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_baseline.json")
+DEFAULT_THRESHOLD = 1.5
+BASE_SLACK_S = 0.002
+SIZES = {"sat": (0, 10.0), "1k": (1_000, 3.0), "10k": (10_000, 2.0)}   # (tickers en plus, années)
+TOP_K = 5
+LOOKBACK = 126
+
+
+@contextmanager
+def _no_network():
+    """Toute tentative de connexion pendant les benchmarks est une erreur."""
+    def refuse(*args, **kwargs):
+        raise RuntimeError("accès réseau interdit pendant les benchmarks")
+
+    saved = socket.socket.connect, socket.create_connection
+    socket.socket.connect, socket.create_connection = refuse, refuse
+    try:
+        yield
+    finally:
+        socket.socket.connect, socket.create_connection = saved
+
+
+def _time(fn, repeats: int) -> dict:
+    fn()   # échauffement (caches, allocations)
+    runs = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        runs.append(time.perf_counter() - t0)
+    return {"median_s": statistics.median(runs), "min_s": min(runs), "repeats": repeats}
+
+
+def _reference_kernel():
+    """Charge fixe, du même genre que les cas mesurés : produit matriciel, tri, boucle Python."""
+    rng = np.random.default_rng(0)
+    a = rng.standard_normal((300, 300))
+    x = rng.standard_normal(1_000_000)
+
+    def run():
+        a @ a
+        np.sort(x)
+        sum(i * i for i in range(100_000))
+    return run
+
+
+def _cases(size: str) -> dict:
+    """{nom: callable} pour une taille ; les données sont générées ici, hors chronométrage."""
+    n_extra, years = SIZES[size]
+    panel, universes = synthetic_universes(n_extra=n_extra, years=years)
+    if size != "sat":
+        universes = {"SYN": universes["SYN"]}
+    views = {k: panel[u].dropna(how="all") for k, u in universes.items()}
+    big = max(views.values(), key=lambda v: v.shape[1])
+    panels = {k: PricePanel.from_frame(v) for k, v in views.items()}
+    big32 = PricePanel.from_frame(big, dtype=np.float32)
+    panels_big = PricePanel.from_frame(big)
+
+    # Top K et fenêtre de rendements de chaque univers, pour isoler covariance et optimisation
+    tops = {}
+    for k, v in views.items():
+        top = momentum_score(v, LOOKBACK).dropna().sort_values(ascending=False).head(TOP_K).index
+        mu = momentum_score(v, LOOKBACK).reindex(top).fillna(0.0).values
+        tops[k] = (mu, pct_returns(v[top]).dropna(how="any").tail(252).values)
+    covs = {k: estimate_cov(r) for k, (_, r) in tops.items()}
+    params = SatelliteParams(lookback=LOOKBACK, top_k=TOP_K, min_w_stock=0.5 / TOP_K)
+
+    cases = {
+        "pct_returns": lambda: pct_returns(big),
+        "momentum_score": lambda: momentum_score(big, LOOKBACK),
+        "optimize_mean_variance": lambda: [
+            optimize_mean_variance(mu, covs[k], 6.0, max_weight=0.40, min_weight=0.5 / TOP_K)
+            for k, (mu, _) in tops.items()
+        ],
+        "pipeline": lambda: run_satellites(list(views), views.get, params, max_workers=1),
+        "pipeline_price_panel": lambda: run_satellites(list(panels), panels.get, params, max_workers=1),
+        # panel neuf à chaque appel : on mesure aussi le calcul des rendements (mis en cache par le panel)
+        "momentum_score_f32": lambda: momentum_score(PricePanel(big32.values, big32.dates, big32.tickers), LOOKBACK),
+        # grand univers parcouru par lots (le chargement est une sélection de colonnes, comme le store)
+        "pipeline_large": lambda: run_large_satellite(
+            "SYN", list(big.columns), lambda ts, dtype: panels_big.select(ts).astype(dtype), params),
+    }
+    if size == "sat":
+        # 100k chemins sur 10 ans d'un portefeuille équipondéré (indépendant de la taille d'univers)
+        port = pct_returns(big).mean(axis=1)
+        cases["risk_bootstrap_100k"] = lambda: simulate_portfolio(port, n_paths=100_000, workers=1)
+    for method in COV_METHODS:
+        cases[f"cov_topk_{method}"] = lambda m=method: [estimate_cov(r, method=m) for _, r in tops.values()]
+    if size != "10k":
+        # covariance de tout l'univers : N x N, trop lourd (mémoire) à 10k
+        r_big = pct_returns(big).tail(252).values
+        cases["cov_universe_sample"] = lambda: estimate_cov(r_big)
+    return {f"{name}/{size}": fn for name, fn in cases.items()}
+
+
+def run_benchmarks(sizes=("sat", "1k"), repeats: int = 5) -> tuple:
+    """-> ({cas: mesure avec ratio à la référence}, durée de référence du run en secondes)."""
+    reference = _reference_kernel()
+    results = {}
+    with _no_network():
+        ref_s = _time(reference, 7)["median_s"]
+        for size in sizes:
+            for name, fn in _cases(size).items():
+                results[name] = _time(fn, repeats if size == "sat" else max(1, repeats // 2))
+                print(f"{name:<36} {results[name]['median_s'] * 1e3:10.2f} ms", flush=True)
+        # référence rechronométrée en fin de run : on garde la plus rapide (machine moins chargée)
+        ref_s = min(ref_s, _time(reference, 7)["median_s"])
+    print(f"{'référence':<36} {ref_s * 1e3:10.2f} ms", flush=True)
+    for r in results.values():
+        r["ratio"] = r["median_s"] / ref_s
+    return results, ref_s
+
+
+def load_baseline(path: str = BASELINE_PATH) -> dict:
+    if not os.path.exists(path):
+        return {"default_threshold": DEFAULT_THRESHOLD, "cases": {}}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_baseline(results: dict, ref_s: float, path: str = BASELINE_PATH) -> None:
+    old = load_baseline(path)
+    cases = {
+        name: {"ratio": r["ratio"], "repeats": r["repeats"],
+               "threshold": old["cases"].get(name, {}).get("threshold", old.get("default_threshold", DEFAULT_THRESHOLD))}
+        for name, r in results.items()
+    }
+    data = {
+        "meta": {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "reference_s": ref_s,   # pour information : seuls les ratios servent à la comparaison
+        },
+        "default_threshold": old.get("default_threshold", DEFAULT_THRESHOLD),
+        # cas d'une ancienne baseline en secondes absolues : retirés (comparables seulement sur leur machine)
+        "cases": {**{k: v for k, v in old["cases"].items() if "ratio" in v}, **cases},
+    }
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+        f.write("\n")
+    os.replace(tmp, path)
+
+
+def compare(results: dict, baseline: dict, ref_s: float) -> list:
+    """Retourne la liste des régressions (nom, médiane, limite) ; limite = ratio de baseline x référence du run."""
+    regressions = []
+    for name, r in results.items():
+        ref = baseline["cases"].get(name)
+        if ref is None or "ratio" not in ref:
+            continue
+        threshold = ref.get("threshold", baseline.get("default_threshold", DEFAULT_THRESHOLD))
+        limit = ref["ratio"] * ref_s * threshold + BASE_SLACK_S
+        if r["median_s"] > limit:
+            regressions.append((name, r["median_s"], limit))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks Momentum-X hors ligne (marché synthétique).")
+    parser.add_argument("--sizes", nargs="+", default=["sat", "1k"], choices=list(SIZES))
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save", action="store_true", help="écrit les mesures comme nouvelle baseline")
+    args = parser.parse_args()
+
+    results, ref_s = run_benchmarks(args.sizes, args.repeats)
+    if args.save:
+        save_baseline(results, ref_s, args.baseline)
+        print(f"baseline écrite : {args.baseline}")
+        return
+
+    regressions = compare(results, load_baseline(args.baseline), ref_s)
+    for name, median, limit in regressions:
+        print(f"RÉGRESSION {name}: {median * 1e3:.2f} ms > {limit * 1e3:.2f} ms")
+    if regressions:
+        sys.exit(1)
+    print("aucune régression")
+
+
+if __name__ == "__main__":
+    main()
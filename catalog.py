@@ -0,0 +1,113 @@
+import csv
+import os
+
+# Catalogue Momentum-X (ETF cœur, satellites, profils KYC), sans Streamlit :
+# partagé par l'app, le backtest et les scripts.
+
+# ============================================================
+# CORE ETFs (Yahoo tickers)
+# ============================================================
+CORE_MAP = {
+    "S&P 500 (CSPX)": ["CSPX.L", "CSPX.AS"],
+    "Euro Stoxx 50 (CSSX5E)": ["CSSX5E.MI", "CSSX5E.SW"],
+    "MSCI World (SWDA)": ["SWDA.L", "SWDA.MI", "SWDA.SW"],
+}
+
+# ============================================================
+# SATELLITES
+# ============================================================
+SATELLITES = [
+    {"name": "Emerging Markets (stocks)", "key": "EM", "geo": "Global EM", "desc": "Sélection momentum sur gros EM (actions/ADR)"},
+    {"name": "Commodities (futures)", "key": "METALS", "geo": "Global", "desc": "Sélection momentum sur futures matières premières"},
+    {"name": "Banks", "key": "BANKS", "geo": "Global", "desc": "Sélection momentum sur banques (US/Europe/Asie)"},
+    {"name": "Tech / IA", "key": "TECH", "geo": "Global", "desc": "Sélection momentum sur Big Tech / Semi / Software"},
+    {"name": "Defense", "key": "DEF", "geo": "Global", "desc": "Sélection momentum sur défense/aérospatial"},
+    {"name": "Energy", "key": "ENERGY", "geo": "Global", "desc": "Sélection momentum sur oil & gas (US/Europe/Canada/Asie)"},
+]
+
+SAT_UNIVERSE = {
+    "EM": ["2330.TW","2317.TW","2454.TW","2881.TW","2882.TW","2891.TW","2303.TW","3711.TW","2884.TW","3231.TW","2327.TW","2601.TW","1216.TW","1109.TW","2880.TW","0700.HK","9988.HK","0939.HK","1810.HK","2318.HK","0999.HK","1211.HK","9961.HK","3988.HK","0386.HK","2628.HK","1398.HK","9618.HK","3690.HK","2899.HK","0883.HK","0688.HK","0669.HK","2388.HK","0288.HK","1928.HK","1378.HK","005930.KS","000660.KS","051910.KS","035420.KS","012450.KS","005935.KS","068270.KS","000270.KS","105560.KS","HDFCBANK.NS","RELIANCE.NS","INFY.NS","BHARTIARTL.NS","ICICIBANK.NS","LT.NS","TCS.NS","AXISBANK.NS","BAJFINANCE.NS","MARUTI.NS","HINDUNILVR.NS","SUNPHARMA.NS","WIPRO.NS","ITC.NS","TITAN.NS","ULTRACEMCO.NS","NTPC.NS","ONGC.NS","ADANIENT.NS","VALE3.SA","PETR4.SA","ITSA4.SA","BBDC4.SA","ABEV3.SA","WEGE3.SA","HAPV3.SA","SBSP3.SA","AMXB.MX","FEMSAUBD.MX","WALMEX.MX","GMEXICOB.MX","PE&OLES.MX","GAPB.MX","NPN.JO","ANG.JO","MTN.JO","SBK.JO","2222.SR","1120.SR","1180.SR","2010.SR","2020.SR","EMIRATESDU.AE","PKO.WA","OTP.BD","CEZ.PR"],
+    "METALS": ["GC=F","SI=F","NG=F","HG=F","BZ=F","ZS=F","CL=F","ZC=F","ALI=F","LE=F","ZL=F","ZM=F","KC=F","ZW=F","SB=F","HO=F","RB=F","HE=F","KE=F","CT=F"],
+    "BANKS": ["JPM","BAC","WFC","C","GS","MS","PNC","USB","TFC","SCHW","BK","STT","NTRS","FITB","HBAN","CFG","CMA","MTB","KEY","RF","RY.TO","TD.TO","BNS.TO","BMO.TO","CM.TO","NA.TO","CIBC.TO","HSBA.L","LLOY.L","NWG.L","STAN.L","BARC.L","BNP.PA","GLE.PA","ACA.PA","SAN.MC","BBVA.MC","INGA.AS","DBK.DE","CBK.DE","UCG.MI","ISP.MI","BAMI.MI","SAB.MC","ABN.AS","KBC.BR","SWED-A.ST","SEB-A.ST","DANSKE.CO","NDA-FI.HE","NDA-SE.ST","UBSG.SW","BCVN.SW","MFG","SMFG","MUFG","DBS.SI","UOB.SI","OCBC.SI","8306.T","8316.T","8411.T","ITUB","BBD","BBAS","SAN","IBN","HDFC","KB","BBCA.JK","BMRI.JK"],
+    "TECH": ["NVDA","AAPL","MSFT","AVGO","PLTR","AMD","ORCL","MU","CSCO","IBM","CRM","INTC","ADBE","TXN","ANET","ADI","PANW","CRWD","SNPS","CDNS","QCOM","ACN","NOW","INTU","WDAY","MRVL","DELL","MSTR","KEYS","NET","DDOG","MDB","HPE","TER","ASML.AS","SAP.DE","STM.PA","IFX.DE","NOKIA.HE","ERIC-B.ST","CAP.PA","DSY.PA","ATE.PA","RNE.PA","8035.T","6857.T","6723.T","6702.T","6701.T","6762.T","7751.T","8056.T","4307.T","4704.T","4684.T","7735.T","4709.T","4768.T","4716.T","2330.TW","2303.TW","3711.TW","3034.TW","005930.KS","000660.KS","BABA","BIDU","TCEHY","LOGN.SW","SGE.L","NICE","NEM.DE"],
+    "DEF": ["GE","RTX","BA","AIR.PA","RR.L","SAF.PA","LMT","RHM.DE","HWM","NOC","GD","TDG","BA.L","LHX","AXON","RKLB","HO.PA","LDO.MI","MTX.DfE","HEI","SAAB-B.ST","ESLT","TXT","BBD-B.TO","HEI.A","KOG.OL","S63.SI","MRO.L","CAE.TO","AM.PA","HAG.DE"],
+    "ENERGY": ["XOM","CVX","COP","EOG","OXY","SLB","HAL","KMI","WMB","PSX","MPC","VLO","OKE","DVN","HES","FANG","APA","SHEL.L","BP.L","TTE","EQNR","REP.MC","ENI.MI","GALP.LS","CNQ.TO","SU.TO","TRP.TO","IMO.TO","PETRONAS.KL","PTT.BK","STO.AX","Santos.AX","YPF","PBR","AKRBP.OL","OMV.VI","KEY.TO"],
+} #on voudrait avoir les noms associés à chaque tickers
+
+# ============================================================
+# PROFILS KYC -> (poids du cœur par défaut, aversion au risque)
+# ============================================================
+PROFILE_PARAMS = {
+    "Prudent": (0.80, 12.0),
+    "Équilibré": (0.65, 6.0),
+    "Dynamique": (0.50, 2.5),
+}
+DEFAULT_PROFILE_PARAMS = (0.70, 7.0)   # profil non défini
+
+
+def profile_of_score(score: int) -> str:
+    # score total du questionnaire KYC (5 questions notées de 1 à 5) -> profil
+    if score <= 12:
+        return "Prudent"
+    if score <= 18:
+        return "Équilibré"
+    return "Dynamique"
+
+
+# horizon du questionnaire KYC -> années simulées par défaut (moteur de risque)
+KYC_HORIZON_YEARS = {"Moins de 1 an": 1, "1 à 3 ans": 3, "3 à 5 ans": 5, "5 à 10 ans": 10, "Plus de 10 ans": 10}
+
+# ============================================================
+# UNIVERS EN FICHIERS (grands univers : MSCI EM, Russell 1000, Stoxx 600...)
+# ============================================================
+# Un fichier par univers dans UNIVERSE_DIR, la clé satellite = nom du fichier en majuscules :
+#   - .txt : un ticker Yahoo par ligne (lignes vides et "# commentaires" ignorées)
+#   - .csv : colonne "ticker" (ou "symbol"), sinon la première colonne
+# Au-delà de LARGE_UNIVERSE_MIN tickers, le satellite passe en mode grand univers
+# (scoring par lots, voir pipeline.run_large_satellite).
+UNIVERSE_DIR = os.environ.get(
+    "MOMENTUMX_UNIVERSE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "universes"),
+)
+LARGE_UNIVERSE_MIN = 300
+
+
+def load_universe_file(path: str) -> list:
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        if path.lower().endswith(".csv"):
+            rows = list(csv.reader(f))
+            if not rows:
+                return []
+            header = [h.strip().lower() for h in rows[0]]
+            col = next((header.index(c) for c in ("ticker", "symbol") if c in header), None)
+            body = rows[1:] if col is not None else rows
+            col = col or 0
+            tickers = [r[col].strip() for r in body if len(r) > col]
+        else:
+            tickers = [line.split("#", 1)[0].strip() for line in f]
+    return list(dict.fromkeys(t for t in tickers if t))
+
+
+def file_universes(directory: str = UNIVERSE_DIR) -> dict:
+    if not os.path.isdir(directory):
+        return {}
+    out = {}
+    for fname in sorted(os.listdir(directory)):
+        stem, ext = os.path.splitext(fname)
+        if ext.lower() in (".txt", ".csv"):
+            tickers = load_universe_file(os.path.join(directory, fname))
+            if tickers:
+                out[stem.strip().upper()] = tickers
+    return out
+
+
+def is_large_universe(sat_key: str) -> bool:
+    return len(SAT_UNIVERSE.get(sat_key, [])) >= LARGE_UNIVERSE_MIN
+
+
+# les univers en fichiers s'ajoutent au catalogue (sans écraser les satellites codés en dur)
+for _key, _tickers in file_universes().items():
+    if _key not in SAT_UNIVERSE:
+        SAT_UNIVERSE[_key] = _tickers
+        SATELLITES.append({"name": _key, "key": _key, "geo": "Fichier",
+                           "desc": f"Univers chargé depuis {UNIVERSE_DIR} ({len(_tickers)} tickers)"})
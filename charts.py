@@ -0,0 +1,130 @@
+import numpy as np
+import pandas as pd
+
+# ============================================================
+# Données des graphiques : réduction côté serveur avant envoi au navigateur
+# ============================================================
+# Une série journalière depuis 2015 fait ~2 800 points par courbe, plusieurs courbes par
+# graphique : tout part en JSON vers le navigateur alors qu'un écran n'affiche qu'un point
+# par pixel de large. On réduit chaque série à ~largeur_px points en gardant sa forme :
+# - LTTB (Largest-Triangle-Three-Buckets) pour les niveaux et métriques : dans chaque paquet,
+#   le point qui forme le plus grand triangle avec ses voisins retenus (pics et creux visibles) ;
+# - min/max par paquet pour les drawdowns : chaque creux local est gardé tel quel ;
+# - dans tous les cas, premier/dernier point, extrêmes globaux et, pour une richesse ou un
+#   drawdown, le plus haut et le creux du drawdown max sont ajoutés aux points retenus :
+#   les valeurs lues au survol sont exactes, pas interpolées.
+# Au-delà de WEBGL_MIN_POINTS points par graphique, tracé WebGL (scattergl) au lieu de SVG.
+
+CHART_WIDTH_PX = 1600
+CHART_WIDTHS = (800, 1200, 1600, 2400, 3840)
+POINTS_PER_PX = 1.0
+MIN_POINTS = 200
+WEBGL_MIN_POINTS = 5_000
+REDUCE_METHODS = ("lttb", "minmax")
+SERIES_KINDS = ("level", "drawdown", "metric")
+
+
+def target_points(width_px: int) -> int:
+    """Nombre de points par série pour une largeur d'affichage donnée."""
+    return max(MIN_POINTS, int(width_px * POINTS_PER_PX))
+
+
+def lttb_indices(y: np.ndarray, n_out: int) -> np.ndarray:
+    """Indices retenus par LTTB (abscisses régulières : une ligne = un jour de bourse)."""
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    # n_out - 2 paquets entre le premier et le dernier point, qui sont toujours gardés
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    out = np.empty(n_out, dtype=int)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            nxt_x = 0.5 * (edges[i + 1] + edges[i + 2] - 1)
+            nxt_y = y[edges[i + 1]:edges[i + 2]].mean()
+        else:
+            nxt_x, nxt_y = n - 1, y[-1]
+        xs = np.arange(lo, hi)
+        area = np.abs((a - nxt_x) * (y[lo:hi] - y[a]) - (a - xs) * (nxt_y - y[a]))
+        a = lo + int(np.argmax(area))
+        out[i + 1] = a
+    return out
+
+
+def minmax_indices(y: np.ndarray, n_out: int) -> np.ndarray:
+    """Indices du min et du max de chaque paquet (n_out / 2 paquets de même largeur)."""
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if n_out >= n or n_out < 4:
+        return np.arange(n)
+    bucket = np.arange(n) * (n_out // 2) // n
+    order = np.lexsort((y, bucket))            # trié par paquet, puis par valeur
+    starts = np.flatnonzero(np.r_[True, bucket[order][1:] != bucket[order][:-1]])
+    ends = np.r_[starts[1:], n] - 1
+    return np.unique(np.r_[order[starts], order[ends], 0, n - 1])
+
+
+def anchor_indices(y: np.ndarray, kind: str = "level") -> np.ndarray:
+    """Points gardés exacts : bornes, extrêmes et, selon kind, plus haut / creux du drawdown max."""
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if n == 0:
+        return np.arange(0)
+    pts = [0, n - 1, int(np.argmin(y)), int(np.argmax(y))]
+    if kind == "level":
+        dd = y / np.maximum.accumulate(y) - 1.0
+        trough = int(np.argmin(dd))
+    elif kind == "drawdown":
+        trough = int(np.argmin(y))
+    else:
+        return np.unique(pts)
+    # dernier passage au plus haut avant le creux : début du drawdown
+    head = y[:trough + 1]
+    peak = trough - int(np.argmax(head[::-1]))
+    return np.unique(pts + [peak, trough])
+
+
+def reduce_indices(y: np.ndarray, n_out: int, method: str = "lttb", kind: str = "level") -> np.ndarray:
+    if method not in REDUCE_METHODS:
+        raise ValueError(f"méthode inconnue {method!r} (choix : {REDUCE_METHODS})")
+    if kind not in SERIES_KINDS:
+        raise ValueError(f"type de série inconnu {kind!r} (choix : {SERIES_KINDS})")
+    if len(y) <= n_out:
+        return np.arange(len(y))
+    sel = lttb_indices(y, n_out) if method == "lttb" else minmax_indices(y, n_out)
+    return np.union1d(sel, anchor_indices(y, kind))
+
+
+def reduce_frame(df: pd.DataFrame | pd.Series, n_points: int, method: str = "lttb", kind: str = "level",
+                 var_name: str = "Série", value_name: str = "Valeur", x_name: str = "Date") -> pd.DataFrame:
+    """
+    df : dates x séries (ou une série). Retourne le format long (x_name, var_name, value_name)
+    attendu par plotly express ; chaque série est réduite séparément, sans ses NaN
+    (début d'une fenêtre glissante, bloc absent).
+    """
+    if isinstance(df, pd.Series):
+        df = df.to_frame(df.name if df.name is not None else value_name)
+    parts = []
+    for col in df.columns:
+        s = df[col]
+        y = s.to_numpy(dtype=float)
+        ok = np.flatnonzero(np.isfinite(y))
+        keep = ok[reduce_indices(y[ok], n_points, method, kind)]
+        parts.append(pd.DataFrame({x_name: s.index[keep], var_name: col, value_name: y[keep]}))
+    if not parts:
+        return pd.DataFrame(columns=[x_name, var_name, value_name])
+    return pd.concat(parts, ignore_index=True)
+
+
+def line_figure(data: pd.DataFrame, x: str, y: str, color: str | None = None, area: bool = False, **kwargs):
+    """px.line / px.area ; tracé WebGL quand le graphique dépasse WEBGL_MIN_POINTS points."""
+    import plotly.express as px
+
+    if area:
+        # les aires empilées n'existent pas en WebGL ; la réduction suffit à les garder légères
+        return px.area(data, x=x, y=y, color=color, **kwargs)
+    render_mode = "webgl" if len(data) > WEBGL_MIN_POINTS else "svg"
+    return px.line(data, x=x, y=y, color=color, render_mode=render_mode, **kwargs)
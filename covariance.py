@@ -0,0 +1,173 @@
+import numpy as np
+
+# ============================================================
+# Covariance : estimateurs (échantillon, Ledoit-Wolf, EWMA) + moteur glissant incrémental
+# ============================================================
+# Tout part des mêmes sommes par paire (données manquantes exclues paire par paire, comme DataFrame.cov) :
+#   C_ij = nb d'observations communes, S_ij = sum x_i x_j, A_ij = sum x_i (lignes où j existe),
+#   Q_ij = sum x_i^2 x_j^2 (pour l'intensité Ledoit-Wolf).
+# Ces sommes s'additionnent : faire glisser la fenêtre = ajouter les nouvelles lignes et
+# retirer les anciennes (mises à jour de rang k), au lieu de tout recalculer sur W lignes.
+
+COV_METHODS = ("sample", "ledoit-wolf", "ewma")
+EWMA_HALFLIFE = 63          # jours
+REFRESH_EVERY = 10          # recalcul complet toutes les REFRESH_EVERY fenêtres (dérive numérique)
+
+
+def _sums(X: np.ndarray, weights: np.ndarray | None = None) -> tuple:
+    """Sommes par paire (C, S, A, Q) d'un bloc de lignes, éventuellement pondérées."""
+    m = ~np.isnan(X)
+    x = np.where(m, X, 0.0)
+    mf = m.astype(float)
+    if weights is not None:
+        xw, mw = x * weights[:, None], mf * weights[:, None]
+    else:
+        xw, mw = x, mf
+    x2 = x * x
+    return mw.T @ mf, xw.T @ x, xw.T @ mf, (x2 * (weights[:, None] if weights is not None else 1.0)).T @ x2
+
+
+def _cov_from_sums(C, S, A, ddof: int = 1) -> np.ndarray:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cov = (S - A * A.T / C) / (C - ddof)
+    return np.where(C - ddof > 0, cov, np.nan)
+
+
+def _ledoit_wolf_from_sums(C, S, A, Q) -> tuple:
+    """
+    Shrinkage vers mu*I (Ledoit & Wolf 2004). L'intensité utilise les moments non centrés :
+    la moyenne des rendements journaliers est négligeable devant leur dispersion.
+    """
+    cov = _cov_from_sums(C, S, A)
+    cov = np.nan_to_num(cov, nan=0.0)
+    k = cov.shape[0]
+    mu = np.trace(cov) / k if k else 0.0
+    target = mu * np.eye(k)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pi = np.where(C > 0, (Q / C - (S / C) ** 2) / C, 0.0)
+    gamma = np.sum((cov - target) ** 2)
+    delta = float(np.clip(np.nansum(pi) / gamma, 0.0, 1.0)) if gamma > 0 else 1.0
+    return delta * target + (1.0 - delta) * cov, delta
+
+
+def sample_cov(R: np.ndarray) -> np.ndarray:
+    return _cov_from_sums(*_sums(R)[:3])
+
+
+def ledoit_wolf_cov(R: np.ndarray) -> np.ndarray:
+    return _ledoit_wolf_from_sums(*_sums(R))[0]
+
+
+def ewma_cov(R: np.ndarray, halflife: float = EWMA_HALFLIFE) -> np.ndarray:
+    lam = 0.5 ** (1.0 / halflife)
+    w = lam ** np.arange(len(R) - 1, -1, -1, dtype=float)
+    C, S, A, _ = _sums(R, w)
+    return _cov_from_sums(C, S, A, ddof=0)
+
+
+def estimate_cov(R: np.ndarray, method: str = "sample", halflife: float = EWMA_HALFLIFE) -> np.ndarray:
+    """R : rendements (T x N, NaN autorisés). method dans COV_METHODS."""
+    R = np.asarray(R, dtype=float)
+    if method == "sample":
+        cov = sample_cov(R)
+    elif method == "ledoit-wolf":
+        cov = ledoit_wolf_cov(R)
+    elif method == "ewma":
+        cov = ewma_cov(R, halflife)
+    else:
+        raise ValueError(f"Estimateur de covariance inconnu : {method}")
+    return np.nan_to_num(cov, nan=0.0)
+
+
+class RollingCovariance:
+    """
+    Covariance glissante sur un tableau de rendements R (T x N) déjà en mémoire.
+    seek(end) place la fenêtre sur les lignes [end - window, end) ; en avançant, seules les
+    lignes entrées/sorties sont ajoutées/retirées : O(k·N²) pour k lignes au lieu de O(W·N²).
+    method="ewma" : pondération exponentielle sur la même fenêtre (décroissance des sommes, puis
+    retrait des lignes sorties avec leur poids vu depuis la fin) : même estimation qu'estimate_cov
+    sur les `window` dernières lignes, comme dans l'app.
+    """
+
+    def __init__(self, R: np.ndarray, window: int = 252, method: str = "sample", halflife: float = EWMA_HALFLIFE,
+                 memo: bool = False):
+        if method not in COV_METHODS:
+            raise ValueError(f"Estimateur de covariance inconnu : {method}")
+        self.R = np.asarray(R, dtype=float)
+        self.window = int(window)
+        self.method = method
+        self.lam = 0.5 ** (1.0 / halflife)
+        self.lo = self.hi = 0
+        self._moved = 0
+        n = self.R.shape[1]
+        self._sums = [np.zeros((n, n)) for _ in range(4)]
+        # memo=True garde les sommes par date de fin : un sweep réutilise les mêmes fenêtres
+        self._memo = {} if memo else None
+
+    def _ewma_weights(self, a: int, b: int) -> np.ndarray:
+        # poids des lignes [a, b) vues depuis la fin b : lam^(b-1-t)
+        return self.lam ** np.arange(b - a - 1, -1, -1, dtype=float)
+
+    def _rebuild(self, end: int) -> None:
+        lo = max(0, end - self.window)
+        if self.method == "ewma":
+            self._sums = list(_sums(self.R[lo:end], self._ewma_weights(lo, end)))
+        else:
+            self._sums = list(_sums(self.R[lo:end]))
+        self.lo, self.hi, self._moved = lo, end, 0
+
+    def seek(self, end: int) -> "RollingCovariance":
+        end = int(min(max(end, 0), len(self.R)))
+        step = end - self.hi
+        if step < 0 or step >= self.window or self._moved >= REFRESH_EVERY * self.window:
+            self._rebuild(end)
+            return self
+        if step == 0:
+            return self
+
+        new_lo = max(0, end - self.window)
+        if self.method == "ewma":
+            decay = self.lam ** step
+            add = _sums(self.R[self.hi:end], self._ewma_weights(self.hi, end))
+            self._sums = [decay * s + a for s, a in zip(self._sums, add)]
+            if new_lo > self.lo:
+                # lignes sorties, pondérées comme vues depuis la nouvelle fin
+                rem = _sums(self.R[self.lo:new_lo], self.lam ** (end - new_lo) * self._ewma_weights(self.lo, new_lo))
+                self._sums = [s - r for s, r in zip(self._sums, rem)]
+        else:
+            add = _sums(self.R[self.hi:end])
+            self._sums = [s + a for s, a in zip(self._sums, add)]
+            if new_lo > self.lo:
+                rem = _sums(self.R[self.lo:new_lo])
+                self._sums = [s - r for s, r in zip(self._sums, rem)]
+        self.lo = new_lo
+        self.hi = end
+        self._moved += step
+        return self
+
+    def _sums_at(self, end: int | None) -> list:
+        if end is None:
+            return self._sums
+        if self._memo is not None and end in self._memo:
+            return self._memo[end]
+        self.seek(end)
+        if self._memo is not None:
+            self._memo[end] = [s.copy() for s in self._sums]
+        return self._sums
+
+    def cov(self, idx=None, end: int | None = None) -> np.ndarray:
+        """
+        Covariance de la fenêtre courante, ou de celle qui finit à `end` (seek implicite).
+        idx : sous-ensemble de colonnes (le shrinkage est alors calculé sur ce sous-ensemble).
+        """
+        C, S, A, Q = self._sums_at(end)
+        if idx is not None:
+            ix = np.ix_(idx, idx)
+            C, S, A, Q = C[ix], S[ix], A[ix], Q[ix]
+        if self.method == "ewma":
+            cov = _cov_from_sums(C, S, A, ddof=0)
+        elif self.method == "ledoit-wolf":
+            cov = _ledoit_wolf_from_sums(C, S, A, Q)[0]
+        else:
+            cov = _cov_from_sums(C, S, A)
+        return np.nan_to_num(cov, nan=0.0)
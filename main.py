@@ -1,15 +1,33 @@
+from __future__ import annotations   # annotations (pd.DataFrame...) non évaluées : pandas n'est importé qu'après l'onglet KYC
+
+import functools
+import threading
+import time
+
+_T0 = time.perf_counter()
+
 import streamlit as st
-import pandas as pd
-import numpy as np
-import plotly.express as px
-from scipy.optimize import minimize
-import yfinance as yf
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+from catalog import (CORE_MAP, SATELLITES, SAT_UNIVERSE, PROFILE_PARAMS, DEFAULT_PROFILE_PARAMS, KYC_HORIZON_YEARS,
+                     is_large_universe, profile_of_score)
+from ticker_meta import TickerMetaCache   # léger : yfinance n'est importé qu'au premier nom manquant
+from tracing import count, get_tracer, span, start_trace
+
+# Les imports lourds (pandas, numpy, pipeline, plotly...) sont faits après le rendu de l'onglet
+# KYC, qui n'en a pas besoin : voir "Imports lourds" plus bas. Les fonctions définies avant
+# n'utilisent ces noms qu'à l'exécution, donc après.
+# Premier rendu et imports mesurés à chaque exécution (STARTUP), affichés dans "Diagnostics".
+STARTUP = {}
 
 # ============================================================
 # CONFIG
 # ============================================================
 st.set_page_config(page_title="Momentum-X", page_icon="💹", layout="wide")
 
+# une trace par rerun : durées par étape/satellite + compteurs (réseau, caches), voir "Diagnostics"
+tracer = start_trace("rerun")
+
 if "selected_sats" not in st.session_state:
     st.session_state["selected_sats"] = set()
 if "risk_score" not in st.session_state:
@@ -69,176 +87,184 @@ body { background-color: #F5F7FB; font-family: "Segoe UI", sans-serif; }
 """
 st.markdown(CUSTOM_CSS, unsafe_allow_html=True)
 
+COV_LABELS = {"sample": "Échantillon (252j)", "ledoit-wolf": "Ledoit-Wolf (shrinkage)", "ewma": "EWMA (demi-vie 63j)"}
+
 # ============================================================
 # Fonctions qu'on utilise dans le code
 # ============================================================
-def pct_returns(prices: pd.DataFrame) -> pd.DataFrame:
-    return prices.pct_change().replace([np.inf, -np.inf], np.nan).dropna(how="all")
-
-def momentum_score(prices: pd.DataFrame, lookback_days: int = 126) -> pd.Series: #fonction plus solide on ajuste le momentum au risque
-    """
-    Risk-adjusted momentum:
-    score = cumulative return over lookback / annualized volatility over lookback
-    """
-    prices = prices.dropna(how="all")
-    if prices.empty or len(prices) <= lookback_days:
-        return pd.Series(index=prices.columns, dtype=float)
-
-    # returns for vol
-    r = pct_returns(prices).dropna(how="all")
-    r_lb = r.tail(lookback_days)
-
-    # annualized vol over lookback
-    vol = r_lb.std() * np.sqrt(252)
-    
-    # cumulative return over lookback
-    mom = (prices.iloc[-1] / prices.iloc[-1 - lookback_days] - 1.0) / vol.replace(0, np.nan)
-
-    return mom.replace([np.inf, -np.inf], np.nan)
-
-
-def annualize_stats(daily_returns: pd.Series) -> dict:
-    daily_returns = daily_returns.dropna()
-    if daily_returns.empty:
-        return {"ret": np.nan, "vol": np.nan, "sharpe": np.nan}
-    mu = daily_returns.mean() * 252
-    vol = daily_returns.std() * np.sqrt(252)
-    sharpe = (mu / vol) if vol and vol > 0 else np.nan
-    return {"ret": mu, "vol": vol, "sharpe": sharpe}
-
-def clamp_weights(w: np.ndarray) -> np.ndarray:
-    # Nettoie les petits artefacts numériques (ex: -1e-12) et renormalise
-    w = np.maximum(w, 0.0)
-    s = w.sum()
-    return (w / s) if s > 0 else w
-
-def optimize_mean_variance(mu: np.ndarray, cov: np.ndarray, risk_aversion: float, max_weight: float = 0.40, min_weight: float = 0.0, ridge: float = 1e-6
-) -> np.ndarray:
-    """
-    Maximise: mu^T w - risk_aversion * (w^T cov w)
-    s.c. sum(w)=1, min_weight <= w_i <= max_weight
-    """
-
-    n = len(mu)
-    if n == 0:
-        return np.array([])
-    if n == 1:
-        return np.array([1.0])
-
-    # Nettoyage NaN
-    mu = np.nan_to_num(mu, nan=0.0, posinf=0.0, neginf=0.0)
-    cov = np.nan_to_num(cov, nan=0.0, posinf=0.0, neginf=0.0)
-
-    # Stabilise la covariance (utile si cov bruitée / presque singulière)
-    cov = cov + ridge * np.eye(n)
-
-    # Sanitize bornes
-    min_w = max(0.0, float(min_weight))
-    max_w = float(max_weight)
-
-    # Si min > max, on écrase min au max (sinon impossible)
-    if min_w > max_w:
-        min_w = max_w
-
-    # Faisabilité : n*min <= 1 et n*max >= 1
-    # Si min trop haut, on le réduit au maximum faisable
-    if n * min_w > 1.0:
-        min_w = 1.0 / n
-
-    # Si max trop bas, on ne peut pas sommer à 1 -> fallback equal-weight
-    if n * max_w < 1.0:
-        return np.ones(n) / n
-
-    def obj(w):
-        # minimize négatif de l'utilité (équivalent à maximiser utilité)
-        return -(mu @ w - risk_aversion * (w @ cov @ w))
-
-    cons = [{"type": "eq", "fun": lambda w: np.sum(w) - 1.0}]
-    bounds = [(min_w, max_w) for _ in range(n)]
-
-    # point initial: équipondéré, puis clip dans les bornes et renormalise
-    x0 = np.ones(n) / n
-    x0 = np.clip(x0, min_w, max_w)
-    x0 = x0 / x0.sum()
-
-    res = minimize(obj, x0, bounds=bounds, constraints=cons, method="SLSQP")
-
-    if not res.success or res.x is None:
-        return x0
-
-    # Nettoyage final
-    w = res.x
-    w = np.clip(w, min_w, max_w)
-    w = w / w.sum()
-
-    return clamp_weights(w)
-
-@st.cache_data
+def traced_cache(fn):
+    # compte les appels d'une fonction en cache ; les ratés sont comptés dans son corps (exécuté seulement si raté)
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        count(f"cache.{fn.__name__}.calls")
+        with span(f"cache.{fn.__name__}"):
+            return fn(*args, **kwargs)
+    return wrapper
+
+@st.cache_resource
+def get_ticker_health() -> TickerHealth:
+    return TickerHealth()
+
+@st.cache_resource
+def get_price_store() -> PriceStore:
+    # une seule instance par serveur : le verrou protège les fichiers entre sessions
+    return PriceStore(health=get_ticker_health())
+
+@traced_cache
+@st.cache_data(ttl=3600)
 def fetch_adjclose(tickers, start="2015-01-01") -> pd.DataFrame: #start est un paramètre on voudrait que ça soit une variable ici
+    count("cache.fetch_adjclose.miss")
     tickers = [t.strip() for t in tickers if t and str(t).strip()]
     if not tickers:
         return pd.DataFrame()
 
-    data = yf.download(
-        tickers=tickers,
-        start=start,
-        progress=False,
-        auto_adjust=False,
-        group_by="column",
-        threads=True
-    )
+    # le store disque ne télécharge que la tête/queue manquante de chaque ticker
+    return get_price_store().get(tickers, start=start)
 
-    if data is None or len(data) == 0:
-        return pd.DataFrame()
-
-    if isinstance(data.columns, pd.MultiIndex):
-        if "Adj Close" in data.columns.get_level_values(0):
-            adj = data["Adj Close"].copy()
-        else:
-            adj = data["Close"].copy()
-    else:
-        if "Adj Close" in data.columns:
-            adj = data[["Adj Close"]].rename(columns={"Adj Close": tickers[0]})
-        elif "Close" in data.columns:
-            adj = data[["Close"]].rename(columns={"Close": tickers[0]})
-        else:
-            adj = pd.DataFrame()
+@st.cache_resource
+def get_artifacts() -> ArtifactStore:
+    # artefacts publiés par precompute.py (classements + Top K optimisés de la séance)
+    return ArtifactStore()
 
-    adj = adj.dropna(how="all")
-    adj.index = pd.to_datetime(adj.index)
-    return adj
+@st.cache_resource
+def get_meta_cache() -> TickerMetaCache:
+    return TickerMetaCache()
 
 def get_names(ticker_list):
-    return [yf.Ticker(t).info.get("longName", t) for t in ticker_list]
-# ============================================================
-# CORE ETFs (Yahoo tickers)
-# ============================================================
-CORE_MAP = {
-    "S&P 500 (CSPX)": ["CSPX.L", "CSPX.AS"],
-    "Euro Stoxx 50 (CSSX5E)": ["CSSX5E.MI", "CSSX5E.SW"],
-    "MSCI World (SWDA)": ["SWDA.L", "SWDA.MI", "SWDA.SW"],
-}
+    # jamais bloquant : un nom pas encore en cache s'affiche sous forme de ticker
+    return get_meta_cache().names(ticker_list, wait=False)
 
-# ============================================================
-# SATELLITES
-# ============================================================
-SATELLITES = [
-    {"name": "Emerging Markets (stocks)", "key": "EM", "geo": "Global EM", "desc": "Sélection momentum sur gros EM (actions/ADR)"},
-    {"name": "Commodities (futures)", "key": "METALS", "geo": "Global", "desc": "Sélection momentum sur futures matières premières"},
-    {"name": "Banks", "key": "BANKS", "geo": "Global", "desc": "Sélection momentum sur banques (US/Europe/Asie)"},
-    {"name": "Tech / IA", "key": "TECH", "geo": "Global", "desc": "Sélection momentum sur Big Tech / Semi / Software"},
-    {"name": "Defense", "key": "DEF", "geo": "Global", "desc": "Sélection momentum sur défense/aérospatial"},
-    {"name": "Energy", "key": "ENERGY", "geo": "Global", "desc": "Sélection momentum sur oil & gas (US/Europe/Canada/Asie)"},
-]
-
-SAT_UNIVERSE = {
-    "EM": ["2330.TW","2317.TW","2454.TW","2881.TW","2882.TW","2891.TW","2303.TW","3711.TW","2884.TW","3231.TW","2327.TW","2601.TW","1216.TW","1109.TW","2880.TW","0700.HK","9988.HK","0939.HK","1810.HK","2318.HK","0999.HK","1211.HK","9961.HK","3988.HK","0386.HK","2628.HK","1398.HK","9618.HK","3690.HK","2899.HK","0883.HK","0688.HK","0669.HK","2388.HK","0288.HK","1928.HK","1378.HK","005930.KS","000660.KS","051910.KS","035420.KS","012450.KS","005935.KS","068270.KS","000270.KS","105560.KS","HDFCBANK.NS","RELIANCE.NS","INFY.NS","BHARTIARTL.NS","ICICIBANK.NS","LT.NS","TCS.NS","AXISBANK.NS","BAJFINANCE.NS","MARUTI.NS","HINDUNILVR.NS","SUNPHARMA.NS","WIPRO.NS","ITC.NS","TITAN.NS","ULTRACEMCO.NS","NTPC.NS","ONGC.NS","ADANIENT.NS","VALE3.SA","PETR4.SA","ITSA4.SA","BBDC4.SA","ABEV3.SA","WEGE3.SA","HAPV3.SA","SBSP3.SA","AMXB.MX","FEMSAUBD.MX","WALMEX.MX","GMEXICOB.MX","PE&OLES.MX","GAPB.MX","NPN.JO","ANG.JO","MTN.JO","SBK.JO","2222.SR","1120.SR","1180.SR","2010.SR","2020.SR","EMIRATESDU.AE","PKO.WA","OTP.BD","CEZ.PR"],
-    "METALS": ["GC=F","SI=F","NG=F","HG=F","BZ=F","ZS=F","CL=F","ZC=F","ALI=F","LE=F","ZL=F","ZM=F","KC=F","ZW=F","SB=F","HO=F","RB=F","HE=F","KE=F","CT=F"],
-    "BANKS": ["JPM","BAC","WFC","C","GS","MS","PNC","USB","TFC","SCHW","BK","STT","NTRS","FITB","HBAN","CFG","CMA","MTB","KEY","RF","RY.TO","TD.TO","BNS.TO","BMO.TO","CM.TO","NA.TO","CIBC.TO","HSBA.L","LLOY.L","NWG.L","STAN.L","BARC.L","BNP.PA","GLE.PA","ACA.PA","SAN.MC","BBVA.MC","INGA.AS","DBK.DE","CBK.DE","UCG.MI","ISP.MI","BAMI.MI","SAB.MC","ABN.AS","KBC.BR","SWED-A.ST","SEB-A.ST","DANSKE.CO","NDA-FI.HE","NDA-SE.ST","UBSG.SW","BCVN.SW","MFG","SMFG","MUFG","DBS.SI","UOB.SI","OCBC.SI","8306.T","8316.T","8411.T","ITUB","BBD","BBAS","SAN","IBN","HDFC","KB","BBCA.JK","BMRI.JK"],
-    "TECH": ["NVDA","AAPL","MSFT","AVGO","PLTR","AMD","ORCL","MU","CSCO","IBM","CRM","INTC","ADBE","TXN","ANET","ADI","PANW","CRWD","SNPS","CDNS","QCOM","ACN","NOW","INTU","WDAY","MRVL","DELL","MSTR","KEYS","NET","DDOG","MDB","HPE","TER","ASML.AS","SAP.DE","STM.PA","IFX.DE","NOKIA.HE","ERIC-B.ST","CAP.PA","DSY.PA","ATE.PA","RNE.PA","8035.T","6857.T","6723.T","6702.T","6701.T","6762.T","7751.T","8056.T","4307.T","4704.T","4684.T","7735.T","4709.T","4768.T","4716.T","2330.TW","2303.TW","3711.TW","3034.TW","005930.KS","000660.KS","BABA","BIDU","TCEHY","LOGN.SW","SGE.L","NICE","NEM.DE"],
-    "DEF": ["GE","RTX","BA","AIR.PA","RR.L","SAF.PA","LMT","RHM.DE","HWM","NOC","GD","TDG","BA.L","LHX","AXON","RKLB","HO.PA","LDO.MI","MTX.DfE","HEI","SAAB-B.ST","ESLT","TXT","BBD-B.TO","HEI.A","KOG.OL","S63.SI","MRO.L","CAE.TO","AM.PA","HAG.DE"],
-    "ENERGY": ["XOM","CVX","COP","EOG","OXY","SLB","HAL","KMI","WMB","PSX","MPC","VLO","OKE","DVN","HES","FANG","APA","SHEL.L","BP.L","TTE","EQNR","REP.MC","ENI.MI","GALP.LS","CNQ.TO","SU.TO","TRP.TO","IMO.TO","PETRONAS.KL","PTT.BK","STO.AX","Santos.AX","YPF","PBR","AKRBP.OL","OMV.VI","KEY.TO"],
-} #on voudrait avoir les noms associés à chaque tickers
+@traced_cache
+@st.cache_data(ttl=3600)
+def fetch_universe_panel(sat_keys: tuple, start="2015-01-01") -> pd.DataFrame:
+    """
+    Un seul panel de prix pour l'union des satellites sélectionnés + toutes les cotations
+    du cœur. Les tickers communs (ex: 2330.TW dans EM et TECH) ne sont lus qu'une fois,
+    et le store ne télécharge que ce qu'il ne détient pas encore.
+    """
+    count("cache.fetch_universe_panel.miss")
+    tickers = [t for k in sorted(sat_keys) for t in SAT_UNIVERSE.get(k, [])]
+    tickers += [t for listings in CORE_MAP.values() for t in listings]
+    return fetch_adjclose(list(dict.fromkeys(tickers)), start=start)
+
+@traced_cache
+@st.cache_data(ttl=3600)
+def fetch_price_panel(tickers: tuple, start="2015-01-01") -> PricePanel:
+    # même store que fetch_adjclose, mais en tableau compact (pas de DataFrame intermédiaire)
+    count("cache.fetch_price_panel.miss")
+    return get_price_store().get_panel(tickers, start=start).dropna_rows()
+
+def satellite_prices(sat_key: str, start="2015-01-01") -> PricePanel:
+    return fetch_price_panel(tuple(SAT_UNIVERSE.get(sat_key, [])), start=start)
+
+@traced_cache
+@st.cache_data(ttl=3600)
+def satellite_momentum_panel(sat_key: str, start="2015-01-01") -> MomentumPanel:
+    count("cache.satellite_momentum_panel.miss")
+    # tous les lookbacks du sidebar en un passage : changer de lookback ne recalcule rien
+    return momentum_panel(satellite_prices(sat_key, start), lookbacks=LOOKBACKS)
+
+def panel_view(panel: pd.DataFrame, tickers) -> pd.DataFrame:
+    # vue d'un satellite (ou du cœur) sur le panel partagé
+    cols = [t for t in dict.fromkeys(tickers) if t in panel.columns]
+    return panel[cols].dropna(how="all")
+
+# ------------------------------------------------------------
+# Étapes pures en cache, clés scalaires : un rerun ne recalcule que ce dont les entrées ont changé
+# ------------------------------------------------------------
+@traced_cache
+@st.cache_data(ttl=3600)
+def resolve_core(core_choice: str, start="2015-01-01"):
+    # première cotation du cœur qui a des données -> (ticker, prix)
+    count("cache.resolve_core.miss")
+    listings = CORE_MAP[core_choice]
+    health = get_ticker_health()
+    known = health.core_listing(core_choice, listings)
+    if known is not None:
+        # cotation déjà retenue : un seul ticker à lire, sans sonder les autres places
+        p = panel_view(fetch_adjclose([known], start=start), [known])
+        if not p.empty:
+            return known, p
+    prices = fetch_adjclose(listings, start=start)
+    for t in listings:
+        p = panel_view(prices, [t])
+        if not p.empty:
+            health.set_core_listing(core_choice, t)
+            return t, p
+    return None, pd.DataFrame()
+
+@traced_cache
+@st.cache_data(ttl=3600)
+def satellite_stage(sat_key: str, start: str, params: SatelliteParams) -> SatelliteResult:
+    # sélection + optimisation d'un satellite, indépendante des autres satellites sélectionnés
+    count("cache.satellite_stage.miss")
+    hit = get_artifacts().lookup(sat_key, start, params)
+    if hit is not None:
+        # déjà calculé par le planificateur après la dernière clôture : simple lecture
+        return hit
+    if is_large_universe(sat_key):
+        # grand univers (fichier) : scoring par lots, seul l'historique du Top K est chargé en entier
+        store = get_price_store()
+        return run_large_satellite(sat_key, SAT_UNIVERSE[sat_key],
+                                   lambda ts, dtype: store.get_panel(ts, start=start, dtype=dtype).dropna_rows(), params)
+    prices = satellite_prices(sat_key, start)
+    return run_satellite(sat_key, prices, params, satellite_momentum_panel(sat_key, start) if not prices.empty else None)
+
+@traced_cache
+@st.cache_data(ttl=3600)
+def portfolio_stage(sat_keys: tuple, start: str, params: SatelliteParams, core_choice: str, core_weight: float,
+                    max_w_sat: float) -> PortfolioResult | None:
+    # inter-satellites : relit les satellites en cache, ne résout que le petit QP entre satellites
+    count("cache.portfolio_stage.miss")
+    core_ticker, core_prices = resolve_core(core_choice, start=start)
+    results = [satellite_stage(k, start, params) for k in sat_keys]
+    return combine_satellites(results, core_ticker, pct_returns(core_prices).iloc[:, 0], core_weight,
+                              params.risk_aversion, max_w_sat, cov_method=params.cov_method)
+
+@traced_cache
+@st.cache_data(ttl=3600)
+def analytics_stage(sat_keys: tuple, start: str, params: SatelliteParams, core_choice: str, core_weight: float,
+                    max_w_sat: float) -> PortfolioAnalytics | None:
+    # mêmes clés que portfolio_stage : séries glissantes calculées une fois par portefeuille
+    count("cache.analytics_stage.miss")
+    return analyze_portfolio(portfolio_stage(sat_keys, start, params, core_choice, core_weight, max_w_sat))
+
+@traced_cache
+@st.cache_data(ttl=3600, show_spinner="Simulation Monte Carlo en cours...")
+def run_risk_simulation(returns: pd.Series, n_paths: int, method: str, seed: int = 0) -> RiskResult:
+    count("cache.run_risk_simulation.miss")
+    # workers=None : un processus par CPU, plafonné au nombre de paquets de CHUNK_PATHS chemins
+    # (1 seul sous 25k chemins : pas de pool lancé pour rien) ; résultat identique, graines par paquet
+    return simulate_portfolio(returns, horizons=HORIZONS_YEARS, n_paths=n_paths, method=method, seed=seed, workers=None)
+
+@traced_cache
+@st.cache_data(ttl=3600, show_spinner="Backtest walk-forward en cours...")
+def run_backtest(panel: pd.DataFrame, sat_keys: tuple, core_ticker: str, core_weight: float, lookback: int,
+                 top_k: int, risk_aversion: float, max_w_stock: float, max_w_sat: float, freq: str, cov_method: str):
+    count("cache.run_backtest.miss")
+    universes = {k: SAT_UNIVERSE.get(k, []) for k in sat_keys}
+    return walk_forward(panel, universes, core_ticker, core_weight, lookback=lookback, top_k=top_k,
+                        risk_aversion=risk_aversion, max_w_stock=max_w_stock, max_w_sat=max_w_sat, freq=freq,
+                        cov_method=cov_method)
+
+@traced_cache
+@st.cache_data(ttl=3600, max_entries=256)
+def chart_frame(df: pd.DataFrame, width_px: int, method: str = "lttb", kind: str = "level", var_name: str = "Série",
+                value_name: str = "Valeur") -> pd.DataFrame:
+    # séries réduites (charts.py) mises en cache par contenu + largeur + méthode : un rerun qui
+    # ne change pas le portefeuille renvoie les mêmes points sans refaire la réduction
+    count("cache.chart_frame.miss")
+    return reduce_frame(df, target_points(width_px), method, kind, var_name, value_name)
+
+def chart_width() -> int:
+    return int(st.session_state.get("chart_width", CHART_WIDTH_PX))
+
+# Remplit le cache des noms pour tout l'univers en arrière-plan (no-op si déjà en cache) ;
+# les grands univers n'ont besoin que des noms de leur Top K, récupérés à l'affichage
+get_meta_cache().prefetch(
+    [t for k, u in SAT_UNIVERSE.items() if not is_large_universe(k) for t in u]
+    + [t for listings in CORE_MAP.values() for t in listings]
+)
 
 # ============================================================
 # HEADER
@@ -252,7 +278,9 @@ tab_kyc, tab_strategy = st.tabs(["Profil investisseur", "Stratégie Momentum-X"]
 # ============================================================
 # TAB 1: KYC On créée le questionnaire KYC
 # ============================================================
-with tab_kyc:
+# fragment : cliquer dans le questionnaire ne relance que le questionnaire
+@st.fragment
+def kyc_view():
     st.subheader("Questionnaire de profil de risque")
     st.write("Le profil ajuste automatiquement l’allocation cœur vs satellites et l’aversion au risque.")
     st.markdown("<div class='hr'></div>", unsafe_allow_html=True)
@@ -307,16 +335,18 @@ with tab_kyc:
 
     if st.button("Calculer mon profil de risque"):
         score_total = q1_score + q2_score + q3_score + q4_score + q5_score
-        if score_total <= 12:
-            risk_profile = "Prudent"
-        elif score_total <= 18:
-            risk_profile = "Équilibré"
-        else:
-            risk_profile = "Dynamique"
+        risk_profile = profile_of_score(score_total)
 
         st.session_state["risk_score"] = score_total
-        st.session_state["risk_profile"] = risk_profile
+        st.session_state["horizon_years"] = KYC_HORIZON_YEARS[q1_choice]
+        if st.session_state["risk_profile"] != risk_profile:
+            # le profil pilote l'onglet Stratégie : là, il faut un rerun complet
+            st.session_state["risk_profile"] = risk_profile
+            st.session_state["kyc_notice"] = True
+            st.rerun()
         st.success(f"Votre Profil est: **{risk_profile}**")
+    if st.session_state.pop("kyc_notice", False):
+        st.success(f"Votre Profil est: **{st.session_state['risk_profile']}**")
 
     prof = st.session_state.get("risk_profile", None)
 
@@ -358,31 +388,182 @@ with tab_kyc:
     else:
         st.warning("Clique sur « Calculer mon profil » pour activer l’auto-paramétrage.")
 
+with tab_kyc:
+    kyc_view()
+STARTUP["kyc_ms"] = (time.perf_counter() - _T0) * 1e3
+
 # ============================================================
-# TAB 2: STRATEGY
+# Imports lourds : seulement une fois l'onglet KYC affiché
 # ============================================================
-with tab_strategy:
-    st.subheader("Core ETF + Satellites (momentum sélection Top K)")
+# Payés à la première exécution du processus (ensuite déjà dans sys.modules) ; warmup.py
+# les fait avant l'ouverture du serveur. scipy, yfinance et plotly sont importés par les
+# étapes qui s'en servent (optimiseur de référence, téléchargement, graphiques).
+_t = time.perf_counter()
+import pandas as pd
+import numpy as np
 
-    st.sidebar.header("Paramètres")
-    start_date = st.sidebar.text_input("Start date (YYYY-MM-DD)", "2015-01-01")
-    lookback = st.sidebar.selectbox("Lookback momentum (jours)", [63, 126, 252], index=1)
-    top_k = st.sidebar.selectbox("Top K par satellite (momentum)", [3, 4, 5, 6, 7,  8, 9, 10, 11, 12, 13, 14, 15], index=2)
-    max_w_stock = st.sidebar.slider("Poids max par actif (intra-satellite)", 0.10, 1.00, 0.40, 0.01)
-    max_w_sat = st.sidebar.slider("Poids max par satellite (inter-satellites)", 0.10, 1.00, 0.60, 0.01)
-    #min_w_stock = st.sidebar.slider("Poids max par actif (intra-satellite)", 0.05, 1.00, 0.40, 0.01) #raajout pour min sur opti oui mais le min est fonction du nombre d'actifs ....donc 0.05 pas tjrs possible....
-    #min_w_sat = st.sidebar.slider("Poids max par actif (intra-satellite)", 0.05, 1.00, 0.40, 0.01)
-    min_w_stock = 0.5 / top_k   # min dynamique: 50% du equal-weight
+from analytics import ROLLING_WINDOWS, PortfolioAnalytics, analyze_portfolio
+from charts import CHART_WIDTH_PX, CHART_WIDTHS, line_figure, reduce_frame, target_points
+from precompute import ArtifactStore
+from pipeline import (PortfolioResult, SatelliteParams, SatelliteResult, combine_satellites, map_satellites,
+                      run_large_satellite, run_satellite)
+from price_panel import PricePanel
+from price_store import PriceStore
+from backtest import walk_forward
+from covariance import COV_METHODS
+from risk import HORIZONS_YEARS, SIM_METHODS, RiskResult, simulate_portfolio
+from quant import LOOKBACKS, RISK_AVERSION_RANGE, MomentumPanel, pct_returns, momentum_panel, annualize_stats
+from ticker_health import TickerHealth
+STARTUP["imports_ms"] = (time.perf_counter() - _t) * 1e3
 
-    risk_profile = st.session_state.get("risk_profile", "Non défini")
-    if risk_profile == "Prudent":
-        core_default, risk_aversion = 0.80, 12.0
-    elif risk_profile == "Équilibré":
-        core_default, risk_aversion = 0.65, 6.0
-    elif risk_profile == "Dynamique":
-        core_default, risk_aversion = 0.50, 2.5
-    else:
-        core_default, risk_aversion = 0.70, 7.0
+# ============================================================
+# TAB 2: STRATEGY
+# ============================================================
+# fragment : rebalancement / lancement du backtest ne relancent que cette section
+@st.fragment
+def backtest_view(valid: tuple, start_date, core_ticker_used, core_weight, lookback, top_k, risk_aversion,
+                  max_w_stock, max_w_sat, cov_method):
+    bt_freq_label = st.radio("Rebalancement", ["Mensuel", "Trimestriel"], horizontal=True)
+    if st.toggle("Lancer le backtest walk-forward", value=False):
+        # panel des satellites retenus + cœur, chargé seulement quand le backtest est demandé
+        panel = fetch_universe_panel(valid, start=start_date)
+        bt = run_backtest(panel, valid, core_ticker_used, core_weight, lookback, top_k,
+                          risk_aversion, max_w_stock, max_w_sat, "M" if bt_freq_label == "Mensuel" else "Q", cov_method)
+        if bt.returns.empty:
+            st.warning("Pas assez d'historique pour lancer le backtest.")
+        else:
+            bt_cum = pd.DataFrame({
+                "Portefeuille (walk-forward)": (1 + bt.returns).cumprod(),
+                f"Cœur ({core_ticker_used})": (1 + bt.core_returns).cumprod(),
+            })
+            with span("render.backtest", points=len(bt_cum)):
+                df_bt = chart_frame(bt_cum, chart_width())
+                st.plotly_chart(line_figure(df_bt, x="Date", y="Valeur", color="Série"), use_container_width=True)
+
+            c_ret, c_vol, c_sh, c_dd, c_to = st.columns(5)
+            c_ret.metric("Return ann.", f"{bt.stats['ret']:.2%}")
+            c_vol.metric("Vol ann.", f"{bt.stats['vol']:.2%}")
+            c_sh.metric("Sharpe", f"{bt.stats['sharpe']:.2f}")
+            c_dd.metric("Max drawdown", f"{bt.stats['max_dd']:.2%}")
+            c_to.metric("Turnover ann.", f"{bt.stats['turnover']:.0%}")
+
+
+# fragment : le curseur d'aversion ne relance que cette section ; les poids intra-satellite se lisent
+# sur la frontière de chaque satellite (pas de nouvelle optimisation), seul le petit QP inter est refait
+RISK_AVERSION_STEPS = (0.5, 1.0, 2.5, 5.0, 7.0, 10.0, 25.0, 50.0, 100.0, 250.0, 500.0, 1e3, 2.5e3, 5e3, 1e4, 2.5e4, 5e4, 1e5)
+
+@st.fragment
+def frontier_view(sat_results, core_ticker_used, core_returns, core_weight, max_w_sat, cov_method, risk_aversion):
+    options = sorted({*RISK_AVERSION_STEPS, float(risk_aversion)})
+    ra = st.select_slider("Aversion au risque", options=options, value=float(risk_aversion),
+                          help=f"Profil : {risk_aversion}")
+    st.caption("Poids intra-satellite lus sur la frontière de chaque satellite (interpolation entre cassures). "
+               "Les scores de momentum pèsent bien plus que la variance journalière : l'allocation ne se "
+               "diversifie qu'aux fortes aversions.")
+    with span("stage.frontier", risk_aversion=ra):
+        results = [r.at_risk_aversion(ra) for r in sat_results]
+        pf = combine_satellites(results, core_ticker_used, core_returns, core_weight, ra, max_w_sat, cov_method=cov_method)
+    if pf is None:
+        st.info("Aucun satellite exploitable.")
+        return
+
+    s_all = annualize_stats(pf.returns)
+    c_ret, c_vol, c_sh = st.columns(3)
+    c_ret.metric("Return ann.", f"{s_all['ret']:.2%}")
+    c_vol.metric("Vol ann.", f"{s_all['vol']:.2%}")
+    c_sh.metric("Sharpe", f"{s_all['sharpe']:.2f}")
+
+    curves = []
+    grid = np.geomspace(*RISK_AVERSION_RANGE, 40)
+    for r in sat_results:
+        if r.frontier is None:
+            continue
+        pts = r.frontier.points(grid).assign(Satellite=r.sat_key, Point="frontière")
+        curves += [pts, r.frontier.points([ra]).assign(Satellite=r.sat_key, Point="choix")]
+    if curves:
+        import plotly.express as px
+
+        df_front = pd.concat(curves, ignore_index=True)
+        fig = px.line(df_front[df_front["Point"] == "frontière"], x="vol", y="mu", color="Satellite", markers=True,
+                      hover_data=["risk_aversion"], labels={"vol": "Vol ann.", "mu": "Momentum moyen"})
+        fig.add_scatter(x=df_front.loc[df_front["Point"] == "choix", "vol"], y=df_front.loc[df_front["Point"] == "choix", "mu"],
+                        mode="markers", marker=dict(size=10, color="black"), name=f"aversion {ra}")
+        st.plotly_chart(fig, use_container_width=True)
+
+    df_pos = (pd.DataFrame({"Ticker": list(pf.positions), "Poids": list(pf.positions.values())})
+              .sort_values("Poids", ascending=False).reset_index(drop=True))
+    st.dataframe(df_pos.style.format({"Poids": "{:.2%}"}), use_container_width=True, hide_index=True)
+
+
+# fragment : changer le nombre de chemins ou la méthode ne relance que la simulation
+@st.fragment
+def risk_view(port_ret: pd.Series):
+    c_paths, c_method = st.columns(2)
+    n_paths = c_paths.select_slider("Chemins simulés", options=[10_000, 50_000, 100_000], value=100_000)
+    method = c_method.radio("Méthode", list(SIM_METHODS), horizontal=True,
+                            format_func={"bootstrap": "Bootstrap par blocs (21j)", "normal": "Loi normale ajustée"}.get)
+    sim = run_risk_simulation(port_ret, n_paths, method)
+    st.caption("Valeur finale pour 1 investi, VaR/CVaR 95% du rendement sur l'horizon, drawdown max ; graine fixe.")
+    st.dataframe(sim.summary().style.format({
+        "médiane": "{:.2f}", "q05": "{:.2f}", "q95": "{:.2f}", "moyenne": "{:.2f}", "p_perte": "{:.1%}",
+        "VaR": "{:.1%}", "CVaR": "{:.1%}", "dd_médian": "{:.1%}", "dd_q95": "{:.1%}",
+    }), use_container_width=True)
+
+    horizon = st.session_state.get("horizon_years") or HORIZONS_YEARS[-1]
+    j = sim.horizons.index(horizon) if horizon in sim.horizons else len(sim.horizons) - 1
+    import plotly.express as px
+
+    with span("render.risk"):
+        # échantillon pour l'histogramme : la distribution reste lisible, le message reste léger
+        values = sim.terminal[:20_000, j]
+        fig = px.histogram(pd.DataFrame({"Valeur finale": values}), x="Valeur finale", nbins=80)
+        fig.add_vline(x=1.0, line_dash="dash")
+        st.markdown(f"**Valeur finale à {sim.horizons[j]} an(s)** (horizon du questionnaire)")
+        st.plotly_chart(fig, use_container_width=True)
+
+
+# fragment : changer de fenêtre ou de métrique ne relit que l'objet d'analyses en cache
+@st.fragment
+def analytics_view(an: PortfolioAnalytics):
+    c_win, c_metric = st.columns(2)
+    window = c_win.radio("Fenêtre", list(an.windows), index=len(an.windows) - 1, horizontal=True,
+                         format_func=lambda w: f"{w}j")
+    metric = c_metric.radio("Métrique", ["sharpe", "vol", "ret"], horizontal=True,
+                            format_func={"sharpe": "Sharpe", "vol": "Vol ann.", "ret": "Rendement de la fenêtre"}.get)
+    summary = an.summary()
+    st.dataframe(summary.style.format("{:.2f}").format({c: "{:.1%}" for c in summary.columns if not c.startswith("sharpe")}),
+                 use_container_width=True)
+
+    width = chart_width()
+    with span("render.analytics", points=len(an.returns)):
+        df = chart_frame(an.metric(metric, window), width, kind="metric", var_name="Bloc", value_name=metric)
+        st.plotly_chart(line_figure(df, x="Date", y=metric, color="Bloc"), use_container_width=True)
+        # min/max par paquet : chaque creux reste à sa vraie profondeur
+        df_dd = chart_frame(an.drawdown, width, method="minmax", kind="drawdown", var_name="Bloc", value_name="Drawdown")
+        st.markdown("**Drawdown**")
+        st.plotly_chart(line_figure(df_dd, x="Date", y="Drawdown", color="Bloc"), use_container_width=True)
+        df_ct = chart_frame(an.cumulative_contributions(), width, kind="metric", var_name="Bloc", value_name="Contribution")
+        st.markdown("**Contributions cumulées au rendement du portefeuille**")
+        st.plotly_chart(line_figure(df_ct, x="Date", y="Contribution", color="Bloc", area=True), use_container_width=True)
+
+
+# fragment : sélection des satellites, choix du cœur et rendu ne relancent que l'onglet
+# (les paramètres du sidebar, hors fragment, relancent tout ; les étapes en cache absorbent le coût)
+@st.fragment
+def strategy_view(*args):
+    ctx = get_script_run_ctx()
+    if ctx is not None and ctx.fragment_ids_this_run:
+        # rerun du seul fragment : le script n'a pas ouvert de trace "rerun", on en ouvre une
+        start_trace("strategy")
+    # sinon, span enfant de la trace du rerun : chargement des prix et onglet dans la même trace
+    with span("strategy"):
+        _strategy_body(*args)
+    diagnostics_view(get_tracer())
+
+
+def _strategy_body(start_date, lookback, top_k, max_w_stock, max_w_sat, cov_method, min_w_stock, risk_profile,
+                   core_default, risk_aversion):
+    import plotly.express as px   # chargé au premier graphique (~0,15 s), pas au démarrage
 
     st.markdown("### 1) Choix du cœur ETF et de la répartition Coeur/Satellites") #la répartition coeur/satellite ne se fait pas dans lopti ? si oui, on enleve la partie sur la répartition...
     core_choice = st.selectbox("Core ETF :", list(CORE_MAP.keys()))
@@ -398,15 +579,7 @@ with tab_strategy:
 
     st.caption(f"Profil: {risk_profile} | risk_aversion={risk_aversion} | Core={core_weight:.0%} / Satellites={sats_weight:.0%}") # c'est moche ptet qu'il faut garder que "Prudent et la répartition" donc enlever le risk aversion truc
 
-    core_prices = pd.DataFrame()
-    core_ticker_used = None
-    for t in CORE_MAP[core_choice]:
-        p = fetch_adjclose([t], start=start_date)
-        if not p.empty:
-            core_prices = p.rename(columns={p.columns[0]: t}) # pas compris cette lin
-            core_ticker_used = t
-            break
-
+    core_ticker_used, core_prices = resolve_core(core_choice, start=start_date)
     if core_prices.empty:
         st.error("Impossible de télécharger le core via Yahoo Finance (suffix).")
         st.stop()
@@ -469,7 +642,8 @@ with tab_strategy:
             )
 
 
-    selected_sats = list(st.session_state["selected_sats"])
+    # ordre du catalogue : résultats déterministes quel que soit l'ordre des clics
+    selected_sats = [sat["key"] for sat in SATELLITES if sat["key"] in st.session_state["selected_sats"]]
     if not selected_sats:
         st.info("Sélectionne au moins 1 satellite.")
         df_donut = pd.DataFrame({"Bloc":["Cœur"], "Poids":[1.0]})
@@ -493,47 +667,29 @@ with tab_strategy:
     sat_returns_series = {}
     sat_summary_rows = []
 
-    for sat_key in selected_sats:
-        universe = SAT_UNIVERSE.get(sat_key, [])
-        prices = fetch_adjclose(universe, start=start_date)
-
-        prices = prices.dropna(axis=1, how="all")
-        if prices.empty or prices.shape[1] < 2:
-            sat_summary_rows.append([sat_key, "NO DATA", 0, np.nan, np.nan, np.nan])
-            sat_returns_series[sat_key] = pd.Series(dtype=float)
-            continue
-
-        mom = momentum_score(prices, lookback_days=lookback).dropna().sort_values(ascending=False)
-        top = mom.head(top_k).index.tolist()
-
-        if len(top) == 0:
-            sat_summary_rows.append([sat_key, "NO TOP", 0, np.nan, np.nan, np.nan])
-            sat_returns_series[sat_key] = pd.Series(dtype=float)
+    sat_params = SatelliteParams(lookback=lookback, top_k=top_k, risk_aversion=risk_aversion, max_w_stock=max_w_stock,
+                                 min_w_stock=min_w_stock, cov_method=cov_method, frontier=True)
+    ctx = get_script_run_ctx()
+    # étape en cache par satellite : (dé)sélectionner un satellite ne calcule que lui ;
+    # les ratés tournent en parallèle (threads rattachés à la session pour les caches Streamlit)
+    with span("stage.satellites", sats=len(selected_sats)):
+        sat_results = map_satellites(
+            lambda k: satellite_stage(k, start_date, sat_params),
+            selected_sats,
+            initializer=lambda: add_script_run_ctx(threading.current_thread(), ctx),
+        )
+
+    for res in sat_results:
+        sat_key = res.sat_key
+        sat_returns_series[sat_key] = res.returns
+        if res.status in ("NO DATA", "NO TOP"):
+            sat_summary_rows.append([sat_key, res.status, 0, np.nan, np.nan, np.nan])
             continue
-
-        p_sel = prices[top].dropna(how="all")
-        r_sel = pct_returns(p_sel).dropna(how="any")
-
-        if r_sel.empty:
-            sat_summary_rows.append([sat_key, ", ".join(get_names(top)), len(top), np.nan, np.nan, np.nan])
-            sat_returns_series[sat_key] = pd.Series(dtype=float)
+        if res.status == "NO RETURNS":
+            sat_summary_rows.append([sat_key, ", ".join(get_names(res.top)), len(res.top), np.nan, np.nan, np.nan])
             continue
-
-        mu = mom.reindex(top).fillna(0.0).values
-        r_last = r_sel.tail(252)
-        cov = r_last.cov().values if len(r_last) > 5 else np.eye(len(top)) * 1e-6
-
-        w_intra = optimize_mean_variance(mu=mu, cov=cov, risk_aversion=risk_aversion, max_weight=max_w_stock, min_weight=min_w_stock)
-        w_intra_ser = pd.Series(w_intra, index=top).sort_values(ascending=False)
-
-        sat_ret = (r_sel @ w_intra_ser.reindex(top).values)
-        sat_returns_series[sat_key] = sat_ret
-
-        stats = annualize_stats(sat_ret)
-        sat_mom_avg = float(np.average(mom.reindex(top).values, weights=w_intra_ser.reindex(top).values)) if w_intra_ser.sum() > 0 else float(mom.reindex(top).mean())
-        sat_summary_rows.append([sat_key, ", ".join(get_names(top)), len(top), sat_mom_avg, stats["ret"], stats["vol"]])
-
-        sat_stock_weights[sat_key] = w_intra_ser
+        sat_summary_rows.append([sat_key, ", ".join(get_names(res.top)), len(res.top), res.momentum, res.stats["ret"], res.stats["vol"]])
+        sat_stock_weights[sat_key] = res.weights
 
     df_sat_summary = pd.DataFrame(
         sat_summary_rows,
@@ -556,64 +712,20 @@ with tab_strategy:
     st.markdown("<div class='hr'></div>", unsafe_allow_html=True)
     st.markdown("### 4) Optimisation inter-satellites")
 
-    valid = [k for k in selected_sats if not sat_returns_series.get(k, pd.Series(dtype=float)).dropna().empty]
-    if len(valid) == 0:
+    pf = portfolio_stage(tuple(selected_sats), start_date, sat_params, core_choice, float(core_weight), max_w_sat)
+    if pf is None:
         st.error("Aucun satellite exploitable (données Yahoo manquantes).")
         st.stop()
+    valid = pf.valid
+    core_ret, sat_port_ret, port_ret = pf.core_returns, pf.sat_returns, pf.returns
+    final_positions = pf.positions
 
-    rets_df = pd.concat([sat_returns_series[k].rename(k) for k in valid], axis=1).dropna(how="any")
-
-    mu_sats = []
-    for k in valid:
-        row = df_sat_summary[df_sat_summary["Satellite"] == k]
-        mu_sats.append(float(row[f"Momentum({lookback}j)"].iloc[0]) if not row.empty else 0.0)
-    mu_sats = np.array([0.0 if not np.isfinite(x) else x for x in mu_sats])
-
-    cov_sats = rets_df.cov().values if rets_df.shape[0] > 5 else np.eye(len(valid)) * 1e-6
-    
-    # Min inter-satellites dynamique (ex: 50% de l'équipondération)
-    n_sat = len(valid)
-    min_w_sat = 0.5 / n_sat
-    st.caption(f"Min weight auto (inter) = {min_w_sat:.2%} (≈ 50% de 1/N)")
-
-    w_sats = optimize_mean_variance(mu=mu_sats, cov=cov_sats, risk_aversion=risk_aversion, max_weight=max_w_sat, min_weight=min_w_sat)
-    w_sats_ser = pd.Series(w_sats, index=valid).sort_values(ascending=False)
-
-    st.dataframe(w_sats_ser.reset_index().rename(columns={"index":"Satellite", 0:"Poids"}), use_container_width=True, hide_index=True)
+    st.caption(f"Min weight auto (inter) = {pf.min_weight:.2%} (≈ 50% de 1/N)")
+    st.dataframe(pf.weights.reset_index().rename(columns={"index":"Satellite", 0:"Poids"}), use_container_width=True, hide_index=True)
 
-    sat_port_ret = rets_df @ w_sats_ser.reindex(valid).values
-
-    core_ret = pct_returns(core_prices).iloc[:, 0].dropna()
-    common = core_ret.index.intersection(sat_port_ret.index)
-    core_ret = core_ret.loc[common]
-    sat_port_ret = sat_port_ret.loc[common]
-
-    port_ret = core_weight * core_ret + sats_weight * sat_port_ret
-    
-    
     # ============================================================
     # BUY LIST (final weights)
     # ============================================================
-    final_positions = {}
-
-    # 1) Core ETF
-    final_positions[core_ticker_used] = float(core_weight)
-
-    # 2) Satellites -> stocks
-    for sat_key in valid:
-        sat_w = float(w_sats_ser.get(sat_key, 0.0))
-        if sat_w <= 0:
-            continue
-
-        intra = sat_stock_weights.get(sat_key)
-        if intra is None or intra.empty:
-            continue
-
-        for ticker, w_intra in intra.items():
-            w_final = float(sats_weight) * sat_w * float(w_intra)
-            if w_final > 0:
-                final_positions[ticker] = final_positions.get(ticker, 0.0) + w_final
-
     tickers_final = list(final_positions.keys())
     names_final = get_names(tickers_final)
     df_buy = (
@@ -629,12 +741,14 @@ with tab_strategy:
     st.markdown("<div class='hr'></div>", unsafe_allow_html=True)
     st.markdown("## Résultats")
 
-    donut = pd.DataFrame({"Bloc":["Cœur", "Satellites"], "Poids":[core_weight, sats_weight]})
-    st.plotly_chart(px.pie(donut, names="Bloc", values="Poids", hole=0.55), use_container_width=True)
+    with span("render.donut"):
+        donut = pd.DataFrame({"Bloc":["Cœur", "Satellites"], "Poids":[core_weight, sats_weight]})
+        st.plotly_chart(px.pie(donut, names="Bloc", values="Poids", hole=0.55), use_container_width=True)
 
-    cum = (1 + port_ret.fillna(0)).cumprod()
-    df_cum = cum.to_frame("Portfolio").reset_index().rename(columns={"index":"Date"})
-    st.plotly_chart(px.line(df_cum, x="Date", y="Portfolio"), use_container_width=True)
+    with span("render.portfolio", points=len(port_ret)):
+        cum = (1 + port_ret.fillna(0)).cumprod()
+        df_cum = chart_frame(cum.to_frame("Portfolio"), chart_width(), value_name="Portfolio")
+        st.plotly_chart(line_figure(df_cum, x="Date", y="Portfolio"), use_container_width=True)
 
     s_core = annualize_stats(core_ret)
     s_sat = annualize_stats(sat_port_ret)
@@ -663,3 +777,87 @@ with tab_strategy:
     )
 
     st.caption(f"Somme totale des poids = {df_buy['Poids'].sum():.2%}")
+
+    with st.expander(f"Analyses glissantes ({'/'.join(map(str, ROLLING_WINDOWS))}j : Sharpe, vol, drawdown, contributions)"):
+        an = analytics_stage(tuple(selected_sats), start_date, sat_params, core_choice, float(core_weight), max_w_sat)
+        if an is not None:
+            analytics_view(an)
+
+    with st.expander("Explorer l'aversion au risque (frontière efficiente)"):
+        frontier_view(sat_results, core_ticker_used, pct_returns(core_prices).iloc[:, 0], float(core_weight), max_w_sat,
+                      cov_method, risk_aversion)
+
+    with st.expander("Simulation du risque (Monte Carlo)"):
+        risk_view(port_ret)
+
+
+    # ============================================================
+    # BACKTEST WALK-FORWARD
+    # ============================================================
+    st.markdown("<div class='hr'></div>", unsafe_allow_html=True)
+    st.markdown("## Backtest walk-forward")
+    st.caption("Les résultats ci-dessus utilisent le Top K d'aujourd'hui sur tout l'historique (in-sample). "
+               "Le backtest refait momentum → Top K → optimisations à chaque rebalancement, sur le passé uniquement.")
+
+    backtest_view(tuple(sorted(valid)), start_date, core_ticker_used, float(core_weight), lookback, top_k,
+                  risk_aversion, max_w_stock, max_w_sat, cov_method)
+
+
+# ============================================================
+# DIAGNOSTICS (trace du rerun)
+# ============================================================
+def diagnostics_view(tracer) -> None:
+    if tracer.enabled:
+        with st.expander("Diagnostics (durées, réseau, caches)"):
+            trace = tracer.to_dict()
+            net = {k: v for k, v in trace["counters"].items() if k.startswith("network.")}
+            st.caption(f"Rerun : {trace['elapsed_ms']:.0f} ms | appels réseau : "
+                       + (", ".join(f"{k[len('network.'):]}={v}" for k, v in net.items()) or "aucun"))
+            st.caption(f"Dernière exécution complète : onglet KYC affiché à {STARTUP.get('kyc_ms', 0):.0f} ms, "
+                       f"imports lourds {STARTUP.get('imports_ms', 0):.0f} ms (≈ 0 une fois le processus chaud)")
+
+            st.markdown("**Étapes**")
+            st.dataframe(pd.DataFrame(tracer.summary(), columns=["name", "calls", "total_ms", "max_ms"])
+                         .style.format({"total_ms": "{:.1f}", "max_ms": "{:.1f}"}), use_container_width=True, hide_index=True)
+
+            per_sat = pd.DataFrame([s for s in trace["spans"] if "sat" in s], columns=["sat", "name", "duration_ms"])
+            if not per_sat.empty:
+                st.markdown("**Par satellite (ms)**")
+                st.dataframe(per_sat.pivot_table(index="sat", columns="name", values="duration_ms", aggfunc="sum")
+                             .style.format("{:.1f}"), use_container_width=True)
+
+            st.markdown("**Caches**")
+            st.dataframe(pd.DataFrame([{"fonction": k, "hits": v["hits"], "misses": v["misses"]} for k, v in trace["cache"].items()],
+                                      columns=["fonction", "hits", "misses"]), use_container_width=True, hide_index=True)
+            st.json({k: v for k, v in trace["counters"].items() if not k.startswith("cache.")}, expanded=False)
+
+            st.download_button(
+                "⬇️ Exporter la trace (JSON)",
+                data=tracer.to_json().encode("utf-8"),
+                file_name="trace_momentumx.json",
+                mime="application/json",
+            )
+
+
+with tab_strategy:
+    st.subheader("Core ETF + Satellites (momentum sélection Top K)")
+
+    st.sidebar.header("Paramètres")
+    start_date = st.sidebar.text_input("Start date (YYYY-MM-DD)", "2015-01-01")
+    lookback = st.sidebar.selectbox("Lookback momentum (jours)", list(LOOKBACKS), index=1)
+    top_k = st.sidebar.selectbox("Top K par satellite (momentum)", [3, 4, 5, 6, 7,  8, 9, 10, 11, 12, 13, 14, 15], index=2)
+    max_w_stock = st.sidebar.slider("Poids max par actif (intra-satellite)", 0.10, 1.00, 0.40, 0.01)
+    max_w_sat = st.sidebar.slider("Poids max par satellite (inter-satellites)", 0.10, 1.00, 0.60, 0.01)
+    cov_method = st.sidebar.selectbox("Estimateur de covariance", list(COV_METHODS), index=0,
+                                      format_func=lambda m: COV_LABELS.get(m, m))
+    # largeur d'affichage visée : fixe le nombre de points envoyés par courbe (charts.py)
+    st.sidebar.select_slider("Largeur des graphiques (px)", list(CHART_WIDTHS), value=CHART_WIDTH_PX, key="chart_width")
+    #min_w_stock = st.sidebar.slider("Poids max par actif (intra-satellite)", 0.05, 1.00, 0.40, 0.01) #raajout pour min sur opti oui mais le min est fonction du nombre d'actifs ....donc 0.05 pas tjrs possible....
+    #min_w_sat = st.sidebar.slider("Poids max par actif (intra-satellite)", 0.05, 1.00, 0.40, 0.01)
+    min_w_stock = 0.5 / top_k   # min dynamique: 50% du equal-weight
+
+    risk_profile = st.session_state.get("risk_profile", "Non défini")
+    core_default, risk_aversion = PROFILE_PARAMS.get(risk_profile, DEFAULT_PROFILE_PARAMS)
+
+    strategy_view(start_date, lookback, top_k, max_w_stock, max_w_sat, cov_method, min_w_stock, risk_profile,
+                  core_default, risk_aversion)
@@ -0,0 +1,287 @@
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field, replace
+
+import numpy as np
+import pandas as pd
+
+from covariance import estimate_cov
+from price_panel import FFILL_LIMIT, align_series, as_price_panel
+from quant import (LOOKBACKS, MeanVarianceFrontier, annualize_stats, mean_variance_frontier, momentum_panel, momentum_score,
+                   optimize_mean_variance, top_k_indices)
+from tracing import count, span, submit_traced
+
+# ============================================================
+# Pipeline d'un satellite : prix -> momentum -> Top K -> covariance -> optimisation
+# ============================================================
+# run_satellite est une étape pure (sans Streamlit) ; run_satellites l'exécute en parallèle
+# sur plusieurs satellites : chargement des prix sur un pool de threads, calcul dans le même
+# thread ou sur un pool de processus, résultats rendus dans l'ordre des clés demandées.
+
+
+@dataclass(frozen=True)
+class SatelliteParams:
+    lookback: int = 126
+    top_k: int = 5
+    risk_aversion: float = 7.0
+    max_w_stock: float = 0.40
+    min_w_stock: float = 0.10
+    cov_method: str = "sample"
+    cov_window: int = 252
+    ffill_limit: int = FFILL_LIMIT  # jours fermés consécutifs enjambés par titre (voir price_panel.align_returns)
+    frontier: bool = False          # garde la frontière efficiente du Top K (exploration de l'aversion)
+
+    @property
+    def ridge(self) -> float:
+        # le shrinkage (Ledoit-Wolf, EWMA) remplace le ridge
+        return 1e-6 if self.cov_method == "sample" else 0.0
+
+
+@dataclass
+class SatelliteResult:
+    sat_key: str
+    status: str                     # "OK", "NO DATA", "NO TOP" ou "NO RETURNS"
+    top: list = field(default_factory=list)
+    weights: pd.Series = field(default_factory=lambda: pd.Series(dtype=float))   # triés décroissants
+    returns: pd.Series = field(default_factory=lambda: pd.Series(dtype=float))
+    momentum: float = np.nan        # momentum moyen pondéré du Top K
+    stats: dict = field(default_factory=lambda: {"ret": np.nan, "vol": np.nan, "sharpe": np.nan})
+    elapsed: float = 0.0            # secondes passées dans l'étape de calcul
+    frontier: MeanVarianceFrontier | None = None   # si params.frontier
+    top_returns: np.ndarray | None = None          # rendements du Top K (ordre de top) aux dates de returns
+
+    def at_risk_aversion(self, risk_aversion: float) -> "SatelliteResult":
+        """Le même satellite pour une autre aversion au risque, lu sur la frontière (sans optimisation)."""
+        if self.frontier is None or self.top_returns is None:
+            return self
+        w_top = self.frontier.weights(risk_aversion)
+        sat_ret = pd.Series(self.top_returns @ w_top, index=self.returns.index)
+        return replace(self, weights=pd.Series(w_top, index=self.top).sort_values(ascending=False), returns=sat_ret,
+                       momentum=float(np.average(self.frontier.mu, weights=w_top)), stats=annualize_stats(sat_ret))
+
+
+def run_satellite(sat_key: str, prices, params: SatelliteParams, mom_panel=None) -> SatelliteResult:
+    """prices : PricePanel (ou DataFrame dates x tickers) de l'univers du satellite."""
+    t0 = time.perf_counter()
+    prices = as_price_panel(prices).drop_empty_columns()
+    count("pipeline.rows", len(prices))
+    count("pipeline.tickers", prices.shape[1])
+    if prices.empty or prices.shape[1] < 2:
+        return SatelliteResult(sat_key, "NO DATA", elapsed=time.perf_counter() - t0)
+
+    # alignement calculé une fois pour le panel : le Top K n'en prend que les colonnes
+    prices.aligned_returns(params.ffill_limit)
+    with span("satellite.momentum", sat=sat_key, tickers=prices.shape[1], rows=len(prices)):
+        if mom_panel is None:
+            mom_panel = momentum_panel(prices, lookbacks=LOOKBACKS if params.lookback in LOOKBACKS else (params.lookback,))
+        mom = momentum_score(prices, lookback_days=params.lookback, panel=mom_panel)
+    top = mom.index[top_k_indices(mom.values, params.top_k)].tolist()
+    if len(top) == 0:
+        return SatelliteResult(sat_key, "NO TOP", elapsed=time.perf_counter() - t0)
+    return _optimize_top(sat_key, prices.select(top), mom.reindex(top), params, t0)
+
+
+def _optimize_top(sat_key: str, prices_top, mom_top: pd.Series, params: SatelliteParams, t0: float) -> SatelliteResult:
+    """Étape commune après la sélection : covariance + optimisation sur l'historique du Top K."""
+    top = mom_top.index.tolist()
+    # rendements du Top K sur le calendrier union : une date est gardée si chaque titre y a un
+    # rendement ou une fermeture locale enjambée, et qu'au moins un cote (plus de dropna(how="any"))
+    sel = prices_top.select(top)
+    R, bridged = sel.aligned_returns(params.ffill_limit)
+    keep = (~np.isnan(R) | bridged).all(axis=1) & ~bridged.all(axis=1)
+    r_cov = R[keep].astype(float, copy=False)      # NaN les jours fermés : covariance par paire
+    r_sel = np.where(bridged[keep], 0.0, r_cov)     # rendement nul le jour fermé (série du satellite)
+    if len(r_sel) == 0:
+        return SatelliteResult(sat_key, "NO RETURNS", top=top, elapsed=time.perf_counter() - t0)
+
+    mu = mom_top.fillna(0.0).values
+    r_last = r_cov[-params.cov_window:]
+    with span("satellite.covariance", sat=sat_key, method=params.cov_method, rows=len(r_last)):
+        cov = estimate_cov(r_last, method=params.cov_method) if len(r_last) > 5 else np.eye(len(top)) * 1e-6
+
+    with span("satellite.optimize", sat=sat_key) as sp:
+        w_intra, info = optimize_mean_variance(mu=mu, cov=cov, risk_aversion=params.risk_aversion,
+                                               max_weight=params.max_w_stock, min_weight=params.min_w_stock,
+                                               ridge=params.ridge, return_info=True)
+        sp.set(iterations=info.get("iterations"), converged=info.get("converged"))
+    frontier = None
+    if params.frontier:
+        with span("satellite.frontier", sat=sat_key):
+            frontier = mean_variance_frontier(mu, cov, max_weight=params.max_w_stock, min_weight=params.min_w_stock,
+                                              ridge=params.ridge)
+    w_intra_ser = pd.Series(w_intra, index=top).sort_values(ascending=False)
+
+    w_top = w_intra_ser.reindex(top).values
+    sat_ret = pd.Series(r_sel @ w_top, index=sel.dates[keep])
+    sat_mom = float(np.average(mu, weights=w_top)) if w_intra_ser.sum() > 0 else float(mom_top.mean())
+    return SatelliteResult(
+        sat_key, "OK", top=top, weights=w_intra_ser, returns=sat_ret, momentum=sat_mom,
+        stats=annualize_stats(sat_ret), elapsed=time.perf_counter() - t0,
+        frontier=frontier, top_returns=r_sel if params.frontier else None,
+    )
+
+
+# ============================================================
+# Grands univers (milliers de tickers) : scoring en flux par lots
+# ============================================================
+# Le panel complet n'est jamais en mémoire : chaque lot est chargé (store -> téléchargement
+# des manquants), scoré puis libéré ; le lot suivant se charge pendant le scoring du courant.
+# Seul le Top K courant (scores) est conservé, puis l'historique complet des K gagnants est
+# relu pour la covariance et l'optimisation. Mémoire de pointe ~ 2 lots, indépendante de N.
+# Les scores d'un lot suivent le calendrier du lot (dates où au moins un de ses tickers cote) :
+# identiques au scoring global dès qu'aucune date n'est vide dans le lot, le cas des grands lots.
+
+LARGE_CHUNK = 250
+
+
+def scan_top_k(tickers, load_panel, lookback: int, top_k: int, chunk_size: int = LARGE_CHUNK) -> pd.Series:
+    """
+    Top K du momentum sur un univers parcouru par lots.
+    load_panel(tickers) -> PricePanel du lot (float32 conseillé : seul le score est gardé).
+    Retourne les scores des K meilleurs, triés décroissants.
+    """
+    tickers = list(dict.fromkeys(tickers))
+    chunks = [tickers[i:i + chunk_size] for i in range(0, len(tickers), chunk_size)]
+    best = pd.Series(dtype=float)
+    if not chunks:
+        return best
+    with ThreadPoolExecutor(max_workers=1) as loader:
+        pending = submit_traced(loader, load_panel, chunks[0])
+        for i in range(len(chunks)):
+            panel = pending.result()
+            if i + 1 < len(chunks):
+                pending = submit_traced(loader, load_panel, chunks[i + 1])   # I/O du lot suivant en parallèle
+            with span("scan.chunk", tickers=len(chunks[i]), rows=len(panel)):
+                panel = panel.drop_empty_columns()
+                count("scan.tickers", panel.shape[1])
+                if panel.shape[1] == 0:
+                    continue
+                scores = momentum_score(panel, lookback_days=lookback)
+                keep = top_k_indices(scores.values, top_k)
+                merged = pd.concat([best, scores.iloc[keep]])
+            best = merged.iloc[top_k_indices(merged.values, top_k)]
+            del panel, scores
+    return best
+
+
+def run_large_satellite(sat_key: str, tickers, load_panel, params: SatelliteParams,
+                        chunk_size: int = LARGE_CHUNK, mom_top: pd.Series | None = None) -> SatelliteResult:
+    """
+    run_satellite pour un grand univers : scan_top_k par lots, puis historique complet du Top K
+    seulement. load_panel(tickers, dtype) -> PricePanel.
+    mom_top : scores déjà scannés (triés décroissants, au moins top_k) -> pas de nouveau scan.
+    """
+    t0 = time.perf_counter()
+    if mom_top is not None:
+        mom_top = mom_top.iloc[:params.top_k]
+    else:
+        with span("satellite.scan", sat=sat_key, tickers=len(tickers)):
+            mom_top = scan_top_k(tickers, lambda ts: load_panel(ts, np.float32), params.lookback, params.top_k,
+                                 chunk_size)
+    if mom_top.empty:
+        return SatelliteResult(sat_key, "NO TOP", elapsed=time.perf_counter() - t0)
+    return _optimize_top(sat_key, load_panel(mom_top.index.tolist(), np.float64), mom_top, params, t0)
+
+
+def map_satellites(fn, sat_keys, max_workers: int | None = None, initializer=None) -> list:
+    """fn(sat_key) pour chaque clé sur un pool de threads (traceur propagé), résultats dans l'ordre de sat_keys."""
+    sat_keys = list(sat_keys)
+    if not sat_keys:
+        return []
+    with ThreadPoolExecutor(max_workers=max_workers or len(sat_keys), initializer=initializer) as io_pool:
+        futures = [submit_traced(io_pool, fn, k) for k in sat_keys]
+        return [f.result() for f in futures]
+
+
+def run_satellites(sat_keys, load_prices, params: SatelliteParams, load_momentum=None,
+                   max_workers: int | None = None, processes: int = 0, initializer=None) -> list:
+    """
+    Exécute run_satellite pour chaque clé, en parallèle.
+    load_prices(sat_key) -> DataFrame de prix (I/O : store disque, réseau...), appelé sur un pool de threads.
+    load_momentum(prices) -> MomentumPanel (optionnel, ex: version en cache).
+    processes > 0 : le calcul part sur un pool de processus pendant que les threads continuent les I/O.
+    initializer : appelé au démarrage de chaque thread (ex: attacher le contexte Streamlit).
+    Retourne les SatelliteResult dans l'ordre de sat_keys.
+    """
+    cpu_pool = ProcessPoolExecutor(max_workers=processes) if processes else None
+
+    def task(sat_key):
+        with span("satellite.load", sat=sat_key):
+            prices = load_prices(sat_key)
+            mom_panel = load_momentum(prices) if load_momentum is not None and not prices.empty else None
+        with span("satellite.run", sat=sat_key):
+            if cpu_pool is not None:
+                return cpu_pool.submit(run_satellite, sat_key, prices, params, mom_panel).result()
+            return run_satellite(sat_key, prices, params, mom_panel)
+
+    try:
+        return map_satellites(task, sat_keys, max_workers=max_workers, initializer=initializer)
+    finally:
+        if cpu_pool is not None:
+            cpu_pool.shutdown()
+
+
+# ============================================================
+# Inter-satellites : poids des satellites + portefeuille cœur/satellites + liste d'achat
+# ============================================================
+@dataclass
+class PortfolioResult:
+    valid: list                     # satellites avec une série de rendements exploitable
+    weights: pd.Series              # poids inter-satellites, triés décroissants
+    min_weight: float               # plancher inter-satellites (50% de 1/N)
+    core_returns: pd.Series
+    sat_returns: pd.Series
+    returns: pd.Series              # portefeuille final
+    positions: dict                 # ticker -> poids final (cœur + titres des satellites)
+    core_weight: float = np.nan
+    sat_components: pd.DataFrame | None = None   # rendements de chaque satellite sur l'index du portefeuille
+
+
+def combine_satellites(results, core_ticker: str, core_returns: pd.Series, core_weight: float,
+                       risk_aversion: float, max_w_sat: float, cov_method: str = "sample") -> PortfolioResult | None:
+    """
+    Optimisation inter-satellites sur les SatelliteResult puis mélange avec le cœur.
+    Satellites et cœur partagent un calendrier union (price_panel.align_series) : un jour où une
+    place est fermée compte pour NaN dans la covariance (par paire) et 0 dans le portefeuille.
+    Retourne None si aucun satellite (ou le cœur) n'a de rendements.
+    """
+    by_key = {r.sat_key: r for r in results}
+    valid = [r.sat_key for r in results if not r.returns.dropna().empty]
+    core_ret = core_returns.dropna()
+    if not valid or core_ret.empty:
+        return None
+
+    with span("stage.inter_satellites", sats=len(valid)):
+        series = [by_key[k].returns.dropna() for k in valid] + [core_ret]
+        dates, M, filled = align_series([(r.index.values, r.values) for r in series])
+        dates = pd.DatetimeIndex(dates)
+        n_obs = int((~np.isnan(M[:, :len(valid)])).all(axis=1).sum())
+        mu_sats = np.array([by_key[k].momentum if np.isfinite(by_key[k].momentum) else 0.0 for k in valid])
+        cov_sats = (estimate_cov(M[:, :len(valid)], method=cov_method) if n_obs > 5
+                    else np.eye(len(valid)) * 1e-6)
+
+        # Min inter-satellites dynamique (ex: 50% de l'équipondération)
+        min_w_sat = 0.5 / len(valid)
+        w_sats = optimize_mean_variance(mu=mu_sats, cov=cov_sats, risk_aversion=risk_aversion, max_weight=max_w_sat,
+                                        min_weight=min_w_sat, ridge=1e-6 if cov_method == "sample" else 0.0)
+        w_sats_ser = pd.Series(w_sats, index=valid).sort_values(ascending=False)
+
+    components = pd.DataFrame(filled[:, :len(valid)], index=dates, columns=valid)
+    sat_port_ret = pd.Series(components.values @ w_sats_ser.reindex(valid).values, index=dates)
+    core_ret = pd.Series(filled[:, -1], index=dates)
+    sats_weight = 1.0 - core_weight
+    port_ret = core_weight * core_ret + sats_weight * sat_port_ret
+
+    # liste d'achat : cœur puis titres des satellites (un titre commun à deux satellites est cumulé)
+    positions = {core_ticker: float(core_weight)}
+    for sat_key in valid:
+        sat_w = float(w_sats_ser.get(sat_key, 0.0))
+        if sat_w <= 0 or by_key[sat_key].weights.empty:
+            continue
+        for ticker, w_intra in by_key[sat_key].weights.items():
+            w_final = float(sats_weight) * sat_w * float(w_intra)
+            if w_final > 0:
+                positions[ticker] = positions.get(ticker, 0.0) + w_final
+
+    return PortfolioResult(valid, w_sats_ser, min_w_sat, core_ret, sat_port_ret, port_ret, positions,
+                           float(core_weight), components)
@@ -0,0 +1,387 @@
+import argparse
+import json
+import os
+import pickle
+import shutil
+import threading
+import time
+from dataclasses import replace
+
+import numpy as np
+import pandas as pd
+
+from catalog import DEFAULT_PROFILE_PARAMS, PROFILE_PARAMS, SAT_UNIVERSE, is_large_universe
+from covariance import COV_METHODS
+from pipeline import SatelliteParams, SatelliteResult, run_large_satellite, run_satellite, scan_top_k
+from quant import LOOKBACKS, RISK_AVERSION_RANGE, momentum_panel, momentum_score
+from tracing import count, span
+
+# ============================================================
+# Précalcul en tâche de fond : classements, covariances et poids intra publiés en artefacts
+# ============================================================
+# Les entrées ne changent qu'une fois par séance : après la clôture de chaque place, le
+# planificateur rafraîchit le store de prix des satellites qui y cotent et recalcule, pour
+# chaque lookback x Top K x estimateur, le classement momentum et le Top K optimisé avec sa
+# frontière efficiente (covariance comprise). Les profils de risque ne diffèrent que par
+# l'aversion : leurs poids sont lus sur la frontière (SatelliteResult.at_risk_aversion).
+# Grille couverte : tous les lookbacks, Top K et estimateurs de covariance du sidebar, mais un
+# seul plafond par titre (MAX_W_STOCKS, défaut du sidebar) : le curseur est continu (0,10 à 1,00),
+# une session qui le déplace hors de la grille rate l'artefact et calcule en direct.
+# --max-w-stocks 0.3 0.4 0.5 ajoute des plafonds (coût proportionnel).
+# Publication : un répertoire par version, rempli à côté puis renommé, et un pointeur CURRENT
+# remplacé atomiquement (os.replace). Une session Streamlit ne fait plus qu'une lecture.
+# python precompute.py             -> un passage complet (cron)
+# python precompute.py --daemon    -> tourne en continu, recalcule après chaque clôture
+
+ARTIFACT_DIR = os.environ.get(
+    "MOMENTUMX_ARTIFACT_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".momentumx_cache", "artifacts"),
+)
+
+TOP_KS = tuple(range(3, 16))            # choix du sidebar
+MAX_W_STOCKS = (0.40,)                  # défaut du sidebar (curseur continu : voir l'en-tête)
+DEFAULT_START = "2015-01-01"
+KEEP_VERSIONS = 3                       # versions gardées : une session en cours de lecture n'est pas coupée
+PUBLISH_DELAY_MIN = 30                  # attente après la clôture (cours publiés par Yahoo)
+GRACE_MIN = 60                          # un artefact reste servi le temps que le passage suivant tourne
+
+# place (suffixe Yahoo) -> (fuseau, clôture locale) ; "" = US, "=F" = futures
+EXCHANGE_CLOSES = {
+    "": ("America/New_York", "16:00"),
+    "=F": ("America/New_York", "17:00"),
+    ".TO": ("America/Toronto", "16:00"),
+    ".SA": ("America/Sao_Paulo", "17:00"),
+    ".MX": ("America/Mexico_City", "15:00"),
+    ".L": ("Europe/London", "16:30"),
+    ".PA": ("Europe/Paris", "17:30"),
+    ".AS": ("Europe/Amsterdam", "17:30"),
+    ".BR": ("Europe/Brussels", "17:30"),
+    ".LS": ("Europe/Lisbon", "16:30"),
+    ".DE": ("Europe/Berlin", "17:30"),
+    ".MI": ("Europe/Rome", "17:30"),
+    ".MC": ("Europe/Madrid", "17:30"),
+    ".SW": ("Europe/Zurich", "17:30"),
+    ".VI": ("Europe/Vienna", "17:30"),
+    ".ST": ("Europe/Stockholm", "17:30"),
+    ".HE": ("Europe/Helsinki", "18:30"),
+    ".CO": ("Europe/Copenhagen", "17:00"),
+    ".OL": ("Europe/Oslo", "16:20"),
+    ".WA": ("Europe/Warsaw", "17:00"),
+    ".BD": ("Europe/Budapest", "17:00"),
+    ".PR": ("Europe/Prague", "16:30"),
+    ".JO": ("Africa/Johannesburg", "17:00"),
+    ".SR": ("Asia/Riyadh", "15:00"),
+    ".AE": ("Asia/Dubai", "15:00"),
+    ".NS": ("Asia/Kolkata", "15:30"),
+    ".KL": ("Asia/Kuala_Lumpur", "17:00"),
+    ".BK": ("Asia/Bangkok", "16:30"),
+    ".SI": ("Asia/Singapore", "17:00"),
+    ".JK": ("Asia/Jakarta", "16:00"),
+    ".HK": ("Asia/Hong_Kong", "16:00"),
+    ".TW": ("Asia/Taipei", "13:30"),
+    ".KS": ("Asia/Seoul", "15:30"),
+    ".T": ("Asia/Tokyo", "15:30"),
+    ".AX": ("Australia/Sydney", "16:00"),
+}
+
+
+def exchange_of(ticker: str) -> str:
+    """Place de cotation d'un ticker Yahoo (clé de EXCHANGE_CLOSES) ; suffixe inconnu -> US."""
+    if ticker.endswith("=F"):
+        return "=F"
+    head, dot, suffix = ticker.rpartition(".")
+    return "." + suffix if dot and head and "." + suffix in EXCHANGE_CLOSES else ""
+
+
+def next_close(exchange: str, after: pd.Timestamp) -> pd.Timestamp:
+    """Première clôture (jour ouvré, fériés ignorés) strictement après `after`, en UTC."""
+    tz, hhmm = EXCHANGE_CLOSES[exchange]
+    after = pd.Timestamp(after)
+    after = after.tz_localize("UTC") if after.tz is None else after.tz_convert("UTC")
+    day = after.tz_convert(tz).normalize().tz_localize(None)
+    while True:
+        close = pd.Timestamp(f"{day.date()} {hhmm}").tz_localize(tz).tz_convert("UTC")
+        if day.weekday() < 5 and close > after:
+            return close
+        day += pd.Timedelta(days=1)
+
+
+def satellite_exchanges(sat_key: str) -> set:
+    return {exchange_of(t) for t in SAT_UNIVERSE.get(sat_key, [])}
+
+
+def valid_until(sat_key: str, computed: pd.Timestamp, delay_min: float = PUBLISH_DELAY_MIN) -> pd.Timestamp:
+    """Un artefact reste à jour jusqu'à la prochaine clôture d'une de ses places (+ délai, + marge)."""
+    delay = pd.Timedelta(minutes=delay_min)
+    nxt = min(next_close(ex, computed - delay) for ex in satellite_exchanges(sat_key) or {""})
+    return nxt + delay + pd.Timedelta(minutes=GRACE_MIN)
+
+
+def _result_key(params: SatelliteParams) -> tuple:
+    # l'aversion et la frontière ne font pas partie de la clé : tout est lu sur la frontière
+    return (params.lookback, params.top_k, round(params.max_w_stock, 6), round(params.min_w_stock, 6),
+            params.cov_method, params.cov_window, params.ffill_limit)
+
+
+def grid_params(lookbacks=LOOKBACKS, top_ks=TOP_KS, cov_methods=COV_METHODS,
+                max_w_stocks=MAX_W_STOCKS) -> list:
+    """Paramètres précalculés : min intra dynamique comme l'app, aversion de référence, frontière gardée."""
+    return [SatelliteParams(lookback=lb, top_k=k, risk_aversion=DEFAULT_PROFILE_PARAMS[1], max_w_stock=mw,
+                            min_w_stock=0.5 / k, cov_method=cm, frontier=True)
+            for lb in lookbacks for k in top_ks for cm in cov_methods for mw in max_w_stocks]
+
+
+def precompute_satellite(sat_key: str, store, start: str, grid: list) -> dict:
+    """
+    Un satellite, toute la grille : {"rankings": {lookback: scores triés}, "results": {clé: SatelliteResult},
+    "data_end": dernière date de prix}. Prix et momentum sont lus une fois pour toute la grille.
+    """
+    rankings, results = {}, {}
+    lookbacks = sorted({p.lookback for p in grid})
+    with span("precompute.satellite", sat=sat_key, params=len(grid)):
+        if is_large_universe(sat_key):
+            # un scan par lookback au K maximal ; les K plus petits en sont les premiers
+            def load(ts, dtype):
+                return store.get_panel(ts, start=start, dtype=dtype).dropna_rows()
+
+            k_max = max(p.top_k for p in grid)
+            for lb in lookbacks:
+                rankings[lb] = scan_top_k(SAT_UNIVERSE[sat_key], lambda ts: load(ts, np.float32), lb, k_max)
+            for p in grid:
+                results[_result_key(p)] = run_large_satellite(sat_key, SAT_UNIVERSE[sat_key], load, p,
+                                                              mom_top=rankings[p.lookback])
+            data_end = max((r.returns.index[-1] for r in results.values() if len(r.returns)), default=None)
+        else:
+            # colonnes vides retirées une fois : run_satellite reçoit toujours le même panel (alignement partagé)
+            prices = store.get_panel(SAT_UNIVERSE[sat_key], start=start).dropna_rows().drop_empty_columns()
+            mom_panel = momentum_panel(prices, lookbacks=LOOKBACKS) if not prices.empty else None
+            for lb in lookbacks:
+                rankings[lb] = (momentum_score(prices, lb, panel=mom_panel).dropna().sort_values(ascending=False)
+                                if mom_panel is not None else pd.Series(dtype=float))
+            for p in grid:
+                results[_result_key(p)] = run_satellite(sat_key, prices, p, mom_panel)
+            data_end = prices.dates[-1] if len(prices) else None
+    return {"rankings": rankings, "results": results,
+            "data_end": None if data_end is None else str(pd.Timestamp(data_end).date())}
+
+
+class ArtifactStore:
+    """
+    Artefacts versionnés : root/<version>/{manifest.json, <satellite>.pkl} et root/CURRENT
+    qui désigne la version servie. Les lecteurs suivent CURRENT ; un fichier de satellite
+    n'est chargé qu'une fois par version.
+    """
+
+    def __init__(self, root: str = ARTIFACT_DIR, keep: int = KEEP_VERSIONS):
+        self.root = root
+        self.keep = keep
+        self._lock = threading.Lock()
+        self._loaded = {}               # (version, satellite) -> contenu du .pkl
+
+    # ---------- lecture ----------
+    def current_version(self) -> str | None:
+        try:
+            with open(os.path.join(self.root, "CURRENT"), encoding="utf-8") as f:
+                return f.read().strip() or None
+        except OSError:
+            return None
+
+    def manifest(self, version: str | None = None) -> dict | None:
+        version = version or self.current_version()
+        if version is None:
+            return None
+        try:
+            with open(os.path.join(self.root, version, "manifest.json"), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _entry(self, sat_key: str, start: str, now: float | None = None):
+        """(version, entrée du manifeste) du satellite s'il est publié, pour ce start, et encore à jour."""
+        version = self.current_version()
+        manifest = self.manifest(version)
+        if manifest is None or manifest.get("start") != start:
+            return None, None
+        entry = manifest["sats"].get(sat_key)
+        now = time.time() if now is None else now
+        if entry is None or now >= entry["valid_until"]:
+            return None, None
+        return version, entry
+
+    def _payload(self, version: str, sat_key: str, entry: dict) -> dict | None:
+        with self._lock:
+            payload = self._loaded.get((version, sat_key))
+        if payload is not None:
+            return payload
+        try:
+            with open(os.path.join(self.root, version, entry["file"]), "rb") as f:
+                payload = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None            # version élaguée entre-temps : le prochain appel suivra CURRENT
+        with self._lock:
+            # seule la version courante reste en mémoire
+            self._loaded = {k: v for k, v in self._loaded.items() if k[0] == version}
+            self._loaded[(version, sat_key)] = payload
+        return payload
+
+    def lookup(self, sat_key: str, start: str, params: SatelliteParams) -> SatelliteResult | None:
+        """Résultat précalculé pour ces paramètres (aversion lue sur la frontière), ou None."""
+        version, entry = self._entry(sat_key, start)
+        payload = self._payload(version, sat_key, entry) if entry is not None else None
+        res = payload["results"].get(_result_key(params)) if payload is not None else None
+        lo, hi = RISK_AVERSION_RANGE
+        if res is None or not lo <= params.risk_aversion <= hi:
+            count("artifacts.miss")
+            return None
+        count("artifacts.hit")
+        res = res.at_risk_aversion(params.risk_aversion)
+        if not params.frontier:
+            res = replace(res, frontier=None, top_returns=None)
+        return replace(res, elapsed=0.0)
+
+    def ranking(self, sat_key: str, start: str, lookback: int) -> pd.Series | None:
+        """Classement momentum publié (scores triés décroissants ; K max seulement pour un grand univers)."""
+        version, entry = self._entry(sat_key, start)
+        payload = self._payload(version, sat_key, entry) if entry is not None else None
+        return None if payload is None else payload["rankings"].get(lookback)
+
+    # ---------- publication ----------
+    def publish(self, payloads: dict, start: str, grid: list, delay_min: float = PUBLISH_DELAY_MIN) -> str:
+        """
+        Publie une nouvelle version : satellites recalculés ({clé: precompute_satellite(...)}) +
+        satellites inchangés de la version courante (liens physiques). Retourne la version.
+        """
+        now = pd.Timestamp.now(tz="UTC")
+        version = now.strftime("%Y%m%dT%H%M%S%fZ")
+        prev_version = self.current_version()
+        prev = self.manifest(prev_version)
+        grid_desc = sorted({_result_key(p) for p in grid})
+        sats = {}
+        if prev is not None and prev.get("start") == start and prev.get("grid") == json.loads(json.dumps(grid_desc)):
+            sats = {k: e for k, e in prev["sats"].items() if k not in payloads}
+
+        os.makedirs(self.root, exist_ok=True)
+        tmp_dir = os.path.join(self.root, f".tmp-{version}")
+        os.makedirs(tmp_dir)
+        with span("precompute.publish", version=version, sats=len(payloads)):
+            for k, entry in sats.items():
+                src, dst = os.path.join(self.root, prev_version, entry["file"]), os.path.join(tmp_dir, entry["file"])
+                try:
+                    os.link(src, dst)
+                except OSError:
+                    shutil.copy2(src, dst)
+            for k, payload in payloads.items():
+                name = f"{k}.pkl"
+                with open(os.path.join(tmp_dir, name), "wb") as f:
+                    pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+                sats[k] = {"file": name, "computed_at": now.isoformat(), "data_end": payload["data_end"],
+                           "valid_until": valid_until(k, now, delay_min).timestamp()}
+            manifest = {"version": version, "created": now.isoformat(), "start": start, "grid": grid_desc,
+                        "sats": dict(sorted(sats.items()))}
+            with open(os.path.join(tmp_dir, "manifest.json"), "w", encoding="utf-8") as f:
+                json.dump(manifest, f, ensure_ascii=False, indent=1)
+            os.rename(tmp_dir, os.path.join(self.root, version))
+            tmp = os.path.join(self.root, "CURRENT.tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(version)
+            os.replace(tmp, os.path.join(self.root, "CURRENT"))
+        self._prune()
+        return version
+
+    def _prune(self) -> None:
+        current = self.current_version()
+        versions = sorted(d for d in os.listdir(self.root)
+                          if os.path.isdir(os.path.join(self.root, d)) and not d.startswith("."))
+        for d in versions[:-self.keep]:
+            if d != current:
+                shutil.rmtree(os.path.join(self.root, d), ignore_errors=True)
+
+
+def run_precompute(sat_keys, store, artifacts: ArtifactStore, start: str = DEFAULT_START, grid=None,
+                   delay_min: float = PUBLISH_DELAY_MIN) -> str:
+    """Recalcule les satellites demandés (le store se rafraîchit à la lecture) et publie une version."""
+    grid = grid or grid_params()
+    payloads = {}
+    with span("precompute.run", sats=len(sat_keys), params=len(grid)):
+        for k in sat_keys:
+            payloads[k] = precompute_satellite(k, store, start, grid)
+    return artifacts.publish(payloads, start, grid, delay_min)
+
+
+def next_event(sat_keys, now: pd.Timestamp, delay_min: float = PUBLISH_DELAY_MIN) -> tuple:
+    """Prochaine clôture (+ délai) d'une place des satellites -> (instant UTC, satellites concernés)."""
+    delay = pd.Timedelta(minutes=delay_min)
+    by_exchange = {}
+    for k in sat_keys:
+        for ex in satellite_exchanges(k):
+            by_exchange.setdefault(ex, []).append(k)
+    times = {ex: next_close(ex, now - delay) + delay for ex in by_exchange}
+    when = min(times.values())
+    due = {k for ex, t in times.items() if t == when for k in by_exchange[ex]}
+    return when, [k for k in sat_keys if k in due]
+
+
+def run_daemon(sat_keys, store, artifacts: ArtifactStore, start: str = DEFAULT_START, grid=None,
+               delay_min: float = PUBLISH_DELAY_MIN) -> None:
+    """Boucle sans fin : passage initial pour les satellites périmés, puis un passage après chaque clôture."""
+    stale = [k for k in sat_keys if artifacts._entry(k, start)[1] is None]
+    if stale:
+        print(f"passage initial : {', '.join(stale)} -> {run_precompute(stale, store, artifacts, start, grid, delay_min)}",
+              flush=True)
+    while True:
+        when, due = next_event(sat_keys, pd.Timestamp.now(tz="UTC"), delay_min)
+        print(f"prochain passage {when:%Y-%m-%d %H:%M} UTC : {', '.join(due)}", flush=True)
+        time.sleep(max((when - pd.Timestamp.now(tz="UTC")).total_seconds(), 0.0))
+        try:
+            version = run_precompute(due, store, artifacts, start, grid, delay_min)
+            print(f"publié {version}", flush=True)
+        except Exception as e:      # un passage raté (réseau...) n'arrête pas le démon
+            print(f"échec du passage : {e!r}", flush=True)
+            time.sleep(60)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Précalcul Momentum-X : classements et poids intra publiés en artefacts.",
+        epilog="Grille : lookbacks x Top K x estimateurs x plafonds par titre (--max-w-stocks, défaut 0.40). "
+               "Une session dont le curseur « Poids max par actif » est hors de la grille calcule en direct.")
+    parser.add_argument("--sats", nargs="+", default=list(SAT_UNIVERSE), help="clés satellites (ex: EM TECH)")
+    parser.add_argument("--start", default=DEFAULT_START)
+    parser.add_argument("--top-ks", nargs="+", type=int, default=list(TOP_KS))
+    parser.add_argument("--cov-methods", nargs="+", default=list(COV_METHODS), choices=list(COV_METHODS))
+    parser.add_argument("--max-w-stocks", nargs="+", type=float, default=list(MAX_W_STOCKS),
+                        help="plafonds par titre précalculés ; toute autre position du curseur est calculée en direct")
+    parser.add_argument("--delay", type=float, default=PUBLISH_DELAY_MIN, help="minutes après la clôture")
+    parser.add_argument("--daemon", action="store_true", help="tourne en continu (sinon : un passage, pour cron)")
+    parser.add_argument("--status", action="store_true", help="affiche la version publiée sans rien calculer")
+    args = parser.parse_args()
+
+    artifacts = ArtifactStore()
+    if args.status:
+        manifest = artifacts.manifest()
+        if manifest is None:
+            print("aucun artefact publié")
+            return
+        print(f"version {manifest['version']} (start {manifest['start']}, {len(manifest['grid'])} paramètres)")
+        for k, e in manifest["sats"].items():
+            until = pd.Timestamp(e["valid_until"], unit="s", tz="UTC")
+            print(f"  {k:<8} données au {e['data_end']}, calculé {e['computed_at'][:16]}, à jour jusqu'à {until:%Y-%m-%d %H:%M} UTC")
+        return
+
+    from price_store import PriceStore
+    from ticker_health import TickerHealth
+
+    store = PriceStore(health=TickerHealth())
+    grid = grid_params(top_ks=args.top_ks, cov_methods=args.cov_methods, max_w_stocks=args.max_w_stocks)
+    profiles = {p: ra for p, (_, ra) in PROFILE_PARAMS.items()}
+    print(f"{len(args.sats)} satellites x {len(grid)} paramètres ; profils {profiles} lus sur la frontière")
+    if args.daemon:
+        run_daemon(args.sats, store, artifacts, args.start, grid, args.delay)
+        return
+    t0 = time.perf_counter()
+    version = run_precompute(args.sats, store, artifacts, args.start, grid, args.delay)
+    print(f"publié {version} en {time.perf_counter() - t0:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
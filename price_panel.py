@@ -0,0 +1,184 @@
+import numpy as np
+import pandas as pd
+
+# ============================================================
+# Panel de prix compact : un tableau contigu (dates x tickers) + deux index
+# ============================================================
+# Remplace les DataFrame dans le pipeline (store -> momentum -> Top K -> covariance) :
+# - tranches de lignes et blocs de colonnes contigus = vues numpy, sans copie ;
+# - rendements calculés une fois (propriété returns) et partagés avec les sous-panels ;
+# - float32 possible pour les grands univers (moitié moins de mémoire).
+# On ne repasse en pandas (frame()) qu'à l'affichage.
+
+FFILL_LIMIT = 5     # jours fermés consécutifs enjambés (fériés d'une place) ; au-delà : suspension, ligne perdue
+
+
+class PricePanel:
+    def __init__(self, values: np.ndarray, dates, tickers, returns: np.ndarray | None = None,
+                 aligned: dict | None = None):
+        self.values = values
+        self.dates = pd.DatetimeIndex(dates)
+        self.tickers = pd.Index(tickers)
+        self._returns = returns
+        self._aligned = aligned or {}   # limite -> (rendements alignés, jours fermés enjambés)
+        self._pos = None
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, dtype=np.float64) -> "PricePanel":
+        if not df.index.is_monotonic_increasing:
+            df = df.sort_index()
+        return cls(np.ascontiguousarray(df.to_numpy(dtype=dtype)), df.index, df.columns)
+
+    def frame(self) -> pd.DataFrame:
+        """Vue pandas (sans copie) : à réserver à l'affichage et aux exports."""
+        return pd.DataFrame(self.values, index=self.dates, columns=self.tickers, copy=False)
+
+    @property
+    def shape(self) -> tuple:
+        return self.values.shape
+
+    @property
+    def empty(self) -> bool:
+        return self.values.size == 0
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    @property
+    def returns(self) -> np.ndarray:
+        """Rendements simples (ligne 0 = NaN, inf -> NaN), calculés au premier accès."""
+        if self._returns is None:
+            v = self.values
+            r = np.full(v.shape, np.nan, dtype=v.dtype)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                np.divide(v[1:], v[:-1], out=r[1:])
+            r[1:] -= 1.0
+            r[~np.isfinite(r)] = np.nan
+            self._returns = r
+        return self._returns
+
+    def aligned_returns(self, limit: int = FFILL_LIMIT) -> tuple:
+        """
+        (R, bridged) sur le calendrier union du panel, calculés une fois par limite et partagés
+        avec les sous-panels. R : rendement depuis le dernier prix connu (NaN les jours où la place
+        est fermée) ; bridged : jours fermés d'au plus `limit` lignes consécutives. Voir align_returns.
+        """
+        if limit not in self._aligned:
+            self._aligned[limit] = align_returns(self.values, limit)
+        return self._aligned[limit]
+
+    def positions(self, tickers) -> np.ndarray:
+        """Colonnes des tickers présents (ordre demandé, doublons et absents ignorés)."""
+        if self._pos is None:
+            self._pos = {t: i for i, t in enumerate(self.tickers)}
+        pos = self._pos
+        return np.array([pos[t] for t in dict.fromkeys(tickers) if t in pos], dtype=np.intp)
+
+    def _take_cols(self, idx: np.ndarray) -> "PricePanel":
+        if len(idx) and np.array_equal(idx, np.arange(idx[0], idx[0] + len(idx))):
+            cols = slice(int(idx[0]), int(idx[0]) + len(idx))   # bloc contigu : vue
+        else:
+            cols = idx
+        r = self._returns[:, cols] if self._returns is not None else None
+        aligned = {k: (R[:, cols], b[:, cols]) for k, (R, b) in self._aligned.items()}
+        return PricePanel(self.values[:, cols], self.dates, self.tickers[cols], r, aligned)
+
+    def select(self, tickers) -> "PricePanel":
+        """Sous-panel sur des tickers ; vue si les colonnes sont contiguës, copie sinon."""
+        return self._take_cols(self.positions(tickers))
+
+    def rows(self, lo: int, hi: int | None = None) -> "PricePanel":
+        """
+        Lignes [lo, hi) : toujours une vue. Les rendements restent ceux du panel parent
+        (la première ligne garde son rendement par rapport à la veille).
+        """
+        sl = slice(lo, hi)
+        r = self._returns[sl] if self._returns is not None else None
+        aligned = {k: (R[sl], b[sl]) for k, (R, b) in self._aligned.items()}
+        return PricePanel(self.values[sl], self.dates[sl], self.tickers, r, aligned)
+
+    def window(self, start=None, end=None) -> "PricePanel":
+        """Lignes de dates dans [start, end] (vue)."""
+        lo = 0 if start is None else self.dates.searchsorted(pd.Timestamp(start), side="left")
+        hi = len(self.dates) if end is None else self.dates.searchsorted(pd.Timestamp(end), side="right")
+        return self.rows(lo, hi)
+
+    def tail(self, n: int) -> "PricePanel":
+        return self.rows(max(len(self.dates) - n, 0))
+
+    def dropna_rows(self) -> "PricePanel":
+        """Retire les dates sans aucun prix (jours fériés de toutes les places du panel)."""
+        keep = ~np.isnan(self.values).all(axis=1)
+        if keep.all():
+            return self
+        # les rendements changent (on enjambe les lignes retirées) : recalculés à la demande
+        return PricePanel(self.values[keep], self.dates[keep], self.tickers)
+
+    def drop_empty_columns(self) -> "PricePanel":
+        keep = ~np.isnan(self.values).all(axis=0)
+        if keep.all():
+            return self
+        return self._take_cols(np.flatnonzero(keep))
+
+    def astype(self, dtype) -> "PricePanel":
+        if self.values.dtype == dtype:
+            return self
+        r = self._returns.astype(dtype) if self._returns is not None else None
+        aligned = {k: (R.astype(dtype), b) for k, (R, b) in self._aligned.items()}
+        return PricePanel(self.values.astype(dtype), self.dates, self.tickers, r, aligned)
+
+
+def as_price_panel(prices) -> PricePanel:
+    """Accepte un PricePanel (tel quel) ou un DataFrame dates x tickers."""
+    return prices if isinstance(prices, PricePanel) else PricePanel.from_frame(prices)
+
+
+# ============================================================
+# Alignement multi-places : calendrier union, fermetures locales enjambées
+# ============================================================
+# Un panel multi-places a une ligne par jour où au moins une place cote. Avant : un jour férié
+# à Taipei vidait la ligne pour tout le Top K (dropna(how="any")), et le rendement du lendemain
+# aussi (veille sans prix). Ici chaque titre garde son calendrier : le rendement de réouverture
+# part du dernier prix connu, le jour fermé vaut NaN pour la covariance (par paire, sur les jours
+# communs) et 0 pour les séries de portefeuille (le mouvement est compté à la réouverture).
+
+
+def align_returns(values: np.ndarray, limit: int = FFILL_LIMIT) -> tuple:
+    """
+    values : prix (dates x tickers, NaN = pas de cotation). Retourne (R, bridged) :
+    R[t] = values[t] / dernier prix avant t - 1 si ce prix date d'au plus `limit` lignes sautées, NaN sinon ;
+    bridged[t] = pas de prix à t, dans un trou d'au plus `limit` lignes après un premier prix.
+    Sans trou, R est égal à PricePanel.returns.
+    """
+    T, N = values.shape
+    ok = np.isfinite(values)
+    rows = np.arange(T)[:, None]
+    last = np.maximum.accumulate(np.where(ok, rows, -1), axis=0)                # dernier prix à t ou avant
+    nxt = np.minimum.accumulate(np.where(ok, rows, T)[::-1], axis=0)[::-1]      # prochain prix à t ou après
+    prev = np.vstack([np.full((1, N), -1), last[:-1]]) if T else last           # dernier prix strictement avant t
+    bridged = ~ok & (last >= 0) & (nxt - last - 1 <= limit)
+    valid = ok & (prev >= 0) & (rows - prev - 1 <= limit)
+    R = np.full(values.shape, np.nan, dtype=values.dtype)
+    base = np.take_along_axis(values, np.where(valid, prev, 0), axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        np.divide(values, base, out=R, where=valid)
+    R[valid] -= 1.0
+    R[~np.isfinite(R)] = np.nan
+    return R, bridged
+
+
+def align_series(series) -> tuple:
+    """
+    Séries de rendements [(dates triées, valeurs sans NaN), ...] -> (dates, M, filled) sur leur
+    calendrier union, restreint à la période couverte par toutes. M : NaN les jours où une série
+    n'a pas de ligne (sa place était fermée) ; filled : 0 à la place (rendement nul ce jour-là).
+    """
+    dates = [np.asarray(d) for d, _ in series]
+    lo, hi = max(d[0] for d in dates), min(d[-1] for d in dates)
+    union = np.unique(np.concatenate(dates))
+    union = union[(union >= lo) & (union <= hi)]
+    M = np.full((len(union), len(dates)), np.nan)
+    for j, (d, (_, v)) in enumerate(zip(dates, series)):
+        inside = (d >= lo) & (d <= hi)
+        M[np.searchsorted(union, d[inside]), j] = np.asarray(v, dtype=float)[inside]
+    return union, M, np.nan_to_num(M, nan=0.0)
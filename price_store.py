@@ -0,0 +1,249 @@
+import os
+import threading
+from urllib.parse import quote
+
+import numpy as np
+import pandas as pd
+
+from price_panel import PricePanel
+from tracing import count, span
+
+# ============================================================
+# Stockage local des prix (Adj Close), un fichier par ticker
+# ============================================================
+# Chaque fichier .npz contient deux colonnes (dates, close) + la plage de dates
+# déjà couverte par des téléchargements Yahoo. Au lieu de retélécharger 10 ans
+# d'historique à chaque redémarrage, on ne récupère que la tête ou la queue manquante.
+
+STORE_DIR = os.environ.get(
+    "MOMENTUMX_STORE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".momentumx_cache", "prices"),
+)
+
+# Nombre de jours recouverts lors d'un rafraîchissement de queue : sert à détecter
+# un réajustement de l'historique (dividende, split) côté Yahoo.
+TAIL_OVERLAP_DAYS = 7
+ADJ_TOLERANCE = 1e-6
+
+# Découpage des téléchargements : des lots bornés, téléchargés l'un après l'autre
+CHUNK_SIZE = 40
+
+# yf.download partage un état global (shared._DFS) entre appels : deux appels
+# simultanés mélangent leurs résultats. Les lots passent donc un par un ; le parallélisme
+# réseau vient de threads=True, à l'intérieur de chaque appel (un thread par ticker).
+_YF_LOCK = threading.Lock()
+
+
+def yahoo_download(tickers, start, end=None) -> pd.DataFrame:
+    """
+    Télécharge les Adj Close (ou Close à défaut) de Yahoo Finance.
+    Retourne un DataFrame dates x tickers (colonnes NaN pour les tickers sans données).
+    """
+    import yfinance as yf   # import lourd (~0,3 s) : seulement au premier téléchargement
+
+    count("network.yf_download")
+    with _YF_LOCK, span("yf.download", tickers=len(tickers), start=str(start)):
+        data = yf.download(
+            tickers=list(tickers),
+            start=start,
+            end=end,
+            progress=False,
+            auto_adjust=False,
+            group_by="column",
+            threads=True
+        )
+
+    if data is None or len(data) == 0:
+        return pd.DataFrame()
+
+    if isinstance(data.columns, pd.MultiIndex):
+        if "Adj Close" in data.columns.get_level_values(0):
+            adj = data["Adj Close"].copy()
+        else:
+            adj = data["Close"].copy()
+    else:
+        if "Adj Close" in data.columns:
+            adj = data[["Adj Close"]].rename(columns={"Adj Close": tickers[0]})
+        elif "Close" in data.columns:
+            adj = data[["Close"]].rename(columns={"Close": tickers[0]})
+        else:
+            adj = pd.DataFrame()
+
+    adj.index = pd.to_datetime(adj.index)
+    if getattr(adj.index, "tz", None) is not None:
+        adj.index = adj.index.tz_localize(None)
+    return adj
+
+
+class PriceStore:
+    """
+    Store incrémental sur disque, derrière fetch_adjclose.
+    get(tickers, start) ne télécharge que les plages non couvertes, groupées
+    par plage identique pour faire un seul appel Yahoo par groupe.
+    health (TickerHealth, optionnel) : les tickers connus morts ne sont pas retéléchargés,
+    chaque téléchargement complet y est consigné (succès + couverture, ou échec).
+    """
+
+    def __init__(self, root: str = STORE_DIR, downloader=None, health=None):
+        self.root = root
+        self.downloader = downloader or yahoo_download
+        self.health = health
+        self._lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, ticker: str) -> str:
+        # quote() protège les tickers du type "PE&OLES.MX" ou "GC=F"
+        return os.path.join(self.root, quote(ticker, safe="") + ".npz")
+
+    def load(self, ticker: str):
+        """Retourne (série de prix, début couvert, fin couverte) ou (série vide, None, None)."""
+        path = self._path(ticker)
+        if not os.path.exists(path):
+            return pd.Series(dtype=float, name=ticker), None, None
+        try:
+            with np.load(path, allow_pickle=False) as f:
+                dates = pd.to_datetime(f["dates"])
+                close = f["close"]
+                start = pd.Timestamp(str(f["start"]))
+                end = pd.Timestamp(str(f["end"]))
+        except (OSError, ValueError, KeyError):
+            # fichier corrompu : on repart de zéro pour ce ticker
+            return pd.Series(dtype=float, name=ticker), None, None
+        return pd.Series(close, index=dates, name=ticker), start, end
+
+    def save(self, ticker: str, prices: pd.Series, start: pd.Timestamp, end: pd.Timestamp) -> None:
+        prices = prices.dropna().sort_index()
+        prices = prices[~prices.index.duplicated(keep="last")]
+        path = self._path(ticker)
+        tmp = path + ".tmp.npz"
+        np.savez(
+            tmp,
+            dates=prices.index.values.astype("datetime64[ns]"),
+            close=prices.values.astype(np.float64),
+            start=str(start.date()),
+            end=str(end.date()),
+        )
+        os.replace(tmp, path)  # écriture atomique
+
+    def _plan(self, tickers, start: pd.Timestamp, today: pd.Timestamp) -> dict:
+        """Regroupe les tickers par plage manquante (fetch_start, fetch_end)."""
+        groups = {}
+        for t in tickers:
+            prices, cov_start, cov_end = self.load(t)
+            if cov_start is None:
+                groups.setdefault((start, None), []).append(t)
+                continue
+            if start < cov_start:
+                groups.setdefault((start, cov_start), []).append(t)
+            if cov_end < today:
+                last = prices.index[-1] if not prices.empty else cov_end
+                tail_start = min(cov_end, last - pd.Timedelta(days=TAIL_OVERLAP_DAYS))
+                groups.setdefault((tail_start, None), []).append(t)
+        return groups
+
+    def _merge(self, ticker: str, fresh: pd.Series, fetch_start, fetch_end, today: pd.Timestamp, outcomes=None) -> bool:
+        """
+        Fusionne les nouvelles données. Retourne False si l'historique du ticker a été invalidé.
+        outcomes : (succès, échecs) à remplir pour le registre de santé.
+        """
+        old, cov_start, cov_end = self.load(ticker)
+        fresh = fresh.dropna()
+
+        if fetch_end is None and not old.empty and not fresh.empty:
+            # Si Yahoo a réajusté l'historique, le recouvrement ne colle plus :
+            # on invalide tout l'historique du ticker plutôt que de créer une cassure.
+            overlap = old.index.intersection(fresh.index)[:-1]
+            if len(overlap) > 0:
+                drift = np.abs(fresh.loc[overlap].values / old.loc[overlap].values - 1.0)
+                if np.nanmax(drift) > ADJ_TOLERANCE:
+                    os.remove(self._path(ticker))
+                    return False
+
+        merged = pd.concat([old, fresh])
+        merged = merged[~merged.index.duplicated(keep="last")]
+        if outcomes is not None:
+            if not fresh.empty:
+                outcomes[0][ticker] = merged.sort_index()
+            elif old.empty and fetch_end is None:
+                # historique complet demandé, lot servi, rien pour ce ticker : symbole mort ou invalide
+                outcomes[1].append(ticker)
+        new_start = fetch_start if cov_start is None else min(cov_start, fetch_start)
+        new_end = today if fetch_end is None else (cov_end if cov_end is not None else fetch_end)
+        self.save(ticker, merged, new_start, new_end)
+        return True
+
+    def _download(self, tickers, start, end) -> pd.DataFrame:
+        try:
+            return self.downloader(tickers, start=start, end=end)
+        except Exception:
+            # un lot en erreur ne doit pas faire perdre les autres
+            return pd.DataFrame()
+
+    def refresh(self, tickers, start="2015-01-01") -> None:
+        """Complète le store pour couvrir [start, aujourd'hui] sur tous les tickers."""
+        start = pd.Timestamp(start).normalize()
+        today = pd.Timestamp.today().normalize()
+        if self.health is not None:
+            tickers = self.health.alive(tickers)
+        with self._lock:
+            # deux passes max : une invalidation (réajustement) provoque un retéléchargement complet
+            for _ in range(2):
+                groups = self._plan(tickers, start, today)
+                jobs = [
+                    (group[i:i + CHUNK_SIZE], fetch_start, fetch_end)
+                    for (fetch_start, fetch_end), group in groups.items()
+                    for i in range(0, len(group), CHUNK_SIZE)
+                ]
+                if not jobs:
+                    return
+                # un pool de lots ne ferait qu'attendre _YF_LOCK : boucle simple
+                results = [self._download(*job) for job in jobs]
+
+                # fusion séquentielle : un ticker peut avoir un lot de tête et un lot de queue
+                invalidated = False
+                outcomes = ({}, []) if self.health is not None else None
+                for (chunk, fetch_start, fetch_end), data in zip(jobs, results):
+                    if data is None or data.empty:
+                        # échec réseau global : on n'enregistre pas de couverture (ni d'échec par ticker)
+                        continue
+                    for t in chunk:
+                        fresh = data[t] if t in data.columns else pd.Series(dtype=float)
+                        if not self._merge(t, fresh, fetch_start, fetch_end, today, outcomes):
+                            invalidated = True
+                if outcomes is not None:
+                    self.health.record(*outcomes)
+                if not invalidated:
+                    return
+
+    def get_panel(self, tickers, start="2015-01-01", dtype=np.float64) -> PricePanel:
+        """
+        Prix des tickers depuis start en PricePanel : un seul tableau (dates x tickers) rempli
+        par searchsorted sur l'union des dates, sans concat/reindex pandas.
+        """
+        tickers = list(dict.fromkeys(tickers))
+        if not tickers:
+            return PricePanel(np.empty((0, 0), dtype=dtype), pd.DatetimeIndex([]), [])
+        with span("price_store.refresh", tickers=len(tickers)):
+            self.refresh(tickers, start=start)
+
+        with span("price_store.read", tickers=len(tickers)) as sp:
+            start = np.datetime64(pd.Timestamp(start), "ns")
+            series = []
+            for t in tickers:
+                prices, _, _ = self.load(t)
+                d = prices.index.values.astype("datetime64[ns]")
+                lo = d.searchsorted(start)
+                series.append((d[lo:], prices.values[lo:]))
+            dates = np.unique(np.concatenate([d for d, _ in series])) if series else np.array([], "datetime64[ns]")
+            values = np.full((len(dates), len(tickers)), np.nan, dtype=dtype)
+            for j, (d, v) in enumerate(series):
+                values[dates.searchsorted(d), j] = v
+            sp.set(rows=len(dates))
+        count("price_store.tickers", len(tickers))
+        return PricePanel(values, dates, tickers)
+
+    def get(self, tickers, start="2015-01-01") -> pd.DataFrame:
+        tickers = list(dict.fromkeys(tickers))
+        if not tickers:
+            return pd.DataFrame()
+        return self.get_panel(tickers, start=start).frame()
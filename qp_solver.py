@@ -0,0 +1,249 @@
+from dataclasses import dataclass, field
+
+import numpy as np
+
+# ============================================================
+# Solveur QP spécialisé : boîte + budget
+# ============================================================
+#   min  0.5 * w^T Q w + c^T w
+#   s.c. sum(w) = 1,  lower <= w_i <= upper
+# Méthode d'ensemble actif primal (Nocedal & Wright, algo 16.3) : à chaque itération
+# on résout le système KKT des variables libres (les autres sont bloquées sur une borne).
+# Pour n <= quelques dizaines c'est exact et bien plus rapide que SLSQP en Python.
+
+
+@dataclass
+class QPResult:
+    w: np.ndarray
+    converged: bool
+    iterations: int
+    kkt_residual: float                          # violation max des conditions KKT
+    objective: float
+    at_lower: list = field(default_factory=list)  # indices bloqués au min
+    at_upper: list = field(default_factory=list)  # indices bloqués au max
+
+
+def project_box_budget(x: np.ndarray, lower: float, upper: float) -> np.ndarray:
+    """
+    Projection euclidienne sur {sum(w)=1, lower <= w <= upper} : w = clip(x - tau).
+    sum(clip(x - tau)) est affine par morceaux en tau -> on interpole entre deux points de cassure.
+    """
+    x = np.asarray(x, dtype=float)
+    w = np.clip(x, lower, upper)
+    if abs(w.sum() - 1.0) <= 1e-14:
+        return w
+    bp = np.unique(np.concatenate([x - upper, x - lower]))
+    f = np.clip(x[None, :] - bp[:, None], lower, upper).sum(axis=1)   # décroissante en tau
+    j = np.searchsorted(-f, -1.0)   # premier point de cassure où f <= 1
+    if j == 0:
+        return np.clip(x - bp[0], lower, upper)
+    t0, t1, f0, f1 = bp[j - 1], bp[j], f[j - 1], f[j]
+    tau = t1 if f0 == f1 else t0 + (f0 - 1.0) * (t1 - t0) / (f0 - f1)
+    return np.clip(x - tau, lower, upper)
+
+
+def _solve_kkt(Q_ff: np.ndarray, rhs: np.ndarray) -> tuple:
+    """Résout [Q_ff 1; 1^T 0] [p; nu] = [rhs; 0]."""
+    m = len(rhs)
+    K = np.zeros((m + 1, m + 1))
+    K[:m, :m] = Q_ff
+    K[:m, m] = 1.0
+    K[m, :m] = 1.0
+    b = np.append(rhs, 0.0)
+    try:
+        sol = np.linalg.solve(K, b)
+    except np.linalg.LinAlgError:
+        sol = np.linalg.lstsq(K, b, rcond=None)[0]
+    return sol[:m], sol[m]
+
+
+def solve_box_budget_qp(Q: np.ndarray, c: np.ndarray, lower: float, upper: float,
+                        x0: np.ndarray | None = None, max_iter: int | None = None,
+                        tol: float = 1e-10) -> QPResult:
+    """
+    Q symétrique semi-définie positive, bornes scalaires faisables (n*lower <= 1 <= n*upper).
+    x0 : point de départ (typiquement la solution précédente) -> warm start.
+    """
+    n = len(c)
+    max_iter = max_iter or 10 * n + 20
+    scale = max(1.0, float(np.max(np.abs(Q))), float(np.max(np.abs(c))))
+
+    if x0 is None:
+        # départ à froid : optimum sous la seule contrainte de budget, projeté dans la boîte
+        x0, _ = _solve_kkt(Q, -c)
+        x0 = x0 + (1.0 - x0.sum()) / n
+    x = project_box_budget(x0, lower, upper)
+
+    # ensemble de travail initial : variables sur une borne (on garde toujours >= 1 libre)
+    fixed = np.zeros(n, dtype=bool)
+    at_lo = np.abs(x - lower) <= 1e-12
+    at_hi = np.abs(x - upper) <= 1e-12
+    fixed[at_lo | at_hi] = True
+    if fixed.all():
+        fixed[np.argmax(x)] = False
+    x[at_lo & fixed] = lower
+    x[at_hi & fixed] = upper
+
+    converged = False
+    it = 0
+    nu = 0.0
+    for it in range(1, max_iter + 1):
+        free = np.flatnonzero(~fixed)
+        g = Q @ x + c
+        p_f, nu = _solve_kkt(Q[np.ix_(free, free)], -g[free])
+
+        if np.max(np.abs(p_f), initial=0.0) <= 1e-12:
+            # point stationnaire sur l'ensemble de travail : signe des multiplicateurs des bornes
+            fx = np.flatnonzero(fixed)
+            mult = g[fx] + nu
+            mult = np.where(x[fx] >= upper - 1e-12, -mult, mult)
+            if mult.size == 0 or mult.min() >= -tol * scale:
+                converged = True
+                break
+            fixed[fx[np.argmin(mult)]] = False
+            continue
+
+        # pas maximal avant de toucher une borne (test du ratio vectorisé)
+        xf = x[free]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ratio = np.where(p_f < -1e-15, (lower - xf) / p_f, np.where(p_f > 1e-15, (upper - xf) / p_f, np.inf))
+        j = int(np.argmin(ratio))
+        alpha = min(1.0, max(float(ratio[j]), 0.0))
+        x[free] = xf + alpha * p_f
+        if ratio[j] < 1.0:
+            block = free[j]
+            x[block] = lower if p_f[j] < 0 else upper
+            fixed[block] = True
+
+    # diagnostics : stationnarité sur les libres + signe des multiplicateurs + faisabilité
+    g = Q @ x + c
+    free = ~fixed
+    stat = np.abs(g[free] + nu).max(initial=0.0)
+    mult = g[fixed] + nu
+    mult = np.where(x[fixed] >= upper - 1e-12, -mult, mult)
+    dual = max(0.0, -mult.min(initial=0.0))
+    prim = max(abs(x.sum() - 1.0), max(0.0, lower - x.min()), max(0.0, x.max() - upper))
+    return QPResult(
+        w=x,
+        converged=converged,
+        iterations=it,
+        kkt_residual=float(max(stat, dual, prim)),
+        objective=float(0.5 * x @ Q @ x + c @ x),
+        at_lower=np.flatnonzero(fixed & (x <= lower + 1e-12)).tolist(),
+        at_upper=np.flatnonzero(fixed & (x >= upper - 1e-12)).tolist(),
+    )
+
+
+# ============================================================
+# Chemin paramétrique (homotopie) : toute une famille de QP en un passage
+# ============================================================
+#   min  0.5 * w^T Q w + (c0 + t * c1)^T w   pour t dans [t_min, t_max]
+# À ensemble actif fixé, la solution KKT est affine en t : on suit ce segment jusqu'au
+# premier événement (une variable libre touche une borne, ou le multiplicateur d'une
+# variable bloquée change de signe), on met à jour l'ensemble actif et on repart.
+# Entre deux cassures, w(t) est exactement l'interpolation linéaire des extrémités.
+
+
+@dataclass
+class QPPath:
+    t: np.ndarray                   # points de cassure, croissants (t[0] = t_min, t[-1] = t_max)
+    w: np.ndarray                   # solutions aux cassures (len(t) x n)
+
+    def at(self, t: float) -> np.ndarray:
+        """Solution en t (bornée à [t_min, t_max]) : interpolation exacte entre cassures."""
+        ts = self.t
+        t = min(max(float(t), ts[0]), ts[-1])
+        j = min(int(np.searchsorted(ts, t, side="right")) - 1, len(ts) - 2)
+        if j < 0:
+            return self.w[0].copy()
+        span_t = ts[j + 1] - ts[j]
+        a = (t - ts[j]) / span_t if span_t > 0 else 0.0
+        return (1.0 - a) * self.w[j] + a * self.w[j + 1]
+
+
+def _solve_kkt_affine(Q_ff: np.ndarray, rhs: np.ndarray) -> np.ndarray:
+    """Comme _solve_kkt, pour plusieurs seconds membres ((m+1) x k) : [Q_ff 1; 1^T 0] X = rhs."""
+    m = Q_ff.shape[0]
+    K = np.zeros((m + 1, m + 1))
+    K[:m, :m] = Q_ff
+    K[:m, m] = 1.0
+    K[m, :m] = 1.0
+    try:
+        return np.linalg.solve(K, rhs)
+    except np.linalg.LinAlgError:
+        return np.linalg.lstsq(K, rhs, rcond=None)[0]
+
+
+def trace_box_budget_qp(Q: np.ndarray, c0: np.ndarray, c1: np.ndarray, lower: float, upper: float,
+                        t_min: float, t_max: float, tol: float = 1e-12, max_breaks: int | None = None) -> QPPath:
+    """
+    Chemin de solution de solve_box_budget_qp(Q, c0 + t * c1, ...) sur [t_min, t_max].
+    Départ exact en t_min (solveur d'ensemble actif), puis homotopie entre cassures.
+    """
+    n = len(c0)
+    c0, c1 = np.asarray(c0, dtype=float), np.asarray(c1, dtype=float)
+    res = solve_box_budget_qp(Q, c0 + t_min * c1, lower, upper)
+    lo = np.zeros(n, dtype=bool)
+    hi = np.zeros(n, dtype=bool)
+    lo[res.at_lower] = True
+    hi[res.at_upper] = True
+    ts, ws = [float(t_min)], [res.w.copy()]
+    t = float(t_min)
+    released = -1                   # variable libérée à ce t : pas d'événement immédiat sur elle
+    max_breaks = max_breaks or 4 * n + 20
+
+    for _ in range(max_breaks):
+        fixed = lo | hi
+        F, B = np.flatnonzero(~fixed), np.flatnonzero(fixed)
+        if F.size == 0:
+            break
+        w_b = np.where(lo[B], lower, upper)
+        m = len(F)
+        rhs = np.zeros((m + 1, 2))
+        rhs[:m, 0] = -(Q[np.ix_(F, B)] @ w_b) - c0[F]
+        rhs[m, 0] = 1.0 - w_b.sum()
+        rhs[:m, 1] = -c1[F]
+        sol = _solve_kkt_affine(Q[np.ix_(F, F)], rhs)
+        # w(t) = wa + t * wb ; multiplicateurs des bornes = ga + t * gb (signe : >= 0 au min, <= 0 au max)
+        wa, wb = np.zeros(n), np.zeros(n)
+        wa[B], wa[F], wb[F] = w_b, sol[:m, 0], sol[:m, 1]
+        ga = Q @ wa + c0 + sol[m, 0]
+        gb = Q @ wb + c1 + sol[m, 1]
+        sign = np.where(hi, -1.0, 1.0)
+
+        a, b = wa[F], wb[F]
+        scale = max(1.0, abs(t))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            hit_lo = np.where(b < -tol, (lower - a) / b, np.inf)
+            hit_hi = np.where(b > tol, (upper - a) / b, np.inf)
+            mb, mbs = sign[B] * ga[B], sign[B] * gb[B]
+            leave = np.where(mbs < -tol, -mb / mbs, np.inf)
+        for arr, idx in ((hit_lo, F), (hit_hi, F), (leave, B)):
+            arr[(idx == released) & (arr <= t + tol * scale)] = np.inf
+            arr[arr < t - tol * scale] = np.inf
+        cand = [hit_lo.min(initial=np.inf), hit_hi.min(initial=np.inf), leave.min(initial=np.inf)]
+        kind = int(np.argmin(cand))
+        t_next = min(max(cand[kind], t), t_max)
+
+        w_next = np.clip(wa + t_next * wb, lower, upper)
+        if t_next > t:
+            ts.append(t_next)
+            ws.append(w_next)
+        if t_next >= t_max:
+            break
+        t = t_next
+        if kind == 0:
+            j = F[int(np.argmin(hit_lo))]
+            lo[j], released = True, -1
+        elif kind == 1:
+            j = F[int(np.argmin(hit_hi))]
+            hi[j], released = True, -1
+        else:
+            j = B[int(np.argmin(leave))]
+            lo[j] = hi[j] = False
+            released = j
+    if ts[-1] < t_max:
+        # garde-fou (cassures dégénérées) : dernier point résolu directement
+        ts.append(float(t_max))
+        ws.append(solve_box_budget_qp(Q, c0 + t_max * c1, lower, upper, x0=ws[-1]).w)
+    return QPPath(np.array(ts), np.array(ws))
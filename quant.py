@@ -0,0 +1,278 @@
+import numpy as np
+import pandas as pd
+
+from price_panel import PricePanel, as_price_panel
+from qp_solver import QPPath, solve_box_budget_qp, trace_box_budget_qp
+
+# ============================================================
+# Fonctions quant (sans Streamlit : réutilisables par le backtest, les scripts...)
+# ============================================================
+def pct_returns(prices: pd.DataFrame | PricePanel) -> pd.DataFrame:
+    if isinstance(prices, PricePanel):
+        # rendements déjà calculés par le panel, emballés en DataFrame (affichage)
+        r = prices.returns
+        keep = ~np.isnan(r).all(axis=1)
+        return pd.DataFrame(r[keep], index=prices.dates[keep], columns=prices.tickers)
+    return prices.pct_change().replace([np.inf, -np.inf], np.nan).dropna(how="all")
+
+LOOKBACKS = (63, 126, 252)
+
+
+class MomentumPanel:
+    """
+    Momentum ajusté au risque pour chaque date x ticker x lookback (tableau (L, T, N)).
+    Construit une fois par panel de prix : changer de lookback ou de date devient une lecture.
+    """
+
+    def __init__(self, values: np.ndarray, dates: pd.DatetimeIndex, tickers: pd.Index, lookbacks):
+        self.values = values
+        self.dates = dates
+        self.tickers = tickers
+        self.lookbacks = tuple(lookbacks)
+
+    def frame(self, lookback_days: int) -> pd.DataFrame:
+        return pd.DataFrame(self.values[self.lookbacks.index(lookback_days)], index=self.dates, columns=self.tickers)
+
+    def at(self, lookback_days: int, date=None) -> pd.Series:
+        """Scores à la dernière date <= date (dernière date du panel par défaut)."""
+        if len(self.dates) == 0:
+            return pd.Series(index=self.tickers, dtype=float)
+        pos = len(self.dates) - 1 if date is None else self.dates.searchsorted(pd.Timestamp(date), side="right") - 1
+        if pos < 0:
+            return pd.Series(index=self.tickers, dtype=float)
+        return pd.Series(self.values[self.lookbacks.index(lookback_days), pos], index=self.tickers)
+
+
+def momentum_panel(prices: pd.DataFrame | PricePanel, lookbacks=LOOKBACKS) -> MomentumPanel:
+    """
+    Un seul passage O(T·N) pour tous les lookbacks : sommes cumulées des rendements et de
+    leurs carrés (partagées entre lookbacks) -> vol glissante ; le rendement cumulé est le
+    ratio de prix P_t / P_{t-L} (identique à exp(somme des log-rendements), exact même avec des trous).
+    La fenêtre suit la convention de momentum_score : les L dernières lignes de
+    rendements non entièrement vides.
+    """
+    prices = as_price_panel(prices).dropna_rows()
+    lookbacks = tuple(lookbacks)
+    p = prices.values
+    r = prices.returns   # réutilisés si le panel les a déjà calculés
+    T, N = p.shape
+    out = np.full((len(lookbacks), T, N), np.nan)
+
+    # lignes de rendements gardées par pct_returns(...).dropna(how="all")
+    valid = ~np.isnan(r).all(axis=1)
+    rv = r[valid]
+    ok = ~np.isnan(rv)
+    c_n = np.vstack([np.zeros((1, N)), np.cumsum(ok, axis=0)])
+    # sommes cumulées en float64 même pour un panel float32 (précision de la variance)
+    rv = rv.astype(float, copy=False)
+    c_s1 = np.vstack([np.zeros((1, N)), np.cumsum(np.where(ok, rv, 0.0), axis=0)])
+    c_s2 = np.vstack([np.zeros((1, N)), np.cumsum(np.where(ok, rv * rv, 0.0), axis=0)])
+    k = np.cumsum(valid)   # nombre de lignes valides jusqu'à t
+
+    for i, L in enumerate(lookbacks):
+        if T <= L:
+            continue
+        # fenêtre = lignes valides ]k-L, k]
+        k0 = np.maximum(k - L, 0)
+        n = c_n[k] - c_n[k0]
+        s1 = c_s1[k] - c_s1[k0]
+        s2 = c_s2[k] - c_s2[k0]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            var = (s2 - s1 * s1 / n) / (n - 1)
+            vol = np.sqrt(np.maximum(var, 0.0)) * np.sqrt(252)
+            vol[(n < 2) | (vol == 0)] = np.nan
+            out[i, L:] = (p[L:] / p[:-L].astype(float) - 1.0) / vol[L:]
+    out[~np.isfinite(out)] = np.nan
+    return MomentumPanel(out, prices.dates, prices.tickers, lookbacks)
+
+
+def momentum_score(prices: pd.DataFrame | PricePanel, lookback_days: int = 126, panel: MomentumPanel | None = None) -> pd.Series: #fonction plus solide on ajuste le momentum au risque
+    """
+    Risk-adjusted momentum:
+    score = cumulative return over lookback / annualized volatility over lookback
+    Lecture dans un MomentumPanel (passer `panel` pour réutiliser un panel déjà calculé).
+    """
+    if panel is None or lookback_days not in panel.lookbacks:
+        panel = momentum_panel(prices, lookbacks=(lookback_days,))
+    return panel.at(lookback_days)
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Indices des k meilleurs scores finis, du meilleur au moins bon, en O(N + k log k)
+    (argpartition au lieu d'un tri complet). Égalités départagées par l'indice, comme un tri stable.
+    """
+    scores = np.asarray(scores, dtype=float)
+    idx = np.flatnonzero(np.isfinite(scores))
+    s = scores[idx]
+    if k <= 0 or len(idx) == 0:
+        return idx[:0]
+    if len(idx) > k:
+        kth = s[np.argpartition(-s, k - 1)[k - 1]]
+        cand = np.flatnonzero(s >= kth)   # garde les ex-aequo du k-ième pour départager par indice
+        idx, s = idx[cand], s[cand]
+    return idx[np.argsort(-s, kind="stable")][:k]
+
+
+def annualize_stats(daily_returns: pd.Series) -> dict:
+    daily_returns = daily_returns.dropna()
+    if daily_returns.empty:
+        return {"ret": np.nan, "vol": np.nan, "sharpe": np.nan}
+    mu = daily_returns.mean() * 252
+    vol = daily_returns.std() * np.sqrt(252)
+    sharpe = (mu / vol) if vol and vol > 0 else np.nan
+    return {"ret": mu, "vol": vol, "sharpe": sharpe}
+
+def clamp_weights(w: np.ndarray) -> np.ndarray:
+    # Nettoie les petits artefacts numériques (ex: -1e-12) et renormalise
+    w = np.maximum(w, 0.0)
+    s = w.sum()
+    return (w / s) if s > 0 else w
+
+def _mean_variance_problem(mu, cov, max_weight: float, min_weight: float, ridge: float):
+    """
+    Données nettoyées et bornes faisables du QP moyenne-variance -> (mu, cov, min_w, max_w, fixed),
+    fixed = (poids, diagnostics) quand la solution ne dépend pas de l'optimisation (n <= 1, max trop bas).
+    """
+    n = len(mu)
+    if n == 0:
+        return mu, cov, 0.0, 0.0, (np.array([]), {})
+    if n == 1:
+        return mu, cov, 0.0, 1.0, (np.array([1.0]), {})
+
+    # Nettoyage NaN
+    mu = np.nan_to_num(mu, nan=0.0, posinf=0.0, neginf=0.0)
+    cov = np.nan_to_num(cov, nan=0.0, posinf=0.0, neginf=0.0)
+
+    # Stabilise la covariance (utile si cov bruitée / presque singulière)
+    cov = cov + ridge * np.eye(n)
+
+    # Sanitize bornes
+    min_w = max(0.0, float(min_weight))
+    max_w = float(max_weight)
+
+    # Si min > max, on écrase min au max (sinon impossible)
+    if min_w > max_w:
+        min_w = max_w
+
+    # Faisabilité : n*min <= 1 et n*max >= 1
+    # Si min trop haut, on le réduit au maximum faisable
+    if n * min_w > 1.0:
+        min_w = 1.0 / n
+
+    # Si max trop bas, on ne peut pas sommer à 1 -> fallback equal-weight
+    if n * max_w < 1.0:
+        return mu, cov, min_w, max_w, (np.ones(n) / n, {"fallback": "equal-weight"})
+    return mu, cov, min_w, max_w, None
+
+
+def optimize_mean_variance(mu: np.ndarray, cov: np.ndarray, risk_aversion: float, max_weight: float = 0.40, min_weight: float = 0.0, ridge: float = 1e-6,
+                           w0: np.ndarray | None = None, method: str = "active-set", return_info: bool = False):
+    """
+    Maximise: mu^T w - risk_aversion * (w^T cov w)
+    s.c. sum(w)=1, min_weight <= w_i <= max_weight
+
+    w0 : solution précédente (warm start, ex: rebalancement ou sweep voisin).
+    method : "active-set" (solveur QP dédié, exact) ou "slsqp" (ancien solveur, pour comparaison).
+    return_info=True -> retourne (w, diagnostics).
+    """
+
+    def done(w, **diag):
+        return (w, {"method": method, **diag}) if return_info else w
+
+    mu, cov, min_w, max_w, fixed = _mean_variance_problem(mu, cov, max_weight, min_weight, ridge)
+    if fixed is not None:
+        return done(fixed[0], converged=True, iterations=0, **fixed[1])
+    n = len(mu)
+
+    # point initial: équipondéré, puis clip dans les bornes et renormalise
+    x0 = np.ones(n) / n
+    x0 = np.clip(x0, min_w, max_w)
+    x0 = x0 / x0.sum()
+
+    if method == "slsqp":
+        from scipy.optimize import minimize   # référence seulement : scipy n'est pas chargé par le chemin par défaut
+
+        def obj(w):
+            # minimize négatif de l'utilité (équivalent à maximiser utilité)
+            return -(mu @ w - risk_aversion * (w @ cov @ w))
+
+        cons = [{"type": "eq", "fun": lambda w: np.sum(w) - 1.0}]
+        bounds = [(min_w, max_w) for _ in range(n)]
+        res = minimize(obj, x0 if w0 is None else w0, bounds=bounds, constraints=cons, method="SLSQP")
+
+        if not res.success or res.x is None:
+            return done(x0, converged=False, iterations=int(res.nit), fallback="x0")
+        w, diag = res.x, {"converged": True, "iterations": int(res.nit)}
+    else:
+        # utilité -> 0.5 w^T Q w + c^T w avec Q = 2*ra*cov, c = -mu (ra <= 0 : on garde un Q défini positif)
+        Q = 2.0 * max(float(risk_aversion), 1e-12) * cov
+        res = solve_box_budget_qp(Q, -mu, min_w, max_w, x0=w0)
+        w = res.w
+        diag = {"converged": res.converged, "iterations": res.iterations, "kkt_residual": res.kkt_residual,
+                "at_lower": res.at_lower, "at_upper": res.at_upper}
+
+    # Nettoyage final
+    w = np.clip(w, min_w, max_w)
+    w = w / w.sum()
+
+    return done(clamp_weights(w), **diag)
+
+
+# ============================================================
+# Frontière efficiente : toutes les aversions au risque en un passage
+# ============================================================
+# Maximiser mu^T w - ra * w^T cov w revient à minimiser 0.5 w^T (2 cov) w - (1/ra) mu^T w :
+# en t = 1/ra le problème est paramétrique, sa solution affine par morceaux (qp_solver.
+# trace_box_budget_qp). Les poids pour n'importe quelle aversion se lisent par interpolation
+# entre cassures, sans nouvelle optimisation ; mêmes nettoyages et bornes qu'optimize_mean_variance.
+
+# les scores de momentum (annualisés) dominent la variance journalière : aux aversions des profils
+# (2.5 à 12) l'allocation est en coin, elle ne se diversifie qu'à partir de quelques centaines
+RISK_AVERSION_RANGE = (0.5, 1e5)
+
+
+class MeanVarianceFrontier:
+    def __init__(self, mu: np.ndarray, cov: np.ndarray, path: QPPath | None, fixed: np.ndarray | None,
+                 min_w: float, max_w: float, ra_range: tuple):
+        self.mu = mu
+        self.cov = cov
+        self.path = path
+        self.fixed = fixed              # poids constants (n <= 1, max trop bas) : pas de chemin
+        self.min_w = min_w
+        self.max_w = max_w
+        self.ra_range = ra_range
+
+    @property
+    def risk_aversions(self) -> np.ndarray:
+        """Aversions au risque des cassures (changements d'ensemble actif), décroissantes."""
+        return np.array(list(self.ra_range)[::-1]) if self.path is None else 1.0 / self.path.t
+
+    def weights(self, risk_aversion: float) -> np.ndarray:
+        """Poids optimaux pour cette aversion (hors plage : optimisation directe)."""
+        if self.fixed is not None:
+            return self.fixed.copy()
+        lo, hi = self.ra_range
+        if not lo <= risk_aversion <= hi:
+            return optimize_mean_variance(self.mu, self.cov, risk_aversion, max_weight=self.max_w,
+                                          min_weight=self.min_w, ridge=0.0)
+        w = np.clip(self.path.at(1.0 / risk_aversion), self.min_w, self.max_w)
+        return clamp_weights(w / w.sum())
+
+    def points(self, risk_aversions=None) -> pd.DataFrame:
+        """Frontière (aversion, score moyen mu^T w, vol annualisée) : cassures par défaut."""
+        ras = self.risk_aversions if risk_aversions is None else np.asarray(risk_aversions, dtype=float)
+        W = np.array([self.weights(ra) for ra in ras]).reshape(len(ras), len(self.mu))
+        var = np.einsum("ij,jk,ik->i", W, self.cov, W)
+        return pd.DataFrame({"risk_aversion": ras, "mu": W @ self.mu, "vol": np.sqrt(np.maximum(var, 0.0) * 252)})
+
+
+def mean_variance_frontier(mu: np.ndarray, cov: np.ndarray, max_weight: float = 0.40, min_weight: float = 0.0,
+                           ridge: float = 1e-6, ra_range: tuple = RISK_AVERSION_RANGE) -> MeanVarianceFrontier:
+    """Frontière de optimize_mean_variance(mu, cov, ra, ...) pour ra dans ra_range."""
+    mu, cov, min_w, max_w, fixed = _mean_variance_problem(mu, cov, max_weight, min_weight, ridge)
+    if fixed is not None:
+        return MeanVarianceFrontier(mu, cov, None, fixed[0], min_w, max_w, ra_range)
+    lo, hi = ra_range
+    path = trace_box_budget_qp(2.0 * cov, np.zeros(len(mu)), -mu, min_w, max_w, 1.0 / hi, 1.0 / lo)
+    return MeanVarianceFrontier(mu, cov, path, None, min_w, max_w, ra_range)
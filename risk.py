@@ -0,0 +1,149 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from tracing import span
+
+# ============================================================
+# Moteur de risque Monte Carlo : trajectoires simulées du portefeuille final
+# ============================================================
+# annualize_stats ne décrit qu'un seul chemin historique. Ici on rééchantillonne les
+# rendements journaliers par blocs (bootstrap circulaire : garde l'autocorrélation et,
+# les lignes étant tirées ensemble, la corrélation cœur/satellites) ou on tire dans une
+# loi normale ajustée. Par horizon : valeur finale, drawdown max, VaR/CVaR, probabilité de perte.
+# Les trajectoires avancent bloc par bloc en log-richesse, à partir de statistiques
+# précalculées par bloc candidat (somme, extrêmes, drawdown interne) : mémoire d'un lot en
+# O(chemins), coût en O(chemins x blocs) au lieu de O(chemins x jours). Les lots partent sur
+# un pool de processus, chacun avec sa graine dérivée (SeedSequence.spawn) : même résultat
+# quel que soit le parallélisme.
+
+TRADING_DAYS = 252
+HORIZONS_YEARS = (1, 3, 5, 10)
+N_PATHS = 100_000
+BLOCK_DAYS = 21             # un mois de bourse ; divise 252, les blocs tombent sur les horizons
+CHUNK_PATHS = 25_000
+SIM_METHODS = ("bootstrap", "normal")
+NORMAL_POOL_BLOCKS = 50_000  # "normal" : blocs tirés une fois dans la loi ajustée, puis rééchantillonnés
+
+
+@dataclass
+class RiskResult:
+    horizons: tuple             # années
+    terminal: np.ndarray        # (chemins, horizons) valeur finale pour 1 investi
+    max_drawdown: np.ndarray    # (chemins, horizons) drawdown max jusqu'à l'horizon (positif)
+
+    def summary(self, level: float = 0.95) -> pd.DataFrame:
+        """Une ligne par horizon : quantiles de valeur finale, VaR/CVaR du rendement, perte, drawdown."""
+        rows = []
+        for j, h in enumerate(self.horizons):
+            v, dd = self.terminal[:, j], self.max_drawdown[:, j]
+            ret = v - 1.0
+            q = np.quantile(ret, 1.0 - level)
+            rows.append({
+                "horizon": h,
+                "médiane": float(np.median(v)),
+                "q05": float(np.quantile(v, 0.05)),
+                "q95": float(np.quantile(v, 0.95)),
+                "moyenne": float(v.mean()),
+                "p_perte": float((v < 1.0).mean()),
+                "VaR": float(-q),
+                "CVaR": float(-ret[ret <= q].mean()),
+                "dd_médian": float(np.median(dd)),
+                "dd_q95": float(np.quantile(dd, 0.95)),
+            })
+        return pd.DataFrame(rows).set_index("horizon")
+
+
+def _block_stats(blocks: np.ndarray) -> tuple:
+    """
+    Par bloc (ligne de log-rendements) : somme, max et min des cumulés, drawdown max interne.
+    Ces quatre nombres suffisent à faire avancer un chemin d'un bloc entier (richesse, plus haut,
+    drawdown) : le coût de simulation ne dépend plus de la longueur du bloc.
+    """
+    cum = np.cumsum(blocks, axis=1)
+    run_peak = np.maximum.accumulate(np.maximum(cum, 0.0), axis=1)
+    return cum[:, -1], cum.max(axis=1), cum.min(axis=1), (run_peak - cum).max(axis=1)
+
+
+def _block_lengths(checkpoints: tuple, block: int) -> list:
+    """Longueurs des blocs successifs : un bloc ne chevauche jamais un horizon."""
+    out, day = [], 0
+    for stop in checkpoints:
+        while day < stop:
+            out.append(min(block, stop - day))
+            day += out[-1]
+    return out
+
+
+def _simulate_chunk(stats: dict, n_paths: int, checkpoints: tuple, block: int,
+                    seed: np.random.SeedSequence) -> tuple:
+    """Un lot de chemins -> (valeurs finales, drawdowns max) aux points de contrôle (en jours)."""
+    rng = np.random.default_rng(seed)
+    logw = np.zeros(n_paths)
+    peak = np.zeros(n_paths)
+    mdd = np.zeros(n_paths)         # en log : drawdown = 1 - exp(-mdd)
+    terminal = np.empty((n_paths, len(checkpoints)))
+    drawdown = np.empty((n_paths, len(checkpoints)))
+    day = 0
+    for j, stop in enumerate(checkpoints):
+        while day < stop:
+            L = min(block, stop - day)
+            picks = rng.integers(0, len(stats[L][0]), n_paths)
+            s_sum, s_max, s_min, s_dd = (a[picks] for a in stats[L])
+            # drawdown dans le bloc : depuis le plus haut précédent, ou interne au bloc
+            np.maximum(mdd, np.maximum(s_dd, peak - logw - s_min), out=mdd)
+            np.maximum(peak, logw + s_max, out=peak)
+            logw += s_sum
+            day += L
+        terminal[:, j] = np.exp(logw)
+        drawdown[:, j] = -np.expm1(-mdd)
+    return terminal, drawdown
+
+
+def simulate_portfolio(components: pd.DataFrame | pd.Series, weights=None, horizons=HORIZONS_YEARS,
+                       n_paths: int = N_PATHS, block: int = BLOCK_DAYS, method: str = "bootstrap", seed: int = 0,
+                       chunk_paths: int = CHUNK_PATHS, workers: int | None = None) -> RiskResult:
+    """
+    components : rendements journaliers (dates x composantes : cœur, satellites...) ou série du portefeuille.
+    weights : poids des composantes (constants, rebalancement journalier comme l'app).
+    Les lignes étant tirées ensemble, rééchantillonner les composantes puis pondérer revient à
+    rééchantillonner la série pondérée : on simule directement celle-ci.
+    """
+    if method not in SIM_METHODS:
+        raise ValueError(f"méthode inconnue {method!r} (choix : {SIM_METHODS})")
+    if isinstance(components, pd.Series):
+        r = components.dropna().to_numpy(dtype=float)
+    else:
+        comp = components.dropna(how="any")
+        w = np.ones(comp.shape[1]) / comp.shape[1] if weights is None else np.asarray(weights, dtype=float)
+        r = comp.to_numpy(dtype=float) @ w
+    if len(r) == 0:
+        raise ValueError("aucun rendement à simuler")
+    log_r = np.log1p(np.maximum(r, -0.999999))
+
+    horizons = tuple(sorted(horizons))
+    checkpoints = tuple(int(h * TRADING_DAYS) for h in horizons)
+    sizes = [min(chunk_paths, n_paths - i) for i in range(0, n_paths, chunk_paths)]
+    seed_model, *seeds = np.random.SeedSequence(seed).spawn(len(sizes) + 1)
+    lengths = set(_block_lengths(checkpoints, block))
+    if method == "normal":
+        # réservoir de blocs tirés dans la loi normale ajustée sur les log-rendements
+        sigma = float(log_r.std(ddof=1)) if len(log_r) > 1 else 0.0
+        pool = np.random.default_rng(seed_model).normal(float(log_r.mean()), sigma, (NORMAL_POOL_BLOCKS, block))
+        stats = {L: _block_stats(pool[:, :L]) for L in lengths}
+    else:
+        T = len(log_r)
+        stats = {L: _block_stats(log_r[(np.arange(T)[:, None] + np.arange(L)) % T]) for L in lengths}
+    workers = min(workers or os.cpu_count() or 1, len(sizes))
+    args = [(stats, n, checkpoints, block, s) for n, s in zip(sizes, seeds)]
+
+    with span("risk.simulate", paths=n_paths, days=checkpoints[-1], workers=workers):
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as ex:
+                parts = list(ex.map(_simulate_chunk, *zip(*args)))
+        else:
+            parts = [_simulate_chunk(*a) for a in args]
+    return RiskResult(horizons, np.vstack([p[0] for p in parts]), np.vstack([p[1] for p in parts]))
@@ -0,0 +1,276 @@
+import argparse
+import math
+import time
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from price_panel import PricePanel
+from quant import top_k_indices
+
+# ============================================================
+# Momentum en flux : mise à jour O(1) par cours, événements de changement du Top K
+# ============================================================
+# Même score que momentum_panel (rendement sur L barres / vol annualisée des L derniers
+# rendements), mais entretenu tick par tick : par ticker, un anneau des L+1 dernières
+# clôtures, un anneau des L derniers rendements et leurs sommes (Σr, Σr²). Un cours intraday
+# remplace provisoirement la barre du jour ; la barre est clôturée au premier cours du jour suivant.
+# Chaque ticker suit son propre calendrier (pas d'alignement sur l'union des dates du panel).
+# python streaming.py ticks.csv --sats EM TECH   -> rejoue un fichier et affiche les changements de Top K
+
+
+class StreamingMomentum:
+    """Momentum ajusté au risque d'un ticker sur `lookback` barres, mis à jour en O(1)."""
+
+    __slots__ = ("lookback", "bar", "last", "_closes", "_ci", "_nc", "_rets", "_ri", "_nr", "_s1", "_s2", "_pushes")
+
+    def __init__(self, lookback: int = 126):
+        self.lookback = L = int(lookback)
+        self.bar = None                     # date de la barre ouverte (None : aucune)
+        self.last = math.nan                # dernier cours de la barre ouverte
+        self._closes = [math.nan] * (L + 1)
+        self._ci = 0                        # prochaine case écrite
+        self._nc = 0
+        self._rets = [0.0] * L
+        self._ri = 0
+        self._nr = 0
+        self._s1 = self._s2 = 0.0
+        self._pushes = 0
+
+    def _close(self, k: int) -> float:
+        """k-ième clôture en partant de la plus récente (k = 0)."""
+        return self._closes[(self._ci - 1 - k) % (self.lookback + 1)]
+
+    def close_bar(self, price: float | None = None) -> None:
+        """Clôture la barre ouverte au dernier cours (ou à `price`)."""
+        price = self.last if price is None else float(price)
+        self.bar, self.last = None, math.nan
+        if not price > 0:
+            return
+        L = self.lookback
+        if self._nc:
+            r = price / self._close(0) - 1.0
+            if self._nr == L:
+                old = self._rets[self._ri]
+                self._s1 -= old
+                self._s2 -= old * old
+            else:
+                self._nr += 1
+            self._rets[self._ri] = r
+            self._s1 += r
+            self._s2 += r * r
+            self._ri = (self._ri + 1) % L
+            self._pushes += 1
+            if self._pushes >= L:
+                # resynchronisation des sommes (dérive d'arrondi) : O(L) toutes les L barres
+                self._pushes = 0
+                live = self._rets if self._nr == L else self._rets[:self._nr]
+                self._s1 = math.fsum(live)
+                self._s2 = math.fsum(x * x for x in live)
+        self._closes[self._ci] = price
+        self._ci = (self._ci + 1) % (L + 1)
+        self._nc = min(self._nc + 1, L + 1)
+
+    def update(self, day, price: float) -> float:
+        """Nouveau cours daté : clôture la barre précédente si le jour change, retourne le score courant."""
+        if self.bar is not None and day > self.bar:
+            self.close_bar()
+        if self.bar is None:
+            self.bar = day
+        if price > 0:
+            self.last = float(price)
+        return self.score()
+
+    def score(self) -> float:
+        """Score sur la barre ouverte (cours provisoire), ou à la dernière clôture s'il n'y en a pas."""
+        L = self.lookback
+        if self.last > 0:
+            # fenêtre : L-1 derniers rendements clôturés + rendement provisoire du jour
+            if self._nc < L:
+                return math.nan
+            r = self.last / self._close(0) - 1.0
+            s1, s2, n = self._s1 + r, self._s2 + r * r, self._nr + 1
+            if self._nr == L:
+                old = self._rets[self._ri]   # le plus ancien sort de la fenêtre
+                s1, s2, n = s1 - old, s2 - old * old, n - 1
+            ratio = self.last / self._close(L - 1)
+        else:
+            if self._nc <= L:
+                return math.nan
+            s1, s2, n = self._s1, self._s2, self._nr
+            ratio = self._close(0) / self._close(L)
+        if n < 2:
+            return math.nan
+        vol = math.sqrt(max((s2 - s1 * s1 / n) / (n - 1), 0.0)) * math.sqrt(252)
+        if vol == 0:
+            return math.nan
+        s = (ratio - 1.0) / vol
+        return s if math.isfinite(s) else math.nan
+
+    def seed(self, closes) -> None:
+        """Amorce avec un historique de clôtures (seules les L+1 dernières comptent)."""
+        closes = [float(c) for c in closes if c > 0]
+        for c in closes[-(self.lookback + 1):]:
+            self.close_bar(c)
+
+
+@dataclass
+class TopKChange:
+    sat_key: str
+    time: pd.Timestamp
+    entered: list                   # tickers entrés dans le Top K
+    exited: list                    # tickers sortis du Top K
+    top: list = field(default_factory=list)   # nouveau Top K, du meilleur au moins bon
+
+
+class MomentumMonitor:
+    """
+    Scores en flux de tous les tickers des satellites ({clé: [tickers]}) et Top K de chacun.
+    Un ticker commun à plusieurs satellites n'a qu'un flux. Le Top K d'un satellite n'est
+    recalculé que si le ticker mis à jour y est ou peut y entrer (score >= K-ième).
+    """
+
+    def __init__(self, universes: dict, lookback: int = 126, top_k: int = 5, on_change=None):
+        self.universes = {k: list(dict.fromkeys(u)) for k, u in universes.items()}
+        self.top_k = top_k
+        self.on_change = on_change
+        self.streams = {}
+        self._where = {}
+        for k, u in self.universes.items():
+            for j, t in enumerate(u):
+                self.streams.setdefault(t, StreamingMomentum(lookback))
+                self._where.setdefault(t, []).append((k, j))
+        self._scores = {k: np.full(len(u), np.nan) for k, u in self.universes.items()}
+        self._top = {k: [] for k in self.universes}
+        self._seen = {}                 # dernière date amorcée par ticker : cours antérieurs ignorés
+
+    def seed(self, panel: PricePanel, before=None) -> None:
+        """Amorce les flux avec l'historique d'un PricePanel (clôtures strictement avant `before`)."""
+        hi = len(panel.dates) if before is None else panel.dates.searchsorted(pd.Timestamp(before).normalize())
+        for j, t in enumerate(panel.tickers):
+            s = self.streams.get(t)
+            if s is None:
+                continue
+            col = panel.values[:hi, j]
+            ok = np.flatnonzero(np.isfinite(col))
+            s.seed(col[ok])
+            if len(ok):
+                self._seen[t] = panel.dates[ok[-1]]
+        for k, u in self.universes.items():
+            self._scores[k] = np.array([self.streams[t].score() for t in u])
+            self._top[k] = top_k_indices(self._scores[k], self.top_k).tolist()
+
+    def update(self, when, ticker: str, price: float) -> list:
+        """Un cours (horodatage, ticker, prix) -> changements de Top K provoqués (aussi passés à on_change)."""
+        s = self.streams.get(ticker)
+        if s is None:
+            return []
+        when = pd.Timestamp(when)
+        day = when.normalize()
+        seen = self._seen.get(ticker)
+        if seen is not None and day <= seen:
+            return []
+        score = s.update(day, price)
+        events = []
+        for k, j in self._where[ticker]:
+            scores, top = self._scores[k], self._top[k]
+            scores[j] = score
+            if j not in top and not (math.isfinite(score)
+                                     and (len(top) < self.top_k or score >= scores[top[-1]])):
+                continue
+            new = top_k_indices(scores, self.top_k).tolist()
+            self._top[k] = new
+            if set(new) != set(top):
+                u = self.universes[k]
+                events.append(TopKChange(k, when, [u[i] for i in new if i not in top],
+                                         [u[i] for i in top if i not in new], [u[i] for i in new]))
+        if self.on_change is not None:
+            for e in events:
+                self.on_change(e)
+        return events
+
+    def top(self, sat_key: str) -> pd.Series:
+        """Top K courant du satellite (scores triés décroissants)."""
+        u, idx = self.universes[sat_key], self._top[sat_key]
+        return pd.Series(self._scores[sat_key][idx], index=[u[i] for i in idx], dtype=float)
+
+    def scores(self, sat_key: str) -> pd.Series:
+        return pd.Series(self._scores[sat_key], index=self.universes[sat_key])
+
+
+def read_ticks(path: str) -> pd.DataFrame:
+    """
+    Fichier de cours (.csv ou .parquet) -> DataFrame (time, ticker, price) trié par temps.
+    Format long : colonnes time/timestamp/datetime/date, ticker/symbol, price/close ;
+    format large (barres) : première colonne = date, une colonne par ticker.
+    """
+    df = pd.read_parquet(path) if path.lower().endswith(".parquet") else pd.read_csv(path)
+    cols = {c.lower(): c for c in df.columns}
+    time_col = next((cols[c] for c in ("time", "timestamp", "datetime", "date") if c in cols), df.columns[0])
+    tick_col = next((cols[c] for c in ("ticker", "symbol") if c in cols), None)
+    if tick_col is None:
+        df = df.melt(id_vars=[time_col], var_name="ticker", value_name="price")
+        tick_col, price_col = "ticker", "price"
+    else:
+        price_col = next(cols[c] for c in ("price", "close", "adj close", "last") if c in cols)
+    out = pd.DataFrame({
+        "time": pd.to_datetime(df[time_col]),
+        "ticker": df[tick_col].astype(str),
+        "price": pd.to_numeric(df[price_col], errors="coerce"),
+    })
+    out = out[out["price"] > 0]
+    return out.sort_values("time", kind="stable").reset_index(drop=True)
+
+
+def replay(ticks: pd.DataFrame, speed: float | None = None):
+    """Itère (time, ticker, price) ; speed = x fois le temps réel (None : sans attente)."""
+    t_prev = None
+    for when, ticker, price in zip(ticks["time"], ticks["ticker"], ticks["price"].to_numpy(dtype=float)):
+        if speed and t_prev is not None and when > t_prev:
+            time.sleep((when - t_prev).total_seconds() / speed)
+        t_prev = when
+        yield when, ticker, price
+
+
+def main():
+    from catalog import SAT_UNIVERSE
+
+    parser = argparse.ArgumentParser(description="Momentum-X en flux : rejoue un fichier de cours et suit les Top K.")
+    parser.add_argument("ticks", help="fichier .csv/.parquet (long : time,ticker,price ; large : date + un ticker par colonne)")
+    parser.add_argument("--sats", nargs="+", default=list(SAT_UNIVERSE), help="clés satellites (ex: EM TECH)")
+    parser.add_argument("--lookback", type=int, default=126)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--start", default="2015-01-01", help="début de l'historique d'amorçage")
+    parser.add_argument("--no-seed", action="store_true", help="pas d'amorçage par le store de prix")
+    parser.add_argument("--speed", type=float, default=None, help="x fois le temps réel (défaut : au plus vite)")
+    args = parser.parse_args()
+
+    universes = {k: SAT_UNIVERSE[k] for k in args.sats}
+    ticks = read_ticks(args.ticks)
+
+    def show(e: TopKChange):
+        print(f"{e.time:%Y-%m-%d %H:%M:%S} {e.sat_key:<8} +{','.join(e.entered)} -{','.join(e.exited)} "
+              f"-> {', '.join(e.top)}", flush=True)
+
+    monitor = MomentumMonitor(universes, lookback=args.lookback, top_k=args.top_k, on_change=show)
+    if not args.no_seed and not ticks.empty:
+        from price_store import PriceStore
+        from ticker_health import TickerHealth
+
+        tickers = list(monitor.streams)
+        monitor.seed(PriceStore(health=TickerHealth()).get_panel(tickers, start=args.start),
+                     before=ticks["time"].iloc[0])
+    for k in universes:
+        print(f"{k:<8} départ -> {', '.join(monitor.top(k).index)}")
+
+    t0, n = time.perf_counter(), 0
+    for when, ticker, price in replay(ticks, args.speed):
+        monitor.update(when, ticker, price)
+        n += 1
+    dt = time.perf_counter() - t0
+    print(f"{n} cours rejoués en {dt:.2f} s ({n / dt if dt else 0:,.0f} cours/s)")
+
+
+if __name__ == "__main__":
+    main()
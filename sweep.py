@@ -0,0 +1,206 @@
+import argparse
+import csv
+import itertools
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from backtest import COV_WINDOW, satellite_view, walk_forward
+from covariance import COV_METHODS, RollingCovariance
+from catalog import CORE_MAP, PROFILE_PARAMS, SAT_UNIVERSE
+from price_panel import PricePanel, as_price_panel
+from quant import LOOKBACKS, momentum_panel
+
+# ============================================================
+# Sweep de paramètres (lookback, top_k, risk_aversion, caps) en parallèle
+# ============================================================
+# Chaque combinaison passe par le backtest walk-forward complet (cœur + satellites).
+# Le panel de prix est écrit une fois en .npy et ouvert en mmap par chaque worker :
+# il est partagé en lecture seule, seuls les paramètres voyagent entre processus.
+# Les résultats sont ajoutés au CSV au fil de l'eau -> un sweep interrompu reprend là où il s'était arrêté.
+# Chaque ligne porte la configuration du run (CONFIG_COLS) : un même fichier peut accueillir des runs
+# différents (fréquence, covariance, satellites...), seules les lignes de la même configuration, sans
+# erreur, sont reprises ; les lignes en erreur sont recalculées.
+
+CONFIG_COLS = ["freq", "cov_method", "sats", "core_ticker", "core_weight", "start"]
+PARAM_COLS = ["lookback", "top_k", "risk_aversion", "max_w_stock", "max_w_sat"]
+METRIC_COLS = ["ret", "vol", "sharpe", "max_dd", "turnover"]
+RESULT_COLS = CONFIG_COLS + PARAM_COLS + METRIC_COLS + ["error"]
+
+_WORKER = {}
+
+
+def param_grid(lookbacks=LOOKBACKS, top_ks=(5,), risk_aversions=(12.0, 6.0, 2.5),
+               max_w_stocks=(0.40,), max_w_sats=(0.60,)) -> list:
+    return [
+        dict(zip(PARAM_COLS, combo))
+        for combo in itertools.product(lookbacks, top_ks, risk_aversions, max_w_stocks, max_w_sats)
+    ]
+
+
+def run_config(panel: PricePanel, universes: dict, core_ticker: str, core_weight: float, freq: str,
+               cov_method: str) -> dict:
+    """Tout ce qui, hors grille, change les résultats d'un run."""
+    return {"freq": freq, "cov_method": cov_method, "sats": ";".join(sorted(universes)), "core_ticker": core_ticker,
+            "core_weight": round(float(core_weight), 6), "start": str(pd.Timestamp(panel.dates[0]).date())}
+
+
+def _config_key(row: dict) -> tuple:
+    return tuple(round(float(row[c]), 6) if c == "core_weight" else str(row[c]) for c in CONFIG_COLS)
+
+
+def _key(row: dict) -> tuple:
+    return _config_key(row) + tuple(round(float(row[c]), 6) for c in PARAM_COLS)
+
+
+def _satellite_covariance(view: PricePanel, cov_method: str) -> RollingCovariance:
+    # mêmes rendements alignés que _SatelliteState (sinon le moteur ne serait pas réutilisable)
+    R = view.aligned_returns()[0]
+    return RollingCovariance(R[1:].astype(float, copy=False), window=COV_WINDOW, method=cov_method, memo=True)
+
+
+def _init_worker(values_path, dates, tickers, universes, core_ticker, core_weight, freq, cov_method):
+    values = np.load(values_path, mmap_mode="r")   # pas de copie : pages partagées par l'OS
+    panel = PricePanel(values, dates, tickers)
+    views = {k: satellite_view(panel, u) for k, u in universes.items()}
+    _WORKER.update(
+        panel=panel,
+        universes=universes,
+        core_ticker=core_ticker,
+        core_weight=core_weight,
+        freq=freq,
+        cov_method=cov_method,
+        # momentum (tous les lookbacks) et fenêtres de covariance calculés une fois par worker, pas par tâche
+        momentum={k: momentum_panel(v, lookbacks=LOOKBACKS) for k, v in views.items()},
+        covariance={k: _satellite_covariance(v, cov_method) for k, v in views.items()},
+    )
+
+
+def _run_one(params: dict) -> dict:
+    w = _WORKER
+    try:
+        res = walk_forward(
+            w["panel"], w["universes"], w["core_ticker"], w["core_weight"],
+            lookback=int(params["lookback"]), top_k=int(params["top_k"]),
+            risk_aversion=float(params["risk_aversion"]), max_w_stock=float(params["max_w_stock"]),
+            max_w_sat=float(params["max_w_sat"]), freq=w["freq"], cov_method=w["cov_method"],
+            momentum=w["momentum"], covariance=w["covariance"],
+        )
+        metrics = {c: float(res.stats.get(c, np.nan)) for c in METRIC_COLS}
+        error = ""
+    except Exception as e:
+        metrics = {c: np.nan for c in METRIC_COLS}
+        error = repr(e)
+    return {**params, **metrics, "error": error}
+
+
+def load_results(path: str) -> pd.DataFrame:
+    """Lignes déjà écrites ; un fichier d'avant CONFIG_COLS est réécrit avec une configuration vide (jamais reprise)."""
+    if not (path and os.path.exists(path)):
+        return pd.DataFrame(columns=RESULT_COLS)
+    done = pd.read_csv(path, dtype={c: str for c in ("freq", "cov_method", "sats", "core_ticker", "start", "error")})
+    if list(done.columns) != RESULT_COLS:
+        done = done.reindex(columns=RESULT_COLS)
+        tmp = path + ".tmp"
+        done.to_csv(tmp, index=False, encoding="utf-8")
+        os.replace(tmp, path)
+    done["error"] = done["error"].fillna("")
+    return done
+
+
+def run_sweep(panel: pd.DataFrame | PricePanel, universes: dict, core_ticker: str, core_weight: float, grid: list,
+              freq: str = "M", cov_method: str = "sample", workers: int | None = None,
+              results_path: str | None = None) -> pd.DataFrame:
+    """
+    Lance toutes les combinaisons de `grid` (voir param_grid) et retourne un tableau
+    configuration + paramètres + (ret, vol, sharpe, max_dd, turnover) pour ce run. Si results_path
+    existe déjà, les combinaisons réussies de la même configuration sont sautées (reprise).
+    """
+    panel = as_price_panel(panel)
+    config = run_config(panel, universes, core_ticker, core_weight, freq, cov_method)
+    done = load_results(results_path)
+    # autres configurations et lignes en erreur : ni reprises ni renvoyées (les erreurs sont recalculées)
+    done = done[done["error"].eq("") & done[CONFIG_COLS].notna().all(axis=1)]
+    done = done[[_config_key(r) == _config_key(config) for r in done.to_dict("records")]]
+    done = done.drop_duplicates(subset=CONFIG_COLS + PARAM_COLS, keep="last")
+    done_keys = {_key(r) for r in done.to_dict("records")}
+    todo = [p for p in grid if _key({**config, **p}) not in done_keys]
+
+    rows = []
+    if todo:
+        tmp_dir = tempfile.mkdtemp(prefix="momentumx_sweep_")
+        values_path = os.path.join(tmp_dir, "panel.npy")
+        np.save(values_path, panel.values)
+        init_args = (values_path, panel.dates.values, list(panel.tickers), universes, core_ticker, core_weight,
+                     freq, cov_method)
+
+        out = None
+        if results_path:
+            new_file = not os.path.exists(results_path)
+            out = open(results_path, "a", newline="", encoding="utf-8")
+            writer = csv.DictWriter(out, fieldnames=RESULT_COLS)
+            if new_file:
+                writer.writeheader()
+        try:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=init_args) as ex:
+                futures = [ex.submit(_run_one, p) for p in todo]
+                for fut in as_completed(futures):
+                    row = {**config, **fut.result()}
+                    rows.append(row)
+                    if out is not None:
+                        writer.writerow(row)
+                        out.flush()
+        finally:
+            if out is not None:
+                out.close()
+            os.remove(values_path)
+            os.rmdir(tmp_dir)
+
+    res = pd.concat([done, pd.DataFrame(rows)], ignore_index=True) if rows else done
+    res["error"] = res["error"].fillna("")
+    return res.sort_values(PARAM_COLS).reset_index(drop=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep de paramètres Momentum-X (backtest walk-forward).")
+    parser.add_argument("--sats", nargs="+", default=list(SAT_UNIVERSE), help="clés satellites (ex: EM TECH)")
+    parser.add_argument("--core", default=list(CORE_MAP)[0], choices=list(CORE_MAP))
+    parser.add_argument("--profile", default="Équilibré", choices=list(PROFILE_PARAMS), help="fixe le poids du cœur")
+    parser.add_argument("--start", default="2015-01-01")
+    parser.add_argument("--freq", default="M", choices=["M", "Q"])
+    parser.add_argument("--cov-method", default="sample", choices=list(COV_METHODS))
+    parser.add_argument("--lookbacks", nargs="+", type=int, default=list(LOOKBACKS))
+    parser.add_argument("--top-k", nargs="+", type=int, default=[5])
+    parser.add_argument("--risk-aversion", nargs="+", type=float, default=[p[1] for p in PROFILE_PARAMS.values()])
+    parser.add_argument("--max-w-stock", nargs="+", type=float, default=[0.40])
+    parser.add_argument("--max-w-sat", nargs="+", type=float, default=[0.60])
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--out", default="sweep_results.csv")
+    args = parser.parse_args()
+
+    from price_store import PriceStore
+    from ticker_health import TickerHealth
+
+    health = TickerHealth()
+    # cotation du cœur déjà retenue (app ou sweep précédent) : inutile de sonder les autres places
+    known = health.core_listing(args.core, CORE_MAP[args.core])
+    listings = [known] if known is not None else CORE_MAP[args.core]
+    universes = {k: SAT_UNIVERSE[k] for k in args.sats}
+    tickers = list(dict.fromkeys([t for u in universes.values() for t in u] + listings))
+    panel = PriceStore(health=health).get_panel(tickers, start=args.start)
+    core_ticker = next((t for t in listings if not panel.select([t]).drop_empty_columns().empty), None)
+    if core_ticker is None:
+        raise SystemExit(f"Aucune cotation disponible pour le cœur {args.core}")
+    health.set_core_listing(args.core, core_ticker)
+
+    grid = param_grid(args.lookbacks, args.top_k, args.risk_aversion, args.max_w_stock, args.max_w_sat)
+    res = run_sweep(panel, universes, core_ticker, PROFILE_PARAMS[args.profile][0], grid,
+                    freq=args.freq, cov_method=args.cov_method, workers=args.workers, results_path=args.out)
+    print(res.sort_values("sharpe", ascending=False).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from catalog import CORE_MAP, SAT_UNIVERSE
+
+# ============================================================
+# Marché synthétique (hors ligne) : benchmarks, scripts, démos sans Yahoo Finance
+# ============================================================
+# GBM corrélé par un modèle à facteurs (marché + secteur + spécifique) : O(T·N), pas de
+# Cholesky N x N, donc utilisable jusqu'à 10k tickers. Le panel ressemble à un téléchargement
+# yfinance multi-places : index = union des jours ouvrés, NaN les jours fériés de la place
+# du ticker (déduite du suffixe, ex: ".PA"), trous de cotation (suspensions) et introductions
+# en cours de période.
+
+HOLIDAYS_PER_YEAR = 9       # jours fériés tirés par place et par an
+GAP_RATE = 0.002            # proba journalière de début de suspension
+GAP_MAX_DAYS = 10
+LATE_LISTING_SHARE = 0.05   # part des tickers introduits en cours de période
+
+
+def exchange_of(ticker: str) -> str:
+    if ticker.endswith("=F"):
+        return "FUT"
+    return ticker.rsplit(".", 1)[1] if "." in ticker else "US"
+
+
+def _holidays(exchange: str, dates: pd.DatetimeIndex, seed: int) -> np.ndarray:
+    """Masque des jours fériés d'une place : même tirage pour une (place, seed) donnée."""
+    rng = np.random.default_rng([seed, zlib.crc32(exchange.encode())])
+    closed = np.zeros(len(dates), dtype=bool)
+    for year in np.unique(dates.year):
+        pos = np.flatnonzero(dates.year == year)
+        closed[rng.choice(pos, size=min(HOLIDAYS_PER_YEAR, len(pos)), replace=False)] = True
+    return closed
+
+
+def synthetic_market(tickers, start: str = "2015-01-01", years: float = 10.0, seed: int = 0,
+                     sectors: dict | None = None, gaps: bool = True) -> pd.DataFrame:
+    """
+    Prix ajustés synthétiques (dates x tickers).
+    sectors : {ticker: secteur} -> facteur commun par secteur (par défaut un seul secteur).
+    gaps=False : panel plein (aucun NaN), utile pour isoler le coût des trous.
+    """
+    tickers = list(dict.fromkeys(tickers))
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(start=start, periods=int(round(252 * years)))
+    T, N = len(dates), len(tickers)
+    dt = 1.0 / 252
+
+    sec_names = sorted({sectors.get(t, "") for t in tickers}) if sectors else [""]
+    sec_idx = np.array([sec_names.index(sectors.get(t, "")) for t in tickers]) if sectors else np.zeros(N, dtype=int)
+
+    beta_m = rng.uniform(0.6, 1.4, N)
+    beta_s = rng.uniform(0.3, 0.9, N)
+    vol_i = rng.uniform(0.15, 0.45, N)
+    drift = rng.normal(0.06, 0.10, N)
+
+    f_m = rng.standard_normal(T) * 0.16 * np.sqrt(dt)
+    f_s = rng.standard_normal((T, len(sec_names))) * 0.12 * np.sqrt(dt)
+    eps = rng.standard_normal((T, N)) * vol_i * np.sqrt(dt)
+    r = f_m[:, None] * beta_m + f_s[:, sec_idx] * beta_s + eps
+    var = (0.16 * beta_m) ** 2 + (0.12 * beta_s) ** 2 + vol_i ** 2
+    r += (drift - 0.5 * var) * dt
+    prices = rng.uniform(5, 500, N) * np.exp(np.cumsum(r, axis=0))
+
+    if gaps:
+        for ex in {exchange_of(t) for t in tickers}:
+            cols = np.array([exchange_of(t) == ex for t in tickers])
+            prices[np.ix_(_holidays(ex, dates, seed), cols)] = np.nan
+        # suspensions : quelques jours consécutifs sans cotation
+        starts = np.argwhere(rng.random((T, N)) < GAP_RATE)
+        for t0, j in starts:
+            prices[t0:t0 + rng.integers(1, GAP_MAX_DAYS + 1), j] = np.nan
+        # introductions en cours de période
+        late = rng.random(N) < LATE_LISTING_SHARE
+        for j in np.flatnonzero(late):
+            prices[: rng.integers(T // 10, T // 2), j] = np.nan
+
+    return pd.DataFrame(prices, index=dates, columns=tickers)
+
+
+def synthetic_universes(n_extra: int = 0, start: str = "2015-01-01", years: float = 10.0,
+                        seed: int = 0) -> tuple:
+    """
+    Panel + univers ayant la forme du catalogue : mêmes tickers que SAT_UNIVERSE (un secteur
+    par satellite) et les cotations du cœur. n_extra > 0 ajoute un univers "SYN" de
+    n_extra tickers fictifs (grands univers : 1k-10k).
+    Retourne (panel, {clé: tickers}).
+    """
+    universes = {k: list(v) for k, v in SAT_UNIVERSE.items()}
+    if n_extra:
+        suffixes = ["", ".PA", ".DE", ".L", ".T", ".HK", ".TO", ".NS"]
+        universes["SYN"] = [f"SYN{i:05d}{suffixes[i % len(suffixes)]}" for i in range(n_extra)]
+    sectors = {}
+    for k, u in universes.items():
+        for t in u:
+            sectors.setdefault(t, k)
+    core = [t for listings in CORE_MAP.values() for t in listings]
+    panel = synthetic_market(list(sectors) + core, start=start, years=years, seed=seed, sectors=sectors)
+    return panel, universes
+
+
+SYNTHETIC_ORIGIN = "2005-01-03"
+
+
+def synthetic_download(tickers, start, end=None) -> pd.DataFrame:
+    """
+    Remplaçant hors ligne de price_store.yahoo_download (même signature, même forme de sortie).
+    Chaque ticker a une trajectoire fixe depuis SYNTHETIC_ORIGIN (graine = son nom, facteur
+    de marché commun) : un même ticker a les mêmes prix quels que soient le lot et la plage
+    demandés, comme chez Yahoo. La fin est exclue ; les jours fériés de sa place sont NaN.
+    """
+    tickers = list(dict.fromkeys(tickers))
+    dates = pd.bdate_range(SYNTHETIC_ORIGIN, pd.Timestamp.today().normalize())
+    dt = 1.0 / 252
+    f_m = np.random.default_rng(0).standard_normal(len(dates)) * 0.16 * np.sqrt(dt)
+    keep = dates >= pd.Timestamp(start)
+    if end is not None:
+        keep &= dates < pd.Timestamp(end)
+    out = {}
+    for t in tickers:
+        rng = np.random.default_rng(zlib.crc32(t.encode()))
+        beta, vol, drift = rng.uniform(0.6, 1.4), rng.uniform(0.15, 0.45), rng.normal(0.06, 0.10)
+        r = f_m * beta + rng.standard_normal(len(dates)) * vol * np.sqrt(dt)
+        r += (drift - 0.5 * ((0.16 * beta) ** 2 + vol ** 2)) * dt
+        p = rng.uniform(5, 500) * np.exp(np.cumsum(r))
+        p[_holidays(exchange_of(t), dates, 0)] = np.nan
+        out[t] = p[keep]
+    return pd.DataFrame(out, index=dates[keep], columns=tickers)
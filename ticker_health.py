@@ -0,0 +1,204 @@
+import argparse
+import json
+import os
+import threading
+import time
+
+import pandas as pd
+
+from price_store import CHUNK_SIZE, yahoo_download
+from tracing import count, span
+
+# ============================================================
+# Registre de santé des tickers (cache négatif des symboles morts)
+# ============================================================
+# Certains tickers du catalogue ne renvoient jamais de données (symbole invalide, radié) :
+# sans mémoire, chaque démarrage repaie leurs téléchargements ratés. On garde par ticker
+# le dernier succès, le nombre d'échecs consécutifs et la couverture de dates ; un ticker
+# en échec est sauté pendant un TTL qui double à chaque échec (plafonné), puis retenté.
+# Le registre retient aussi la cotation retenue pour chaque ETF cœur.
+
+HEALTH_PATH = os.environ.get(
+    "MOMENTUMX_HEALTH_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".momentumx_cache", "ticker_health.json"),
+)
+
+DEAD_TTL_DAYS = 1        # premier échec : sauté un jour
+MAX_DEAD_TTL_DAYS = 30   # le TTL double à chaque échec consécutif, jusqu'à ce plafond
+CORE_TTL_DAYS = 30       # cotation cœur retenue, revérifiée au-delà
+VALIDATE_DAYS = 30       # fenêtre téléchargée par la validation en masse
+
+
+class TickerHealth:
+    def __init__(self, path: str = HEALTH_PATH, dead_ttl_days: float = DEAD_TTL_DAYS,
+                 max_dead_ttl_days: float = MAX_DEAD_TTL_DAYS):
+        self.path = path
+        self.dead_ttl = dead_ttl_days * 86400
+        self.max_dead_ttl = max_dead_ttl_days * 86400
+        self._lock = threading.Lock()
+        data = self._load()
+        self._tickers = data.get("tickers", {})
+        self._core = data.get("core", {})
+
+    def _load(self) -> dict:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self) -> None:
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"tickers": self._tickers, "core": self._core}, f, ensure_ascii=False, sort_keys=True)
+        os.replace(tmp, self.path)
+
+    def _skip_until(self, entry: dict) -> float:
+        failures = entry.get("failures", 0)
+        if not failures:
+            return 0.0
+        ttl = min(self.dead_ttl * 2 ** (failures - 1), self.max_dead_ttl)
+        return entry.get("failed_at", 0) + ttl
+
+    def is_dead(self, ticker: str, now: float | None = None) -> bool:
+        now = time.time() if now is None else now
+        with self._lock:
+            entry = self._tickers.get(ticker)
+        return entry is not None and now < self._skip_until(entry)
+
+    def alive(self, tickers) -> list:
+        """Tickers à interroger : les morts dont le TTL court encore sont retirés."""
+        now = time.time()
+        with self._lock:
+            out = [t for t in tickers if t not in self._tickers or now >= self._skip_until(self._tickers[t])]
+        count("health.skipped", len(tickers) - len(out))
+        return out
+
+    def record(self, ok: dict | None = None, failed=(), error: str = "aucune donnée") -> None:
+        """
+        Enregistre un lot de résultats et sauvegarde une fois.
+        ok : {ticker: série de prix détenue} (fixe la couverture), failed : tickers sans données.
+        """
+        ok, failed = ok or {}, list(failed)
+        if not ok and not failed:
+            return
+        now = time.time()
+        with self._lock:
+            for t, prices in ok.items():
+                entry = self._tickers.setdefault(t, {})
+                entry.update({"ok_at": now, "failures": 0})
+                entry.pop("error", None)
+                if prices is not None and len(prices):
+                    entry.update({"first": str(prices.index[0].date()), "last": str(prices.index[-1].date()),
+                                  "rows": int(len(prices))})
+            for t in failed:
+                entry = self._tickers.setdefault(t, {})
+                entry.update({"failed_at": now, "failures": entry.get("failures", 0) + 1, "error": error})
+            self._save()
+
+    def get(self, ticker: str) -> dict:
+        with self._lock:
+            return dict(self._tickers.get(ticker, {}))
+
+    def core_listing(self, core_choice: str, listings) -> str | None:
+        """Cotation déjà retenue pour cet ETF cœur, si elle est récente et toujours proposée."""
+        with self._lock:
+            entry = self._core.get(core_choice)
+        if (entry is None or entry.get("ticker") not in listings
+                or time.time() - entry.get("at", 0) >= CORE_TTL_DAYS * 86400 or self.is_dead(entry["ticker"])):
+            return None
+        return entry["ticker"]
+
+    def set_core_listing(self, core_choice: str, ticker: str) -> None:
+        with self._lock:
+            if self._core.get(core_choice, {}).get("ticker") == ticker:
+                return
+            self._core[core_choice] = {"ticker": ticker, "at": time.time()}
+            self._save()
+
+    def report(self, tickers=None) -> pd.DataFrame:
+        """Un ticker par ligne : état, échecs consécutifs, dernier succès/échec et couverture."""
+        now = time.time()
+        with self._lock:
+            entries = dict(self._tickers)
+        tickers = list(entries) if tickers is None else list(dict.fromkeys(tickers))
+        rows = []
+        for t in tickers:
+            e = entries.get(t, {})
+            state = "inconnu" if not e else ("mort" if now < self._skip_until(e) else ("ok" if not e.get("failures") else "à retenter"))
+            rows.append({
+                "ticker": t,
+                "état": state,
+                "échecs": e.get("failures", 0),
+                "dernier succès": pd.to_datetime(e["ok_at"], unit="s").floor("s") if "ok_at" in e else pd.NaT,
+                "dernier échec": pd.to_datetime(e["failed_at"], unit="s").floor("s") if "failed_at" in e else pd.NaT,
+                "début": e.get("first"),
+                "fin": e.get("last"),
+                "lignes": e.get("rows"),
+            })
+        return pd.DataFrame(rows)
+
+
+def validate(tickers, health: TickerHealth, downloader=None, days: int = VALIDATE_DAYS) -> None:
+    """
+    Vérifie tous les tickers d'un coup, cache négatif ignoré : une courte fenêtre récente par lot,
+    lots téléchargés l'un après l'autre (yahoo_download est sérialisé, voir price_store._YF_LOCK).
+    Un lot vide (échec réseau global) n'est pas compté.
+    """
+    downloader = downloader or yahoo_download
+    tickers = list(dict.fromkeys(tickers))
+    start = (pd.Timestamp.today().normalize() - pd.Timedelta(days=days)).date()
+    chunks = [tickers[i:i + CHUNK_SIZE] for i in range(0, len(tickers), CHUNK_SIZE)]
+    if not chunks:
+        return
+
+    def check(chunk):
+        try:
+            return downloader(chunk, start=start)
+        except Exception:
+            return pd.DataFrame()
+
+    with span("health.validate", tickers=len(tickers)):
+        results = [check(c) for c in chunks]
+    ok, failed = {}, []
+    for chunk, data in zip(chunks, results):
+        if data is None or data.empty:
+            continue
+        for t in chunk:
+            if t in data.columns and data[t].notna().any():
+                ok[t] = None   # fenêtre courte : on ne touche pas à la couverture du store
+            else:
+                failed.append(t)
+    health.record(ok=ok, failed=failed, error=f"aucune donnée sur {days} jours")
+
+
+def main():
+    from catalog import CORE_MAP, SAT_UNIVERSE
+
+    parser = argparse.ArgumentParser(description="Santé des tickers Momentum-X (validation en masse du catalogue).")
+    parser.add_argument("--sats", nargs="+", default=list(SAT_UNIVERSE), help="clés satellites (ex: EM TECH)")
+    parser.add_argument("--days", type=int, default=VALIDATE_DAYS, help="fenêtre récente téléchargée")
+    parser.add_argument("--report-only", action="store_true", help="affiche le registre sans rien télécharger")
+    args = parser.parse_args()
+
+    health = TickerHealth()
+    for k in args.sats:
+        dup = pd.Index(SAT_UNIVERSE[k])
+        dup = dup[dup.duplicated()].unique().tolist()
+        if dup:
+            print(f"{k} : tickers en double {dup}")
+    tickers = list(dict.fromkeys([t for k in args.sats for t in SAT_UNIVERSE[k]]
+                                 + [t for listings in CORE_MAP.values() for t in listings]))
+    if not args.report_only:
+        validate(tickers, health, days=args.days)
+
+    report = health.report(tickers)
+    bad = report[report["état"] != "ok"]
+    with pd.option_context("display.max_rows", None, "display.width", 200):
+        print(bad.to_string(index=False) if not bad.empty else "tous les tickers répondent")
+    print(f"{(report['état'] == 'ok').sum()}/{len(report)} tickers ok")
+
+
+if __name__ == "__main__":
+    main()
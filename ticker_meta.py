@@ -0,0 +1,133 @@
+import contextvars
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from tracing import count, span, submit_traced
+
+# ============================================================
+# Cache disque des métadonnées tickers (noms, devise, place)
+# ============================================================
+# yf.Ticker(t).info coûte un aller-retour réseau par ticker : on garde le résultat
+# sur disque avec un TTL et on récupère tous les manquants en un seul lot concurrent.
+
+META_PATH = os.environ.get(
+    "MOMENTUMX_META_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".momentumx_cache", "ticker_meta.json"),
+)
+
+NAME_TTL_DAYS = 30
+FAILED_TTL_DAYS = 1   # un échec est retenté plus tôt qu'un nom valide
+MAX_WORKERS = 16
+
+
+def yahoo_info(ticker: str) -> dict:
+    import yfinance as yf   # import lourd : seulement au premier nom manquant
+
+    info = yf.Ticker(ticker).info or {}
+    return {
+        "name": info.get("longName"),
+        "short_name": info.get("shortName"),
+        "currency": info.get("currency"),
+        "exchange": info.get("exchange"),
+    }
+
+
+class TickerMetaCache:
+    def __init__(self, path: str = META_PATH, fetcher=None, ttl_days: float = NAME_TTL_DAYS):
+        self.path = path
+        self.fetcher = fetcher or yahoo_info
+        self.ttl = ttl_days * 86400
+        self._lock = threading.Lock()
+        self._pending = set()
+        self._entries = self._load()
+
+    def _load(self) -> dict:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self) -> None:
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._entries, f, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+    def _is_fresh(self, entry: dict, now: float) -> bool:
+        ttl = self.ttl if entry.get("ok") else FAILED_TTL_DAYS * 86400
+        return now - entry.get("fetched", 0) < ttl
+
+    def misses(self, tickers) -> list:
+        now = time.time()
+        with self._lock:
+            return [t for t in dict.fromkeys(tickers)
+                    if t not in self._entries or not self._is_fresh(self._entries[t], now)]
+
+    def _fetch_one(self, ticker: str) -> dict:
+        count("network.yahoo_info")
+        try:
+            meta = self.fetcher(ticker) or {}
+            ok = True
+        except Exception:
+            # Yahoo renvoie régulièrement des erreurs/timeouts sur .info
+            meta, ok = {}, False
+        meta.update({"ok": ok, "fetched": time.time()})
+        return meta
+
+    def fetch(self, tickers) -> None:
+        """Récupère en un lot concurrent tous les tickers absents ou expirés."""
+        todo = self.misses(tickers)
+        if not todo:
+            return
+        with span("ticker_meta.fetch", tickers=len(todo)), \
+                ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(todo))) as ex:
+            results = [f.result() for f in [submit_traced(ex, self._fetch_one, t) for t in todo]]
+        with self._lock:
+            self._entries.update(zip(todo, results))
+            self._save()
+
+    def prefetch(self, tickers) -> threading.Thread | None:
+        """Lance le remplissage du cache en arrière-plan (ex: tout SAT_UNIVERSE au démarrage)."""
+        todo = self.misses(tickers)
+        with self._lock:
+            todo = [t for t in todo if t not in self._pending]
+            self._pending.update(todo)
+        if not todo:
+            return None
+
+        def run():
+            try:
+                self.fetch(todo)
+            finally:
+                with self._lock:
+                    self._pending.difference_update(todo)
+
+        # le thread emporte le traceur courant : ses appels réseau restent comptés
+        th = threading.Thread(target=contextvars.copy_context().run, args=(run,), name="ticker-meta-prefetch",
+                              daemon=True)
+        th.start()
+        return th
+
+    def get(self, ticker: str) -> dict:
+        with self._lock:
+            return dict(self._entries.get(ticker, {}))
+
+    def names(self, tickers, wait: bool = True) -> list:
+        """
+        Noms longs des tickers (le ticker lui-même à défaut).
+        wait=False ne bloque jamais : les manquants partent en arrière-plan.
+        """
+        tickers = list(tickers)
+        count("cache.ticker_meta.calls", len(tickers))
+        count("cache.ticker_meta.miss", len(self.misses(tickers)))
+        if wait:
+            self.fetch(tickers)
+        else:
+            self.prefetch(tickers)
+        with self._lock:
+            return [self._entries.get(t, {}).get("name") or t for t in tickers]
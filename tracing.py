@@ -0,0 +1,157 @@
+import contextvars
+import json
+import os
+import threading
+import time
+from collections import Counter
+
+# ============================================================
+# Traces légères : spans nommés (durées) + compteurs, par exécution
+# ============================================================
+# Le traceur courant vit dans une ContextVar : chaque session/rerun Streamlit a le sien,
+# et les pools de threads le propagent via contextvars.copy_context() (voir submit_traced).
+# Sans traceur actif, span() renvoie un contexte vide partagé et count() ne fait rien :
+# le coût est un appel de fonction, on peut laisser l'instrumentation en production.
+
+TRACE_ENABLED = os.environ.get("MOMENTUMX_TRACE", "1") != "0"
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs) -> None:
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class NullTracer:
+    enabled = False
+
+    def span(self, name: str, **attrs):
+        return _NULL_SPAN
+
+    def count(self, name: str, n: int = 1) -> None:
+        pass
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "attrs", "t0")
+
+    def __init__(self, tracer, name, attrs):
+        self.tracer, self.name, self.attrs = tracer, name, attrs
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        t1 = time.perf_counter()
+        self.tracer._record({
+            "name": self.name,
+            "start_ms": (self.t0 - self.tracer.t0) * 1e3,
+            "duration_ms": (t1 - self.t0) * 1e3,
+            "thread": threading.current_thread().name,
+            "error": exc_type.__name__ if exc_type else None,
+            **self.attrs,
+        })
+        return False
+
+    def set(self, **attrs) -> None:
+        """Ajoute des attributs connus en cours de span (ex: nb de lignes)."""
+        self.attrs.update(attrs)
+
+
+class Tracer:
+    enabled = True
+
+    def __init__(self, name: str = "run"):
+        self.name = name
+        self.t0 = time.perf_counter()
+        self.started = time.time()
+        self.spans = []
+        self.counters = Counter()
+        self._lock = threading.Lock()
+
+    def span(self, name: str, **attrs) -> _Span:
+        return _Span(self, name, attrs)
+
+    def count(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self.counters[name] += n
+
+    def _record(self, span: dict) -> None:
+        with self._lock:
+            self.spans.append(span)
+
+    def summary(self) -> list:
+        """Spans agrégés par nom : [{name, calls, total_ms, max_ms}], du plus coûteux au moins coûteux."""
+        agg = {}
+        with self._lock:
+            spans = list(self.spans)
+        for s in spans:
+            a = agg.setdefault(s["name"], {"name": s["name"], "calls": 0, "total_ms": 0.0, "max_ms": 0.0})
+            a["calls"] += 1
+            a["total_ms"] += s["duration_ms"]
+            a["max_ms"] = max(a["max_ms"], s["duration_ms"])
+        return sorted(agg.values(), key=lambda a: -a["total_ms"])
+
+    def cache_stats(self) -> dict:
+        """{fonction: (hits, misses)} à partir des compteurs cache.<f>.calls / cache.<f>.miss."""
+        with self._lock:
+            counters = dict(self.counters)
+        stats = {}
+        for key, calls in counters.items():
+            if key.startswith("cache.") and key.endswith(".calls"):
+                fn = key[len("cache."):-len(".calls")]
+                miss = counters.get(f"cache.{fn}.miss", 0)
+                stats[fn] = (max(calls - miss, 0), miss)
+        return stats
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            spans, counters = list(self.spans), dict(self.counters)
+        return {
+            "name": self.name,
+            "started": self.started,
+            "elapsed_ms": (time.perf_counter() - self.t0) * 1e3,
+            "spans": sorted(spans, key=lambda s: s["start_ms"]),
+            "counters": counters,
+            "cache": {k: {"hits": h, "misses": m} for k, (h, m) in self.cache_stats().items()},
+        }
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), ensure_ascii=False, indent=2, default=str)
+
+
+_NULL_TRACER = NullTracer()
+_CURRENT = contextvars.ContextVar("momentumx_tracer", default=_NULL_TRACER)
+
+
+def get_tracer():
+    return _CURRENT.get()
+
+
+def start_trace(name: str = "run"):
+    """Active un nouveau traceur pour le contexte courant (NullTracer si MOMENTUMX_TRACE=0)."""
+    tracer = Tracer(name) if TRACE_ENABLED else _NULL_TRACER
+    _CURRENT.set(tracer)
+    return tracer
+
+
+def span(name: str, **attrs):
+    return _CURRENT.get().span(name, **attrs)
+
+
+def count(name: str, n: int = 1) -> None:
+    _CURRENT.get().count(name, n)
+
+
+def submit_traced(executor, fn, *args, **kwargs):
+    """executor.submit en emportant le contexte courant (donc le traceur) dans le thread."""
+    return executor.submit(contextvars.copy_context().run, fn, *args, **kwargs)
@@ -0,0 +1,164 @@
+import argparse
+import compileall
+import importlib
+import json
+import os
+import sys
+import time
+
+# ============================================================
+# Préchauffage d'un réplica avant de le déclarer prêt
+# ============================================================
+# Un processus Streamlit neuf paie au premier utilisateur : compilation des .pyc, imports
+# lourds (pandas, scipy, plotly, yfinance...), lecture à froid du store de prix et des caches
+# disque, premiers appels des chemins chauds (BLAS, solveurs). Ce script fait tout cela, mesure
+# chaque étape et écrit un rapport (READY_PATH) dont la présence sert de sonde de disponibilité.
+# python warmup.py                       -> préchauffe puis sort (étape d'init du conteneur)
+# python warmup.py --serve -- --server.port 8501
+#                                        -> préchauffe puis lance main.py dans le même processus :
+#                                           les modules restent importés, le serveur n'écoute qu'une fois chaud
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+READY_PATH = os.environ.get("MOMENTUMX_READY_PATH", os.path.join(APP_DIR, ".momentumx_cache", "ready.json"))
+
+# dans l'ordre : une dépendance déjà importée n'est pas recomptée par le module suivant
+HEAVY_MODULES = ("numpy", "pandas", "scipy.optimize", "plotly.express", "yfinance", "streamlit",
+                 "pipeline", "backtest", "risk", "precompute", "price_store", "ticker_meta", "ticker_health")
+
+
+def warm_imports(modules=HEAVY_MODULES) -> dict:
+    """Importe les modules lourds -> {module: ms} (temps propre, dépendances déjà chargées exclues)."""
+    out = {}
+    for name in modules:
+        t0 = time.perf_counter()
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            out[name] = None        # dépendance optionnelle absente : l'étape qui en a besoin le dira
+            continue
+        out[name] = round((time.perf_counter() - t0) * 1e3, 1)
+    return out
+
+
+def warm_prices(sat_keys=None) -> dict:
+    """Lit depuis le disque l'historique de tous les tickers (satellites + cœur), sans réseau."""
+    from catalog import CORE_MAP, SAT_UNIVERSE
+    from price_store import PriceStore
+
+    store = PriceStore()
+    keys = list(SAT_UNIVERSE) if sat_keys is None else sat_keys
+    tickers = list(dict.fromkeys([t for k in keys for t in SAT_UNIVERSE.get(k, [])]
+                                 + [t for listings in CORE_MAP.values() for t in listings]))
+    held = sum(1 for t in tickers if not store.load(t)[0].empty)
+    return {"tickers": len(tickers), "in_store": held}
+
+
+def warm_meta() -> dict:
+    from catalog import SAT_UNIVERSE
+    from ticker_health import TickerHealth
+    from ticker_meta import TickerMetaCache
+
+    tickers = list(dict.fromkeys(t for u in SAT_UNIVERSE.values() for t in u))
+    return {"names_missing": len(TickerMetaCache().misses(tickers)), "health": len(TickerHealth().report())}
+
+
+def warm_artifacts() -> dict:
+    """Charge la version publiée par precompute.py (fichiers dans le cache disque du système)."""
+    from precompute import ArtifactStore
+
+    artifacts = ArtifactStore()
+    manifest = artifacts.manifest()
+    if manifest is None:
+        return {"version": None, "sats": 0}
+    loaded = sum(1 for k in manifest["sats"] if artifacts.ranking(k, manifest["start"], 126) is not None)
+    return {"version": manifest["version"], "sats": loaded}
+
+
+def warm_hot_paths() -> dict:
+    """Un passage complet sur un petit marché synthétique : premiers appels payés ici, pas par un utilisateur."""
+    from backtest import walk_forward
+    from catalog import CORE_MAP, SAT_UNIVERSE
+    from covariance import COV_METHODS
+    from pipeline import SatelliteParams, combine_satellites, run_satellite
+    from quant import LOOKBACKS, momentum_panel, optimize_mean_variance, pct_returns
+    from risk import simulate_portfolio
+    from synthetic import synthetic_market
+
+    core = CORE_MAP[next(iter(CORE_MAP))][0]
+    universes = {k: SAT_UNIVERSE[k][:12] for k in list(SAT_UNIVERSE)[:2]}
+    prices = synthetic_market([core] + [t for u in universes.values() for t in u], years=3.0)
+    results = []
+    for cov_method in COV_METHODS:
+        params = SatelliteParams(cov_method=cov_method, frontier=True)
+        for k, u in universes.items():
+            panel = prices[u].dropna(how="all")
+            results.append(run_satellite(k, panel, params, momentum_panel(panel, lookbacks=LOOKBACKS)))
+    core_ret = pct_returns(prices[[core]].dropna()).iloc[:, 0]
+    pf = combine_satellites(results[:len(universes)], core, core_ret, 0.65, 6.0, 0.60)
+    r = results[0]
+    if r.frontier is not None:
+        optimize_mean_variance(r.frontier.mu, r.frontier.cov, 7.0, max_weight=0.4, min_weight=0.1, method="slsqp")
+    if pf is not None:
+        simulate_portfolio(pf.returns, n_paths=2_000, workers=1)
+    walk_forward(prices, universes, core, 0.65)
+    return {"satellites": len(results), "portfolio": pf is not None}
+
+
+def warmup(sat_keys=None, compile_code: bool = True, hot_paths: bool = True, ready_path: str = READY_PATH) -> dict:
+    """Toutes les étapes, chronométrées ; le rapport est écrit (atomiquement) dans ready_path."""
+    if os.path.exists(ready_path):
+        os.remove(ready_path)       # pas prêt tant que le préchauffage n'est pas terminé
+    t_all = time.perf_counter()
+    report = {"steps": {}}
+
+    def step(name, fn, *args):
+        t0 = time.perf_counter()
+        try:
+            info = fn(*args)
+        except Exception as e:      # une étape ratée (store vide, réseau...) n'empêche pas le démarrage
+            info = {"error": repr(e)}
+        report["steps"][name] = {"ms": round((time.perf_counter() - t0) * 1e3, 1), **({"info": info} if info else {})}
+
+    if compile_code:
+        step("compile", lambda: {"ok": bool(compileall.compile_dir(APP_DIR, maxlevels=0, quiet=1))})
+    step("imports", warm_imports)
+    step("prices", warm_prices, sat_keys)
+    step("meta", warm_meta)
+    step("artifacts", warm_artifacts)
+    if hot_paths:
+        step("hot_paths", warm_hot_paths)
+    report["total_ms"] = round((time.perf_counter() - t_all) * 1e3, 1)
+    report["ready_at"] = time.time()
+
+    os.makedirs(os.path.dirname(ready_path), exist_ok=True)
+    tmp = ready_path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=1)
+    os.replace(tmp, ready_path)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Préchauffage Momentum-X (imports, caches disque, chemins chauds).")
+    parser.add_argument("--sats", nargs="+", default=None, help="satellites dont lire les prix (défaut : tous)")
+    parser.add_argument("--no-compile", action="store_true")
+    parser.add_argument("--no-hot-paths", action="store_true")
+    parser.add_argument("--serve", action="store_true", help="lance ensuite `streamlit run main.py` dans ce processus")
+    parser.add_argument("streamlit_args", nargs=argparse.REMAINDER, help="après --, options passées à streamlit")
+    args = parser.parse_args()
+
+    report = warmup(args.sats, compile_code=not args.no_compile, hot_paths=not args.no_hot_paths)
+    for name, s in report["steps"].items():
+        print(f"{name:<10} {s['ms']:>9.1f} ms  {json.dumps(s.get('info', {}), ensure_ascii=False)}")
+    print(f"{'total':<10} {report['total_ms']:>9.1f} ms -> {READY_PATH}", flush=True)
+
+    if args.serve:
+        from streamlit.web import cli as stcli
+
+        extra = [a for a in args.streamlit_args if a != "--"]
+        sys.argv = ["streamlit", "run", os.path.join(APP_DIR, "main.py"), *extra]
+        sys.exit(stcli.main())
+
+
+if __name__ == "__main__":
+    main()